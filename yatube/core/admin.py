@@ -0,0 +1,28 @@
+from django.contrib import admin
+
+from .models import BatchJob
+
+
+class BatchJobAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'name', 'model', 'status', 'progress_display',
+                    'user', 'created', 'finished')
+    list_filter = ('status',)
+    list_select_related = ('user',)
+    readonly_fields = ('name', 'model', 'params', 'status', 'total',
+                       'processed', 'progress_display', 'last_pk', 'user',
+                       'then', 'then_args', 'created', 'finished',
+                       'last_error')
+    exclude = ('pk_ranges',)
+
+    @admin.display(description='Прогресс')
+    def progress_display(self, job):
+        return f'{job.progress}% ({job.processed} из {job.total or "?"})'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+admin.site.register(BatchJob, BatchJobAdmin)
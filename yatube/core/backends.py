@@ -0,0 +1,79 @@
+"""Бэкенды шаблонов, кэша и миниатюр, пишущие метрики в ``core.metrics``."""
+from time import perf_counter
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as django_backend
+from sorl.thumbnail.base import ThumbnailBackend
+
+from . import metrics
+
+MISSING = object()
+
+
+def timed_render(render, context, request):
+    """Рендеринг, время которого пишется в метрику, если он верхний."""
+    stats = metrics.current_request.get()
+    if stats is None or stats.template_depth:
+        return render(context, request)
+    stats.template_depth += 1
+    start = perf_counter()
+    try:
+        return render(context, request)
+    finally:
+        stats.template_depth -= 1
+        metrics.template_duration.observe(
+            perf_counter() - start, stats.view
+        )
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        return timed_render(super().render, context, request)
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """Шаблоны Django с замером времени рендеринга верхнего уровня."""
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
+
+
+class InstrumentedCacheMixin:
+    """Считает попадания и промахи ``get``/``get_many``."""
+    def get(self, key, default=None, version=None):
+        value = super().get(key, MISSING, version)
+        metrics.record_cache(value is not MISSING)
+        return default if value is MISSING else value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = super().get_many(keys, version)
+        view = metrics.current_view()
+        if found:
+            metrics.cache_requests.inc(view, 'hit', amount=len(found))
+        if len(keys) > len(found):
+            metrics.cache_requests.inc(
+                view, 'miss', amount=len(keys) - len(found)
+            )
+        return found
+
+
+class InstrumentedLocMemCache(InstrumentedCacheMixin, LocMemCache):
+    pass
+
+
+class InstrumentedThumbnailBackend(ThumbnailBackend):
+    def _create_thumbnail(self, *args, **kwargs):
+        start = perf_counter()
+        try:
+            return super()._create_thumbnail(*args, **kwargs)
+        finally:
+            metrics.thumbnail_duration.observe(
+                perf_counter() - start, metrics.current_view()
+            )
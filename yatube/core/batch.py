@@ -0,0 +1,122 @@
+"""Массовые действия над большими выборками — в фоне и порциями.
+
+Действие — функция ``(queryset порции, **params)``, помеченная
+``@batch_action``; она меняет строки через ``update`` или удаляет их
+напрямую, не создавая объектов. ``start`` фиксирует выборку как
+отрезки id — они не зависят от версии Django и устройства моделей, так
+что задание переживёт обновление, — и ставит задачу в очередь. Строки,
+появившиеся позже, в задание не попадут. Задача обрабатывает порции по
+``BATCH_JOB_CHUNK`` записей в порядке id, каждую в своей транзакции,
+сохраняя прогресс, а через ``BATCH_JOB_SLICE`` секунд ставит себя в
+очередь снова, чтобы не занимать обработчик надолго. После сбоя
+выполнение продолжается с последней обработанной порции. Задача из
+``then`` ставится в очередь, когда задание выполнено, — так несколько
+заданий выстраиваются в цепочку. Если задача исчерпала попытки,
+задание получает статус «Ошибка», а цепочка останавливается.
+"""
+import traceback
+from time import monotonic
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import BatchJob
+from .tasks import enqueue, enqueue_on_commit, task
+
+
+def batch_action(func):
+    """Помечает функцию уровня модуля как массовое действие."""
+    func.action_name = f'{func.__module__}.{func.__qualname__}'
+    return func
+
+
+def pk_ranges(queryset):
+    """Сворачивает id выборки в отрезки подряд идущих значений."""
+    ranges = []
+    pks = queryset.order_by('pk').values_list('pk', flat=True)
+    for pk in pks.iterator():
+        if ranges and ranges[-1][1] == pk - 1:
+            ranges[-1][1] = pk
+        else:
+            ranges.append([pk, pk])
+    return ranges
+
+
+def next_pks(job):
+    """Следующие ``BATCH_JOB_CHUNK`` id задания после ``last_pk``."""
+    pks = []
+    for first, last in job.pk_ranges:
+        begin = max(first, job.last_pk + 1)
+        stop = min(last + 1, begin + settings.BATCH_JOB_CHUNK - len(pks))
+        pks.extend(range(begin, stop))
+        if len(pks) >= settings.BATCH_JOB_CHUNK:
+            break
+    return pks
+
+
+def start(action, queryset, params=None, user=None, then=None,
+          then_args=()):
+    """Создаёт задание над выборкой и ставит его выполнение в очередь."""
+    ranges = pk_ranges(queryset)
+    job = BatchJob.objects.create(
+        name=action.action_name,
+        model=queryset.model._meta.label_lower,
+        pk_ranges=ranges,
+        total=sum(last - first + 1 for first, last in ranges),
+        params=params or {},
+        user=user,
+        then=then.task_name if then else '',
+        then_args=list(then_args),
+    )
+    enqueue_on_commit(run_batch_job, (job.pk,))
+    return job
+
+
+def run_chunk(job, action, model):
+    """Обрабатывает следующую порцию; False, если записей не осталось."""
+    pks = next_pks(job)
+    if not pks:
+        return False
+    with transaction.atomic():
+        action(model._base_manager.filter(pk__in=pks), **job.params)
+        job.processed += len(pks)
+        job.last_pk = pks[-1]
+        job.save(update_fields=['processed', 'last_pk'])
+    return True
+
+
+def fail_batch_job(job_id):
+    """Помечает задание упавшим, когда попытки задачи исчерпаны."""
+    BatchJob.objects.filter(pk=job_id).exclude(status=BatchJob.DONE).update(
+        status=BatchJob.FAILED, finished=timezone.now()
+    )
+
+
+@task(on_failure=fail_batch_job)
+def run_batch_job(job_id):
+    job = BatchJob.objects.get(pk=job_id)
+    if job.status == BatchJob.DONE:
+        return
+    action = import_string(job.name)
+    model = apps.get_model(job.model)
+    job.status = BatchJob.RUNNING
+    job.save(update_fields=['status'])
+    deadline = monotonic() + settings.BATCH_JOB_SLICE
+    try:
+        while run_chunk(job, action, model):
+            if monotonic() >= deadline:
+                enqueue(run_batch_job, (job.pk,))
+                return
+    except Exception:
+        job.last_error = traceback.format_exc()
+        job.save(update_fields=['last_error'])
+        # очередь повторит задачу, и она продолжит с last_pk
+        raise
+    job.status = BatchJob.DONE
+    job.finished = timezone.now()
+    job.save(update_fields=['status', 'finished'])
+    if job.then:
+        enqueue(job.then, job.then_args)
@@ -0,0 +1,233 @@
+"""Минификация HTML и сжатие ответов.
+
+Кэшируемая страница минифицируется и сжимается один раз, в кэше лежат
+сразу все её варианты, и попадание в кэш отдаёт готовые байты без
+работы процессора. Остальные ответы сжимает ``CompressionMiddleware``
+на лету, потоковые — по кускам, не собирая тело в памяти.
+"""
+import gzip
+import hashlib
+import re
+import zlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from . import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# содержимое этих тегов не трогаем: пробелы в нём значимы
+PRESERVE_RE = re.compile(
+    r'<(pre|textarea|script|style)\b.*?</\1\s*>', re.S | re.I
+)
+COMMENT_RE = re.compile(r'<!--(?!\[if).*?-->', re.S)
+NEWLINES_RE = re.compile(r'[ \t\r]*\n\s*')
+SPACES_RE = re.compile(r'[ \t]{2,}')
+# тег целиком, с учётом «>» внутри значений атрибутов в кавычках
+TAG_RE = re.compile(r'<(?:[^>"\']|"[^"]*"|\'[^\']*\')*>')
+# значение в кавычках или пробелы между атрибутами
+TAG_SPACES_RE = re.compile(r'("[^"]*"|\'[^\']*\')|\s+')
+# сжатие имеет смысл только для текстовых типов
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript',
+                      'image/svg+xml')
+# короче этого сжатие не окупает заголовок и лишний проход
+MIN_LENGTH = 200
+# уровни для заранее сжатых вариантов и для сжатия на лету
+BEST, FAST = 'best', 'fast'
+LEVELS = {
+    'br': {BEST: 11, FAST: 4},
+    'gzip': {BEST: 9, FAST: 6},
+}
+
+responses_encoded = metrics.register(metrics.Counter(
+    'yatube_responses_encoded_total', 'Ответы по кодировке сжатия.',
+    labels=('view', 'encoding'),
+))
+
+
+def collapse_text(text):
+    text = NEWLINES_RE.sub('\n', text)
+    return SPACES_RE.sub(' ', text)
+
+
+def collapse_tag(tag):
+    # значения атрибутов показываются и отправляются как есть
+    return TAG_SPACES_RE.sub(lambda match: match.group(1) or ' ', tag)
+
+
+def collapse(html):
+    html = COMMENT_RE.sub('', html)
+    parts = []
+    position = 0
+    for match in TAG_RE.finditer(html):
+        parts.append(collapse_text(html[position:match.start()]))
+        parts.append(collapse_tag(match.group()))
+        position = match.end()
+    parts.append(collapse_text(html[position:]))
+    return ''.join(parts)
+
+
+def minify_html(html):
+    """Схлопывает пробельные последовательности и убирает комментарии.
+
+    Любая последовательность пробелов в HTML отображается как один
+    пробел, поэтому перевод строки сохраняется одним символом, а
+    страница выглядит так же, как до минификации. Значения атрибутов в
+    кавычках остаются как есть: их пробелы видны и отправляются формой.
+    """
+    parts = []
+    position = 0
+    for match in PRESERVE_RE.finditer(html):
+        parts.append(collapse(html[position:match.start()]))
+        parts.append(match.group())
+        position = match.end()
+    parts.append(collapse(html[position:]))
+    return ''.join(parts).strip()
+
+
+def encodings():
+    """Поддерживаемые кодировки в порядке предпочтения."""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def compress(data, encoding, level=BEST):
+    quality = LEVELS[encoding][level]
+    if encoding == 'br':
+        return brotli.compress(data, quality=quality)
+    return gzip.compress(data, quality, mtime=0)
+
+
+def compress_stream(chunks, encoding):
+    """Сжимает поток, отдавая каждый кусок сразу после его прихода."""
+    quality = LEVELS[encoding][FAST]
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=quality)
+        for chunk in chunks:
+            yield compressor.process(chunk) + compressor.flush()
+        yield compressor.finish()
+        return
+    compressor = zlib.compressobj(quality, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def accepted_encodings(request):
+    """Кодировки из Accept-Encoding с ненулевым весом."""
+    accepted = set()
+    for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, _, params = item.partition(';')
+        weight = 1.0
+        params = params.replace(' ', '')
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        if coding.strip() and weight > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def choose_encoding(request, available=None):
+    accepted = accepted_encodings(request)
+    for encoding in available or encodings():
+        if encoding in accepted:
+            return encoding
+    return None
+
+
+def is_compressible(response):
+    return response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES)
+
+
+def is_html(response):
+    return response.get('Content-Type', '').startswith('text/html')
+
+
+def minify_response(response):
+    """Минифицирует тело готового HTML-ответа на месте."""
+    if (not settings.HTML_MINIFY or response.streaming
+            or not is_html(response)
+            or response.has_header('Content-Encoding')):
+        return
+    html = response.content.decode(response.charset)
+    response.content = minify_html(html).encode(response.charset)
+    if response.has_header('Content-Length'):
+        response['Content-Length'] = str(len(response.content))
+
+
+def build_variants(response):
+    """Минифицированное тело и все его сжатые варианты для кэша."""
+    minify_response(response)
+    variants = {
+        'content_type': response['Content-Type'],
+        'identity': response.content,
+    }
+    if len(response.content) >= MIN_LENGTH:
+        for encoding in encodings():
+            variants[encoding] = compress(response.content, encoding)
+    return variants
+
+
+def response_from_variants(request, variants):
+    available = [name for name in encodings() if name in variants]
+    encoding = choose_encoding(request, available)
+    response = HttpResponse(
+        variants[encoding or 'identity'],
+        content_type=variants['content_type'],
+    )
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Content-Length'] = str(len(response.content))
+    patch_vary_headers(response, ('Accept-Encoding',))
+    responses_encoded.inc(metrics.current_view(), encoding or 'identity')
+    return response
+
+
+def is_cacheable(request, response):
+    # страница с CSRF-токеном или новыми cookie принадлежит одному клиенту
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not request.META.get('CSRF_COOKIE_USED')
+        and 'private' not in response.get('Cache-Control', '')
+    )
+
+
+def page_cache_key(request, prefix):
+    url = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'page:{prefix}:{url}:{request.user.pk or 0}'
+
+
+def cache_compressed(timeout, key_prefix=None):
+    """Кэширует GET-ответ вью вместе с его сжатыми вариантами.
+
+    Ключ включает адрес и пользователя: шапка страницы у каждого своя.
+    """
+    def decorator(view):
+        prefix = key_prefix or f'{view.__module__}.{view.__name__}'
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            key = page_cache_key(request, prefix)
+            variants = cache.get(key)
+            if variants is None:
+                response = view(request, *args, **kwargs)
+                if not is_cacheable(request, response):
+                    return response
+                variants = build_variants(response)
+                cache.set(key, variants, timeout)
+            return response_from_variants(request, variants)
+        return wrapper
+    return decorator
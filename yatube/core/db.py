@@ -0,0 +1,86 @@
+"""Чтение с реплик для страниц только на чтение.
+
+``ReplicaMiddleware`` включает реплики для безопасных запросов к вью из
+``REPLICA_VIEWS``, а после записи ставит пользователю куку, которая на
+``REPLICA_PIN_SECONDS`` возвращает его на основную базу: так он сразу
+видит свой пост, комментарий или подписку, даже если реплика отстаёт.
+"""
+import random
+from contextvars import ContextVar
+from time import monotonic
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+from . import metrics
+
+use_replica = ContextVar('use_replica', default=False)
+# реплики, отставшие больше REPLICA_MAX_LAG при последнем замере
+lagging = set()
+last_check = float('-inf')
+
+replica_lag = metrics.register(metrics.Gauge(
+    'yatube_replica_lag_seconds', 'Отставание реплики от основной базы.',
+    labels=('database',),
+))
+
+# реплика, применившая всё полученное, не отстаёт, даже если основная
+# база давно ничего не писала и последняя транзакция была давно
+LAG_QUERIES = {
+    'postgresql': (
+        'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn()'
+        ' THEN 0 ELSE COALESCE(EXTRACT(EPOCH FROM '
+        'now() - pg_last_xact_replay_timestamp()), 0) END'
+    ),
+}
+
+
+def available_replicas():
+    return [alias for alias in settings.DATABASE_REPLICAS
+            if alias not in lagging]
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if (not use_replica.get()
+                or model._meta.app_label in settings.PRIMARY_ONLY_APPS):
+            return 'default'
+        replicas = available_replicas()
+        return random.choice(replicas) if replicas else 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+def measure_replica_lag():
+    """Замеряет отставание реплик; отставшие исключаются из чтения."""
+    global last_check
+    last_check = monotonic()
+    for alias in settings.DATABASE_REPLICAS:
+        connection = connections[alias]
+        sql = LAG_QUERIES.get(connection.vendor)
+        if sql is None:
+            continue
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(sql)
+                lag = float(cursor.fetchone()[0])
+        except DatabaseError:
+            lag = float('inf')
+        replica_lag.set(lag, alias)
+        if lag > settings.REPLICA_MAX_LAG:
+            lagging.add(alias)
+        else:
+            lagging.discard(alias)
+
+
+def check_replica_lag():
+    """Замер не чаще раза в ``REPLICA_LAG_CHECK_INTERVAL`` секунд."""
+    if monotonic() - last_check >= settings.REPLICA_LAG_CHECK_INTERVAL:
+        measure_replica_lag()
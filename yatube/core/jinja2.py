@@ -0,0 +1,77 @@
+"""Окружение Jinja2 с аналогами тегов и фильтров шаблонов Django.
+
+Движок необязателен: он подключается, только если установлен пакет
+jinja2, а страницы переводятся на него по одной настройкой
+``JINJA2_VIEWS``.
+"""
+import logging
+
+from django.template.backends import jinja2 as jinja2_backend
+from django.template.defaultfilters import date
+from django.templatetags.static import static
+from django.urls import reverse
+from jinja2 import Environment
+from markupsafe import Markup
+from sorl.thumbnail import get_thumbnail
+from sorl.thumbnail.conf import settings as thumbnail_settings
+
+from .backends import timed_render
+from .templatetags.user_filters import addclass
+
+logger = logging.getLogger(__name__)
+
+
+def url(name, *args, **kwargs):
+    return reverse(name, args=args or None, kwargs=kwargs or None)
+
+
+def thumbnail(file, geometry, **options):
+    """Как ``{% thumbnail %}``: None для пустого файла или при ошибке."""
+    if not file:
+        return None
+    try:
+        return get_thumbnail(file, geometry, **options)
+    except Exception:
+        if thumbnail_settings.THUMBNAIL_DEBUG:
+            raise
+        logger.exception('Не удалось создать миниатюру %s', file)
+        return None
+
+
+def post_cards(posts, profile=False):
+    from posts.templatetags.post_cards import render_cards
+
+    return [
+        Markup(card)
+        for card in render_cards(posts, profile, using='jinja2')
+    ]
+
+
+def environment(**options):
+    env = Environment(**options)
+    env.globals.update({
+        'url': url,
+        'static': static,
+        'thumbnail': thumbnail,
+        'post_cards': post_cards,
+    })
+    env.filters.update({
+        'date': date,
+        'addclass': addclass,
+    })
+    return env
+
+
+class Template(jinja2_backend.Template):
+    def render(self, context=None, request=None):
+        return timed_render(super().render, context, request)
+
+
+class Jinja2(jinja2_backend.Jinja2):
+    """Jinja2 с замером времени рендеринга, как у шаблонов Django."""
+    def from_string(self, template_code):
+        return Template(self.env.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return Template(template.template, self)
@@ -0,0 +1,102 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+MODULES = ('yatube.settings', 'yatube.settings_production')
+COLUMNS = (
+    ('total_ms', 'старт'),
+    ('ready_ms', 'готов'),
+    ('first_request_ms', '1-й запрос'),
+    ('master_rss_kb', 'RSS мастера'),
+    ('worker_private_kb', 'своё у воркера'),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет старт процесса с каждым профилем настроек, с прогревом '
+        'и без: время загрузки и первого запроса, RSS мастера и память, '
+        'которую воркер после fork не делит с мастером.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--modules', default=','.join(MODULES),
+            help='Модули настроек через запятую.',
+        )
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--path', default='/about/author/')
+        parser.add_argument('--output', default='startup.json')
+        parser.add_argument(
+            '--compare', help='Предыдущий результат для сравнения.'
+        )
+
+    def handle(self, *args, **options):
+        report = {}
+        for module in options['modules'].split(','):
+            for warm in (False, True):
+                name = f'{module}:{"warm" if warm else "cold"}'
+                runs = [
+                    self.probe(module, options['path'], warm)
+                    for _ in range(options['runs'])
+                ]
+                report[name] = {
+                    key: round(statistics.median(run[key] for run in runs), 1)
+                    for key, _ in COLUMNS if runs[0].get(key) is not None
+                }
+        with open(options['output'], 'w') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        previous = {}
+        if options['compare']:
+            with open(options['compare']) as file:
+                previous = json.load(file)
+        self.print_report(report, previous)
+
+    def probe(self, module, path, warm):
+        command = [sys.executable, '-m', 'core.startup', path]
+        if not warm:
+            command.append('--no-warm-up')
+        start = perf_counter()
+        completed = subprocess.run(
+            command, cwd=settings.BASE_DIR, capture_output=True, text=True,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': module},
+        )
+        total = round((perf_counter() - start) * 1000, 2)
+        if completed.returncode:
+            raise CommandError(
+                f'Проба {module} завершилась с ошибкой:\n'
+                f'{completed.stderr}'
+            )
+        result = json.loads(completed.stdout.splitlines()[-1])
+        if result['status'] >= 400:
+            raise CommandError(
+                f'{path} ответил {result["status"]} с профилем {module}.'
+            )
+        result['total_ms'] = total
+        return result
+
+    def print_report(self, report, previous):
+        self.stdout.write(
+            f'{"профиль":<36}'
+            + ''.join(f'{title:>16}' for _, title in COLUMNS)
+        )
+        for name, row in report.items():
+            line = f'{name:<36}'
+            for key, _ in COLUMNS:
+                value = row.get(key)
+                line += f'{"-" if value is None else value:>16}'
+            self.stdout.write(line)
+            before = previous.get(name)
+            if before:
+                changes = [
+                    f'{title} {row[key] / before[key] - 1:+.0%}'
+                    for key, title in COLUMNS
+                    if row.get(key) and before.get(key)
+                ]
+                self.stdout.write(f'{"":<36}' + ', '.join(changes))
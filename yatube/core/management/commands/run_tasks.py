@@ -0,0 +1,46 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import worker
+from core.tasks import claim, get_executor, requeue_stale
+
+
+class Command(BaseCommand):
+    help = 'Обработчик очереди фоновых задач.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.TASKS_WORKERS,
+            help='Количество потоков или процессов.',
+        )
+        parser.add_argument(
+            '--executor', choices=('thread', 'process'), default='thread',
+            help='Пул, в котором выполняются задачи.',
+        )
+        parser.add_argument(
+            '--poll', type=float, default=settings.TASKS_POLL_INTERVAL,
+            help='Пауза между опросами пустой очереди, в секундах.',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить все готовые задачи и завершиться.',
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        requeued = requeue_stale(settings.TASKS_STALE_TIMEOUT)
+        if requeued:
+            self.stdout.write(f'Возвращено в очередь: {requeued}')
+        processed = 0
+        with get_executor(options['executor'], workers) as executor:
+            while True:
+                pks = claim(workers)
+                if not pks:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll'])
+                    continue
+                processed += len(list(executor.map(worker.run, pks)))
+        self.stdout.write(f'Обработано задач: {processed}')
@@ -0,0 +1,190 @@
+"""Метрики запросов в текстовом формате Prometheus.
+
+Значения накапливаются в памяти процесса: гистограмма — это массив
+счётчиков по фиксированным границам, наблюдение стоит одного bisect.
+При нескольких воркерах каждый отдаёт свои значения, а суммирует их
+Prometheus.
+"""
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from time import perf_counter
+
+TIME_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+current_request = ContextVar('metrics_request', default=None)
+
+
+def _escape(value):
+    return (
+        str(value).replace('\\', '\\\\')
+        .replace('"', '\\"')
+        .replace('\n', '\\n')
+    )
+
+
+def _format_labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"'
+             for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=('view',),
+                 buckets=TIME_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [
+                    [0] * (len(self.buckets) + 1), 0.0
+                ]
+            series[0][index] += 1
+            series[1] += value
+
+    def collect(self):
+        with self._lock:
+            items = [(labels, list(counts), total)
+                     for labels, (counts, total) in self._series.items()]
+        for labels, counts, total in sorted(items):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                label = _format_labels(self.labels, labels, f'le="{bound}"')
+                yield f'{self.name}_bucket{label} {cumulative}'
+            label = _format_labels(self.labels, labels)
+            yield f'{self.name}_sum{label} {total}'
+            yield f'{self.name}_count{label} {cumulative}'
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels=('view',)):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def collect(self):
+        with self._lock:
+            items = sorted(self._series.items())
+        for labels, value in items:
+            label = _format_labels(self.labels, labels)
+            yield f'{self.name}{label} {value}'
+
+
+class Gauge:
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labels=('view',)):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._series[labels] = value
+
+    def collect(self):
+        with self._lock:
+            items = sorted(self._series.items())
+        for labels, value in items:
+            label = _format_labels(self.labels, labels)
+            yield f'{self.name}{label} {value}'
+
+
+request_duration = Histogram(
+    'yatube_request_duration_seconds', 'Время обработки запроса.'
+)
+db_queries = Histogram(
+    'yatube_db_queries', 'Количество SQL-запросов на запрос.',
+    buckets=COUNT_BUCKETS,
+)
+db_duration = Histogram(
+    'yatube_db_duration_seconds', 'Суммарное время SQL-запросов.'
+)
+template_duration = Histogram(
+    'yatube_template_render_seconds', 'Время рендеринга шаблонов.'
+)
+thumbnail_duration = Histogram(
+    'yatube_thumbnail_seconds', 'Время создания миниатюр.'
+)
+cache_requests = Counter(
+    'yatube_cache_requests_total', 'Обращения к кэшу.',
+    labels=('view', 'result'),
+)
+REGISTRY = [
+    request_duration,
+    db_queries,
+    db_duration,
+    template_duration,
+    thumbnail_duration,
+    cache_requests,
+]
+
+
+class RequestStats:
+    """Показатели одного запроса, собираемые по ходу его обработки."""
+    __slots__ = ('view', 'queries', 'db_time', 'template_depth')
+
+    def __init__(self):
+        self.view = 'unresolved'
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_depth = 0
+
+    def record_query(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += perf_counter() - start
+
+
+def current_view():
+    stats = current_request.get()
+    return stats.view if stats is not None else '-'
+
+
+def record_cache(hit):
+    cache_requests.inc(current_view(), 'hit' if hit else 'miss')
+
+
+def register(metric):
+    """Добавляет метрику в вывод ``/metrics/``."""
+    REGISTRY.append(metric)
+    return metric
+
+
+def render_text():
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        lines.extend(metric.collect())
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,253 @@
+import logging
+import mimetypes
+import os
+import random
+import re
+from contextlib import ExitStack
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed, SuspiciousFileOperation
+from django.db import connections
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.shortcuts import render
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from . import compression, db, metrics, nplusone, ratelimit
+
+logger = logging.getLogger('core.nplusone')
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class StaticFilesMiddleware:
+    """Отдаёт собранную статику без фронт-прокси.
+
+    Файлы с хэшем в имени кэшируются навсегда, сжатая копия выбирается
+    по Accept-Encoding. При ``STATIC_ACCEL_REDIRECT`` тело отдаёт nginx
+    по заголовку X-Accel-Redirect, а Django только выставляет заголовки.
+    """
+    HASHED_RE = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+    ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+    def __init__(self, get_response):
+        if not settings.STATIC_SERVE:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL
+
+    def __call__(self, request):
+        if (request.path.startswith(self.prefix)
+                and request.method in ('GET', 'HEAD')):
+            response = self.serve(request, request.path[len(self.prefix):])
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def serve(self, request, name):
+        try:
+            path = safe_join(settings.STATIC_ROOT, name)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(path):
+            return None
+        accepted = compression.accepted_encodings(request)
+        encoding = None
+        for candidate, extension in self.ENCODINGS:
+            if candidate in accepted and os.path.isfile(path + extension):
+                encoding, path = candidate, path + extension
+                break
+        stat = os.stat(path)
+        if not was_modified_since(
+            request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime
+        ):
+            response = HttpResponseNotModified()
+        elif settings.STATIC_ACCEL_REDIRECT:
+            response = HttpResponse()
+            response['X-Accel-Redirect'] = (
+                settings.STATIC_ACCEL_REDIRECT
+                + os.path.relpath(path, settings.STATIC_ROOT)
+            )
+        else:
+            response = FileResponse(open(path, 'rb'))
+            response['Content-Length'] = stat.st_size
+        response['Content-Type'] = (
+            mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        )
+        if encoding:
+            response['Content-Encoding'] = encoding
+        response['Vary'] = 'Accept-Encoding'
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        if self.HASHED_RE.search(name):
+            response['Cache-Control'] = (
+                'public, max-age=31536000, immutable'
+            )
+        else:
+            response['Cache-Control'] = (
+                f'public, max-age={settings.STATIC_MAX_AGE}'
+            )
+        return response
+
+
+class CompressionMiddleware:
+    """Минифицирует HTML и сжимает ответы, не сжатые заранее.
+
+    Уже сжатые ответы (страницы из ``cache_compressed``, статика) и
+    нетекстовые (картинки, архивы) проходят как есть, потоковые
+    сжимаются по мере отдачи.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.has_header('Content-Encoding'):
+            return response
+        compression.minify_response(response)
+        if not compression.is_compressible(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = compression.choose_encoding(request)
+        if encoding is None:
+            return response
+        if response.streaming:
+            response.streaming_content = compression.compress_stream(
+                response.streaming_content, encoding
+            )
+            del response['Content-Length']
+        else:
+            if len(response.content) < compression.MIN_LENGTH:
+                return response
+            content = compression.compress(
+                response.content, encoding, compression.FAST
+            )
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        compression.responses_encoded.inc(metrics.current_view(), encoding)
+        return response
+
+
+class MetricsMiddleware:
+    """Собирает время, SQL-запросы и рендеринг по имени URL."""
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = metrics.RequestStats()
+        token = metrics.current_request.set(stats)
+        start = perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(stats.record_query)
+                    )
+                response = self.get_response(request)
+        finally:
+            metrics.current_request.reset(token)
+        metrics.request_duration.observe(perf_counter() - start, stats.view)
+        metrics.db_queries.observe(stats.queries, stats.view)
+        metrics.db_duration.observe(stats.db_time, stats.view)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        stats = metrics.current_request.get()
+        if stats is not None:
+            stats.view = request.resolver_match.view_name
+
+
+class NPlusOneMiddleware:
+    """Ищет N+1 из шаблонов: в тестах падает, в продакшене пишет в лог.
+
+    Проверяется доля ``NPLUSONE_SAMPLE_RATE`` запросов; при
+    ``NPLUSONE_RAISE`` — каждый запрос, и находка вызывает исключение.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not (settings.NPLUSONE_RAISE
+                or random.random() < settings.NPLUSONE_SAMPLE_RATE):
+            return self.get_response(request)
+        tracker = nplusone.QueryTracker(settings.NPLUSONE_THRESHOLD)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(tracker))
+            response = self.get_response(request)
+        offenders = tracker.offenders()
+        if offenders:
+            message = nplusone.describe(request.path, offenders)
+            if settings.NPLUSONE_RAISE:
+                raise nplusone.NPlusOneError(message)
+            logger.warning(message)
+        return response
+
+
+class ReplicaMiddleware:
+    """Чтение с реплик для ``REPLICA_VIEWS`` и основная база после записи."""
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = db.use_replica.set(False)
+        try:
+            response = self.get_response(request)
+        finally:
+            db.use_replica.reset(token)
+        if (request.method not in SAFE_METHODS
+                and response.status_code < 400
+                and settings.DATABASE_REPLICAS):
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (settings.DATABASE_REPLICAS
+                and request.method in SAFE_METHODS
+                and request.resolver_match.view_name in settings.REPLICA_VIEWS
+                and settings.REPLICA_PIN_COOKIE not in request.COOKIES):
+            db.check_replica_lag()
+            db.use_replica.set(True)
+
+
+class RateLimitMiddleware:
+    """Отвечает 429 на запросы сверх лимитов из ``settings.RATELIMITS``."""
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        scope = request.resolver_match.view_name
+        rate = settings.RATELIMITS.get(scope)
+        if rate is None:
+            return None
+        methods, limit, period = ratelimit.parse_rate(rate)
+        if methods is not None and request.method not in methods:
+            return None
+        retry_after = ratelimit.check(
+            scope, ratelimit.get_ident(request), limit, period
+        )
+        if not retry_after:
+            return None
+        response = render(
+            request,
+            'core/429.html',
+            {'retry_after': retry_after},
+            status=429,
+        )
+        response['Retry-After'] = str(retry_after)
+        return response
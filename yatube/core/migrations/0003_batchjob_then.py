@@ -0,0 +1,23 @@
+# Generated by Django 3.2.13 on 2026-10-19 09:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_batchjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='batchjob',
+            name='then',
+            field=models.CharField(blank=True, max_length=255, verbose_name='Затем задача'),
+        ),
+        migrations.AddField(
+            model_name='batchjob',
+            name='then_args',
+            field=models.JSONField(blank=True, default=list, verbose_name='Аргументы задачи'),
+        ),
+    ]
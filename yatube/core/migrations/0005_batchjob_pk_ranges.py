@@ -0,0 +1,48 @@
+import pickle
+
+from django.db import migrations, models
+
+
+def convert_queries(apps, schema_editor):
+    """Переводит незавершённые задания с запроса на отрезки id."""
+    BatchJob = apps.get_model('core', 'BatchJob')
+    for job in BatchJob.objects.exclude(status__in=('done', 'failed')):
+        try:
+            model = apps.get_model(*job.model.split('.'))
+            queryset = model._base_manager.all()
+            queryset.query = pickle.loads(job.query)
+            pks = queryset.filter(pk__gt=job.last_pk).order_by('pk')
+            ranges = []
+            for pk in pks.values_list('pk', flat=True).iterator():
+                if ranges and ranges[-1][1] == pk - 1:
+                    ranges[-1][1] = pk
+                else:
+                    ranges.append([pk, pk])
+        except Exception as error:
+            job.status = 'failed'
+            job.last_error = f'Выборку не удалось перенести: {error!r}'
+            job.save(update_fields=['status', 'last_error'])
+            continue
+        job.pk_ranges = ranges
+        job.total = job.processed + sum(b - a + 1 for a, b in ranges)
+        job.save(update_fields=['pk_ranges', 'total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_batchjob_failed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='batchjob',
+            name='pk_ranges',
+            field=models.JSONField(default=list, verbose_name='Отрезки id выборки'),
+        ),
+        migrations.RunPython(convert_queries, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='batchjob',
+            name='query',
+        ),
+    ]
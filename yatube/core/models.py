@@ -1,4 +1,6 @@
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 
 class CreatedModel(models.Model):
@@ -10,3 +12,106 @@ class CreatedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class Task(CreatedModel):
+    """Отложенная задача для фонового обработчика."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField('Функция', max_length=255)
+    args = models.JSONField('Аргументы', default=list, blank=True)
+    kwargs = models.JSONField('Именованные аргументы', default=dict,
+                              blank=True)
+    priority = models.SmallIntegerField('Приоритет', default=0)
+    status = models.CharField(
+        'Статус',
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField(
+        'Максимум попыток', default=3
+    )
+    run_after = models.DateTimeField('Не раньше', default=timezone.now)
+    started = models.DateTimeField('Начало выполнения', null=True,
+                                   blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+
+    class Meta:
+        ordering = ['-priority', 'run_after', 'pk']
+        indexes = [
+            models.Index(
+                fields=['status', '-priority', 'run_after'],
+                name='task_queue_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} [{self.status}]'
+
+
+class BatchJob(CreatedModel):
+    """Массовое действие над выборкой, выполняемое в фоне порциями."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнено'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField('Действие', max_length=255)
+    model = models.CharField('Модель', max_length=100)
+    pk_ranges = models.JSONField('Отрезки id выборки', default=list)
+    params = models.JSONField('Параметры', default=dict, blank=True)
+    status = models.CharField(
+        'Статус',
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+    )
+    total = models.PositiveIntegerField('Всего записей', null=True,
+                                        blank=True)
+    processed = models.PositiveIntegerField('Обработано', default=0)
+    last_pk = models.BigIntegerField('Последний обработанный id', default=0)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Запустил',
+    )
+    then = models.CharField('Затем задача', max_length=255, blank=True)
+    then_args = models.JSONField('Аргументы задачи', default=list,
+                                 blank=True)
+    finished = models.DateTimeField('Завершено', null=True, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+
+    class Meta:
+        ordering = ['-pk']
+        verbose_name = 'массовое действие'
+        verbose_name_plural = 'массовые действия'
+
+    def __str__(self):
+        return f'{self.name} [{self.status}]'
+
+    @property
+    def progress(self):
+        """Доля обработанных записей в процентах."""
+        if not self.total:
+            return 100 if self.status == self.DONE else 0
+        return min(100, round(self.processed * 100 / self.total))
@@ -0,0 +1,85 @@
+"""Поиск N+1: одинаковых по форме SQL-запросов из шаблонов.
+
+Каждый SQL-запрос приводится к отпечатку (литералы и списки IN
+схлопываются). Если запрос одной формы повторяется в пределах
+HTTP-запроса ``NPLUSONE_THRESHOLD`` раз и вызван обращением к атрибуту
+в шаблоне, это ленивая загрузка связанного объекта в цикле.
+"""
+import os
+import re
+import sys
+from functools import lru_cache
+
+from django.conf import settings
+
+LITERALS_RE = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+IN_LIST_RE = re.compile(r"\((?:%s|\?)(?:,\s*(?:%s|\?))*\)")
+TEMPLATE_FILE = os.path.join('django', 'template', 'base.py')
+# обёртки запросов и рендеринга не указывают на источник проблемы
+SKIPPED_FILES = {
+    os.path.join(os.path.dirname(__file__), f'{name}.py')
+    for name in ('backends', 'metrics', 'middleware', 'nplusone')
+}
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(sql):
+    sql = LITERALS_RE.sub('?', sql)
+    return IN_LIST_RE.sub('(...)', sql)
+
+
+def find_location():
+    """Шаблон и строка, а также код проекта, из которых пришёл запрос."""
+    template = code = None
+    frame = sys._getframe(2)
+    while frame is not None and (template is None or code is None):
+        filename = frame.f_code.co_filename
+        if (template is None and filename.endswith(TEMPLATE_FILE)
+                and frame.f_code.co_name == 'render_annotated'):
+            node = frame.f_locals.get('self')
+            origin = getattr(node, 'origin', None)
+            if origin is not None:
+                name = origin.template_name or origin.name
+                template = f'{name}:{node.token.lineno}'
+        elif (code is None and filename.startswith(settings.BASE_DIR)
+                and filename not in SKIPPED_FILES):
+            code = f'{filename}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return template, code
+
+
+class QueryTracker:
+    """Обёртка ``execute_wrapper``, считающая запросы по отпечаткам."""
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.counts = {}
+        self.locations = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        shape = fingerprint(sql)
+        count = self.counts.get(shape, 0) + 1
+        self.counts[shape] = count
+        if count == 2:
+            self.locations[shape] = find_location()
+        return execute(sql, params, many, context)
+
+    def offenders(self):
+        """Повторяющиеся запросы, вызванные из шаблонов."""
+        return [
+            (shape, count) + self.locations[shape]
+            for shape, count in self.counts.items()
+            if count >= self.threshold and self.locations[shape][0]
+            and not any(part in shape for part in settings.NPLUSONE_IGNORE)
+        ]
+
+
+def describe(path, offenders):
+    lines = [f'N+1 при обработке {path}:']
+    for shape, count, template, code in offenders:
+        lines.append(f'  {count} x {shape}')
+        lines.append(f'    шаблон {template}, код {code}')
+    return '\n'.join(lines)
@@ -0,0 +1,65 @@
+"""Ограничение частоты запросов к пишущим вью.
+
+Правило задаётся строкой ``"[МЕТОДЫ:]количество/период"``, например
+``"POST:10/m"`` или ``"60/5m"``. Счётчики хранятся в общем кэше и
+меняются только атомарными ``add``/``incr``/``decr``: пополнение
+корзины моделируется скользящим окном из текущего и предыдущего
+интервалов, поэтому гонок между процессами нет и на запрос уходит
+два-три обращения к кэшу.
+"""
+import math
+import re
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+
+UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+RATE_RE = re.compile(
+    r'^(?:(?P<methods>[A-Z,]+):)?'
+    r'(?P<count>\d+)/(?P<number>\d*)(?P<unit>[smhd])$'
+)
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """Возвращает (методы или None, количество, период в секундах)."""
+    match = RATE_RE.match(rate)
+    if match is None:
+        raise ValueError(f'Некорректное правило ограничения: {rate!r}')
+    methods = match['methods']
+    period = int(match['number'] or 1) * UNITS[match['unit']]
+    return (
+        frozenset(methods.split(',')) if methods else None,
+        int(match['count']),
+        period,
+    )
+
+
+def get_ident(request):
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def check(scope, ident, limit, period, now=None):
+    """Учитывает запрос; возвращает 0 или число секунд до следующей попытки."""
+    cache = caches[settings.RATELIMIT_CACHE]
+    now = time.time() if now is None else now
+    window, elapsed = divmod(now, period)
+    window = int(window)
+    key = f'rl:{scope}:{ident}:{window}'
+    cache.add(key, 0, period * 2)
+    current = cache.incr(key)
+    previous = cache.get(f'rl:{scope}:{ident}:{window - 1}', 0)
+    weight = 1 - elapsed / period
+    if previous * weight + current <= limit:
+        return 0
+    cache.decr(key)
+    current -= 1
+    if current >= limit or not previous:
+        wait = period - elapsed
+    else:
+        wait = period * (1 - (limit - current - 1) / previous) - elapsed
+    return max(1, math.ceil(round(wait, 3)))
@@ -0,0 +1,210 @@
+"""Прогрев процесса до fork и замер старта.
+
+С ``gunicorn --preload`` приложение загружается в мастере, и всё, что
+``warm_up`` успела построить — разобранные URL, скомпилированные
+шаблоны, каталоги переводов — воркеры получают готовым и общим с
+мастером через copy-on-write. ``gc.freeze`` убирает эти объекты из
+обхода сборщика мусора, чтобы он не трогал их страницы памяти в
+воркерах.
+
+Запуск модуля (``python -m core.startup``) — проба для
+``bench_startup``: загрузка, прогрев, fork и два запроса в воркере,
+результат печатается в JSON.
+"""
+import gc
+import io
+import json
+import logging
+import mimetypes
+import os
+import sys
+from time import perf_counter
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_SUFFIXES = ('.html', '.txt')
+
+
+def walk_resolvers(resolver):
+    """Заполняет таблицы reverse и компилирует регулярки всех URL."""
+    resolver.reverse_dict
+    resolver.namespace_dict
+    resolver.app_dict
+    for pattern in resolver.url_patterns:
+        pattern.pattern.regex
+        if hasattr(pattern, 'url_patterns'):
+            walk_resolvers(pattern)
+
+
+def template_names(engine):
+    """Имена всех шаблонов из каталогов движка."""
+    if hasattr(engine, 'env'):
+        return engine.env.loader.list_templates()
+    dirs = []
+    for loader in engine.engine.template_loaders:
+        for inner in getattr(loader, 'loaders', [loader]):
+            dirs.extend(inner.get_dirs())
+    names = set()
+    for directory in dirs:
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if name.endswith(TEMPLATE_SUFFIXES):
+                    path = os.path.join(root, name)
+                    names.add(os.path.relpath(path, directory))
+    return sorted(names)
+
+
+def warm_templates():
+    from django.template import engines
+
+    compiled = failed = 0
+    for engine in engines.all():
+        for name in template_names(engine):
+            try:
+                engine.get_template(name)
+            except Exception:
+                # фрагменты, которые не компилируются отдельно
+                logger.debug('Шаблон %s не прогрет', name, exc_info=True)
+                failed += 1
+            else:
+                compiled += 1
+    return compiled, failed
+
+
+def warm_up():
+    """Загружает то, что иначе достраивает первый запрос каждого воркера.
+
+    Возвращает время шагов в миллисекундах.
+    """
+    from django.conf import settings
+    from django.db import connections
+    from django.urls import get_resolver
+    from django.utils import formats, translation
+    from sorl.thumbnail import default
+
+    timings = {}
+
+    def step(name, function):
+        start = perf_counter()
+        result = function()
+        timings[name] = round((perf_counter() - start) * 1000, 2)
+        return result
+
+    step('urls', lambda: walk_resolvers(get_resolver()))
+    compiled, failed = step('templates', warm_templates)
+    timings['templates_compiled'] = compiled
+    timings['templates_failed'] = failed
+
+    def translations():
+        with translation.override(settings.LANGUAGE_CODE):
+            translation.gettext('')
+            formats.get_format('DATETIME_FORMAT')
+
+    step('translations', translations)
+
+    def libraries():
+        mimetypes.init()
+        default.backend, default.engine, default.storage
+
+    step('libraries', libraries)
+    # соединения, открытые при прогреве, нельзя делить между воркерами
+    connections.close_all()
+    return timings
+
+
+def freeze():
+    """Переносит живые объекты в постоянное поколение перед fork."""
+    gc.collect()
+    gc.freeze()
+
+
+def rss_kb():
+    try:
+        with open('/proc/self/status') as file:
+            for line in file:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def private_kb():
+    """Память процесса, не разделяемая с другими (только Linux)."""
+    try:
+        with open('/proc/self/smaps_rollup') as file:
+            return sum(
+                int(line.split()[1]) for line in file
+                if line.startswith(('Private_Clean:', 'Private_Dirty:'))
+            )
+    except OSError:
+        return None
+
+
+def request(application, path):
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'localhost',
+        'REMOTE_ADDR': '127.0.0.1',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': False,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    statuses = []
+    body = application(
+        environ, lambda status, headers, *args: statuses.append(status)
+    )
+    b''.join(body)
+    if hasattr(body, 'close'):
+        body.close()
+    return int(statuses[0].split()[0])
+
+
+def probe(path, warm):
+    """Старт мастера, прогрев и обработка запросов в fork-нутом воркере."""
+    start = perf_counter()
+    from django.core.wsgi import get_wsgi_application
+
+    application = get_wsgi_application()
+    result = {'setup_ms': round((perf_counter() - start) * 1000, 2)}
+    if warm:
+        result['warm_up'] = warm_up()
+        freeze()
+    result['ready_ms'] = round((perf_counter() - start) * 1000, 2)
+    result['master_rss_kb'] = rss_kb()
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read)
+        worker = {}
+        for name in ('first_request_ms', 'second_request_ms'):
+            begin = perf_counter()
+            worker['status'] = request(application, path)
+            worker[name] = round((perf_counter() - begin) * 1000, 2)
+        worker['worker_rss_kb'] = rss_kb()
+        worker['worker_private_kb'] = private_kb()
+        os.write(write, json.dumps(worker).encode())
+        os._exit(0)
+    os.close(write)
+    with os.fdopen(read) as file:
+        data = file.read()
+    os.waitpid(pid, 0)
+    result.update(json.loads(data))
+    return result
+
+
+if __name__ == '__main__':
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    path = sys.argv[1] if len(sys.argv) > 1 else '/'
+    warm = '--no-warm-up' not in sys.argv
+    print(json.dumps(probe(path, warm)))
@@ -0,0 +1,48 @@
+"""Статика с хэшем содержимого в имени и заранее сжатыми копиями.
+
+``collectstatic`` записывает рядом с каждым текстовым файлом ``.gz`` и,
+если установлен пакет brotli, ``.br``. Отдаёт их фронт-прокси
+(``gzip_static``/``brotli_static``) или ``StaticFilesMiddleware``.
+"""
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+from .compression import compress, encodings
+
+COMPRESSIBLE = (
+    '.css', '.js', '.map', '.svg', '.json', '.txt', '.xml', '.html',
+    '.ico', '.ttf', '.eot', '.otf',
+)
+# сжатая копия пишется, только если она заметно меньше оригинала
+MIN_RATIO = 0.95
+
+EXTENSIONS = {'br': '.br', 'gzip': '.gz'}
+
+
+def compress_file(path):
+    """Пишет сжатые копии файла; возвращает их пути."""
+    with open(path, 'rb') as file:
+        data = file.read()
+    written = []
+    for encoding in encodings():
+        packed = compress(data, encoding)
+        if len(packed) < len(data) * MIN_RATIO:
+            target = path + EXTENSIONS[encoding]
+            with open(target, 'wb') as file:
+                file.write(packed)
+            written.append(target)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        # только итоговые имена: промежуточные проходы уже удалены
+        names = set(self.hashed_files) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if name.endswith(COMPRESSIBLE) and self.exists(name):
+                for path in compress_file(self.path(name)):
+                    yield name, os.path.relpath(path, self.location), True
@@ -0,0 +1,163 @@
+"""Очередь фоновых задач, хранящаяся в БД.
+
+Задача — функция уровня модуля, помеченная декоратором ``@task``.
+Вью и сигналы ставят её в очередь через ``func.delay(...)`` или
+``enqueue(...)`` и сразу возвращают ответ, а выполняет задачу
+обработчик ``manage.py run_tasks``.
+"""
+import logging
+import multiprocessing
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import worker
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+
+def task(func=None, *, priority=0, max_attempts=None, on_failure=None):
+    """Регистрирует функцию как фоновую задачу и добавляет ей ``delay``.
+
+    ``on_failure`` вызывается с аргументами задачи, когда все попытки
+    исчерпаны.
+    """
+    def decorator(func):
+        def delay(*args, **kwargs):
+            return enqueue(
+                func, args, kwargs,
+                priority=priority,
+                max_attempts=max_attempts,
+            )
+        func.task_name = f'{func.__module__}.{func.__qualname__}'
+        func.delay = delay
+        func.on_failure = on_failure
+        return func
+
+    if func is None:
+        return decorator
+    return decorator(func)
+
+
+def enqueue(func, args=(), kwargs=None, priority=0, countdown=0,
+            max_attempts=None):
+    """Ставит задачу в очередь. Аргументы должны сериализоваться в JSON."""
+    name = getattr(func, 'task_name', func)
+    if settings.TASKS_ALWAYS_EAGER:
+        try:
+            import_string(name)(*args, **(kwargs or {}))
+        except Exception:
+            give_up(name, args, kwargs or {})
+            raise
+        return None
+    return Task.objects.create(
+        name=name,
+        args=list(args),
+        kwargs=kwargs or {},
+        priority=priority,
+        max_attempts=max_attempts or settings.TASKS_MAX_ATTEMPTS,
+        run_after=timezone.now() + timedelta(seconds=countdown),
+    )
+
+
+def enqueue_on_commit(func, args=(), kwargs=None, **options):
+    """Ставит задачу в очередь после фиксации текущей транзакции."""
+    transaction.on_commit(lambda: enqueue(func, args, kwargs, **options))
+
+
+def claim(limit):
+    """Забирает из очереди до ``limit`` готовых к выполнению задач."""
+    now = timezone.now()
+    with transaction.atomic():
+        pks = list(
+            Task.objects.select_for_update(skip_locked=True)
+            .filter(status=Task.PENDING, run_after__lte=now)
+            .order_by('-priority', 'run_after', 'pk')
+            .values_list('pk', flat=True)[:limit]
+        )
+        Task.objects.filter(pk__in=pks).update(
+            status=Task.RUNNING,
+            started=now,
+            attempts=F('attempts') + 1,
+        )
+    return pks
+
+
+def requeue_stale(timeout):
+    """Возвращает в очередь задачи, обработчик которых завершился аварийно."""
+    return Task.objects.filter(
+        status=Task.RUNNING,
+        started__lt=timezone.now() - timedelta(seconds=timeout),
+    ).update(status=Task.PENDING)
+
+
+def give_up(name, args, kwargs):
+    """Вызывает ``on_failure`` задачи после последней неудачной попытки."""
+    try:
+        handler = getattr(import_string(name), 'on_failure', None)
+        if handler is not None:
+            handler(*args, **kwargs)
+    except Exception:
+        logger.exception('Обработчик сбоя задачи %s не выполнен', name)
+
+
+def run_task(pk):
+    """Выполняет одну задачу и фиксирует результат; None, если задачу
+    удалили после того, как обработчик её забрал."""
+    task = Task.objects.filter(pk=pk).first()
+    if task is None:
+        logger.warning('Задача %s не найдена', pk)
+        return None
+    try:
+        import_string(task.name)(*task.args, **task.kwargs)
+    except Exception:
+        task.last_error = traceback.format_exc()
+        if task.attempts >= task.max_attempts:
+            task.status = Task.FAILED
+            logger.error('Задача %s не выполнена: %s', task.pk,
+                         task.last_error)
+            give_up(task.name, task.args, task.kwargs)
+        else:
+            task.status = Task.PENDING
+            task.run_after = timezone.now() + timedelta(
+                seconds=settings.TASKS_RETRY_DELAY * 2 ** (task.attempts - 1)
+            )
+    else:
+        task.status = Task.DONE
+    task.save(update_fields=['status', 'run_after', 'last_error'])
+    return task.status
+
+
+def run_in_worker(pk):
+    """Выполняет задачу в потоке или процессе пула обработчика."""
+    try:
+        return run_task(pk)
+    finally:
+        connections.close_all()
+
+
+def get_executor(kind, workers):
+    """Пул потоков или процессов, в котором выполняются задачи."""
+    if kind == 'process':
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=worker.setup,
+        )
+    return ThreadPoolExecutor(max_workers=workers)
+
+
+@task
+def send_email(subject, body, from_email, to, html=None):
+    message = EmailMultiAlternatives(subject, body, from_email, to)
+    if html is not None:
+        message.attach_alternative(html, 'text/html')
+    message.send()
@@ -0,0 +1,106 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from posts.models import Group, Post, User
+from ..batch import batch_action, run_batch_job, start
+from ..models import BatchJob, Task
+from ..tasks import claim, run_task
+
+calls = []
+
+
+@batch_action
+def rename(posts, text, fail_after=None):
+    if fail_after is not None and len(calls) >= fail_after:
+        raise RuntimeError('сбой')
+    calls.append(sorted(posts.values_list('pk', flat=True)))
+    posts.update(text=text)
+
+
+@override_settings(BATCH_JOB_CHUNK=2)
+class BatchJobTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='author')
+        group = Group.objects.create(title='Группа', slug='group',
+                                     description='test')
+        cls.posts = [
+            Post.objects.create(text='Пост', author=author,
+                                group=group if number % 2 else None)
+            for number in range(6)
+        ]
+
+    def setUp(self):
+        calls.clear()
+
+    def test_job_runs_in_chunks(self):
+        """Выборка обрабатывается порциями по id с учётом прогресса."""
+        job = start(rename, Post.objects.exclude(group=None),
+                    {'text': 'Готово'})
+        run_batch_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, BatchJob.DONE)
+        self.assertEqual((job.total, job.processed, job.progress), (3, 3, 100))
+        self.assertEqual(calls, [[self.posts[1].pk, self.posts[3].pk],
+                                 [self.posts[5].pk]])
+        self.assertEqual(Post.objects.filter(text='Готово').count(), 3)
+
+    def test_selection_stored_as_ranges(self):
+        """Выборка хранится отрезками id и не растёт после запуска."""
+        pks = [post.pk for post in self.posts]
+        job = start(rename, Post.objects.exclude(pk=pks[2]),
+                    {'text': 'Готово'})
+        self.assertEqual(job.pk_ranges,
+                         [[pks[0], pks[1]], [pks[3], pks[5]]])
+        Post.objects.create(text='Новый', author=self.posts[0].author)
+        run_batch_job(job.pk)
+        self.assertEqual(Post.objects.filter(text='Готово').count(), 5)
+        self.assertTrue(Post.objects.filter(text='Новый').exists())
+
+    def test_job_resumes_after_failure(self):
+        """После сбоя задание продолжается с последней порции."""
+        job = start(rename, Post.objects.all(),
+                    {'text': 'Готово', 'fail_after': 1})
+        with self.assertRaises(RuntimeError):
+            run_batch_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.processed, 2)
+        self.assertIn('сбой', job.last_error)
+        BatchJob.objects.filter(pk=job.pk).update(params={'text': 'Готово'})
+        run_batch_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, BatchJob.DONE)
+        self.assertEqual(job.processed, 6)
+        self.assertEqual(len(calls), 3)
+
+    @override_settings(BATCH_JOB_SLICE=0)
+    def test_job_requeues_itself(self):
+        """Исчерпав время, задание ставит продолжение в очередь."""
+        job = start(rename, Post.objects.all(), {'text': 'Готово'})
+        with mock.patch('core.batch.enqueue') as enqueue:
+            run_batch_job(job.pk)
+        enqueue.assert_called_once_with(run_batch_job, (job.pk,))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed), (BatchJob.RUNNING, 2))
+
+    @override_settings(TASKS_MAX_ATTEMPTS=1)
+    def test_job_fails_when_attempts_exhausted(self):
+        """После последней попытки задание получает статус «Ошибка»."""
+        with self.captureOnCommitCallbacks(execute=True):
+            job = start(rename, Post.objects.all(),
+                        {'text': 'Готово', 'fail_after': 0})
+        self.assertEqual(run_task(claim(1)[0]), Task.FAILED)
+        job.refresh_from_db()
+        self.assertEqual(job.status, BatchJob.FAILED)
+        self.assertIsNotNone(job.finished)
+
+    @override_settings(TASKS_ALWAYS_EAGER=True)
+    def test_eager_job_fails(self):
+        """В синхронном режиме сбой сразу помечает задание."""
+        with self.assertRaises(RuntimeError):
+            with self.captureOnCommitCallbacks(execute=True):
+                job = start(rename, Post.objects.all(),
+                            {'text': 'Готово', 'fail_after': 0})
+        job.refresh_from_db()
+        self.assertEqual(job.status, BatchJob.FAILED)
@@ -0,0 +1,132 @@
+import gzip
+import zlib
+from unittest import mock, skipIf
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from .. import compression
+from ..middleware import CompressionMiddleware
+
+HTML = (
+    '<!DOCTYPE html>\n<html>\n  <body>\n    <!-- карточки -->\n'
+    '    <p>Первый    абзац</p>\n\n\n    <pre>  код\n    с отступом</pre>\n'
+    '    <!--[if IE]><p>IE</p><![endif]-->\n'
+    + '    <a href="/">ссылка</a>\n' * 40
+    + '  </body>\n</html>\n'
+)
+
+
+@override_settings(HTML_MINIFY=True)
+class CompressionTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def get(self, **headers):
+        request = self.factory.get('/', **headers)
+        request.user = AnonymousUser()
+        return request
+
+    def test_minify_html(self):
+        """Пробелы схлопываются, а <pre> и условные комментарии целы."""
+        html = compression.minify_html(HTML)
+        self.assertNotIn('карточки', html)
+        self.assertIn('<p>Первый абзац</p>\n<pre>', html)
+        self.assertIn('<pre>  код\n    с отступом</pre>', html)
+        self.assertIn('<!--[if IE]>', html)
+        self.assertTrue(html.startswith('<!DOCTYPE html>\n<html>\n<body>'))
+
+    def test_attribute_values_kept(self):
+        """Пробелы внутри значений атрибутов не схлопываются."""
+        html = compression.minify_html(
+            '<input   type="text"\n    value="a  b" title=\'x > y\'>'
+            '<p>c    d</p>'
+        )
+        self.assertEqual(
+            html, '<input type="text" value="a  b" title=\'x > y\'><p>c d</p>'
+        )
+
+    def test_binary_not_compressed(self):
+        """Картинки и другие нетекстовые ответы не сжимаются."""
+        middleware = CompressionMiddleware(
+            lambda request: HttpResponse(b'x' * 1000,
+                                         content_type='image/png')
+        )
+        response = middleware(self.get(HTTP_ACCEPT_ENCODING='gzip'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, b'x' * 1000)
+
+    def test_accepted_encodings(self):
+        """Кодировки с нулевым весом не принимаются."""
+        request = self.get(HTTP_ACCEPT_ENCODING='gzip;q=0, br;q=0.8, *')
+        self.assertEqual(
+            compression.accepted_encodings(request), {'br', '*'}
+        )
+
+    def test_middleware_minifies_and_compresses(self):
+        """Обычный HTML-ответ минифицируется и сжимается gzip."""
+        middleware = CompressionMiddleware(lambda request: HttpResponse(HTML))
+        response = middleware(self.get(HTTP_ACCEPT_ENCODING='gzip'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(
+            gzip.decompress(response.content).decode(),
+            compression.minify_html(HTML),
+        )
+
+    def test_middleware_streams(self):
+        """Потоковый ответ сжимается по кускам без Content-Length."""
+        chunks = [b'<p>' + b'x' * 500 + b'</p>'] * 3
+        middleware = CompressionMiddleware(
+            lambda request: StreamingHttpResponse(iter(chunks))
+        )
+        response = middleware(self.get(HTTP_ACCEPT_ENCODING='gzip'))
+        self.assertFalse(response.has_header('Content-Length'))
+        parts = list(response.streaming_content)
+        self.assertEqual(len(parts), len(chunks) + 1)
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        first = decompressor.decompress(parts[0])
+        self.assertEqual(first, chunks[0])
+
+    def test_cached_page_served_without_view(self):
+        """Попадание в кэш отдаёт готовый сжатый вариант."""
+        view = mock.Mock(return_value=HttpResponse(HTML))
+        cached = compression.cache_compressed(60, 'test')(view)
+        plain = cached(self.get())
+        packed = cached(self.get(HTTP_ACCEPT_ENCODING='gzip'))
+        self.assertEqual(view.call_count, 1)
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertEqual(plain.content.decode(),
+                         compression.minify_html(HTML))
+        self.assertEqual(packed['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(packed.content), plain.content)
+        passed = CompressionMiddleware(lambda request: packed)(self.get())
+        self.assertIs(passed, packed)
+
+    @skipIf(compression.brotli is None, 'brotli не установлен')
+    def test_brotli_preferred(self):
+        """При поддержке обоих вариантов выбирается brotli."""
+        cached = compression.cache_compressed(60, 'test')(
+            lambda request: HttpResponse(HTML)
+        )
+        response = cached(self.get(HTTP_ACCEPT_ENCODING='gzip, deflate, br'))
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(
+            compression.brotli.decompress(response.content).decode(),
+            compression.minify_html(HTML),
+        )
+
+    def test_csrf_pages_not_cached(self):
+        """Страница с CSRF-токеном не попадает в общий кэш."""
+        def view(request):
+            request.META['CSRF_COOKIE_USED'] = True
+            return HttpResponse(HTML)
+
+        view = mock.Mock(side_effect=view)
+        cached = compression.cache_compressed(60, 'test')(view)
+        cached(self.get())
+        cached(self.get())
+        self.assertEqual(view.call_count, 2)
@@ -0,0 +1,51 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+from ..metrics import Histogram
+
+User = get_user_model()
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        Post.objects.create(text="Тестовый пост", author=cls.author)
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Бакеты гистограммы накапливают значения по возрастанию."""
+        histogram = Histogram('test_seconds', 'Тест', buckets=(1, 5))
+        for value in (0.5, 3, 7):
+            histogram.observe(value, 'view')
+        self.assertEqual(list(histogram.collect()), [
+            'test_seconds_bucket{view="view",le="1"} 1',
+            'test_seconds_bucket{view="view",le="5"} 2',
+            'test_seconds_bucket{view="view",le="+Inf"} 3',
+            'test_seconds_sum{view="view"} 10.5',
+            'test_seconds_count{view="view"} 3',
+        ])
+
+    def test_request_is_measured_by_url_name(self):
+        """Запрос к странице попадает в метрики под именем URL."""
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        content = response.content.decode()
+        for name in (
+            'yatube_request_duration_seconds_count{view="posts:index"}',
+            'yatube_db_queries_count{view="posts:index"}',
+            'yatube_template_render_seconds_count{view="posts:index"}',
+        ):
+            with self.subTest(name=name):
+                self.assertIn(name, content)
+
+    @override_settings(METRICS_ALLOWED_IPS=[])
+    def test_metrics_hidden_from_other_ips(self):
+        """Метрики недоступны с адресов не из списка."""
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
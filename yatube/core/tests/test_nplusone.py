@@ -0,0 +1,51 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.template import engines
+from django.test import TestCase
+
+from posts.models import Post
+from ..nplusone import QueryTracker, fingerprint
+
+User = get_user_model()
+
+TEMPLATE = (
+    '{% for post in posts %}{{ post.author.username }}{% endfor %}'
+)
+
+
+class NPlusOneTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for x in range(3):
+            author = User.objects.create_user(username=f'author{x}')
+            Post.objects.create(text='Тестовый пост', author=author)
+
+    def render(self, posts):
+        tracker = QueryTracker(threshold=3)
+        with connection.execute_wrapper(tracker):
+            engines['django'].from_string(TEMPLATE).render({'posts': posts})
+        return tracker.offenders()
+
+    def test_fingerprint(self):
+        """Литералы и списки IN не влияют на отпечаток запроса."""
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE a = 'x' AND b IN (%s, %s)"),
+            fingerprint("SELECT * FROM t WHERE a = 'y' AND b IN (%s)"),
+        )
+
+    def test_lazy_fk_in_template_is_detected(self):
+        """Ленивая загрузка автора в цикле шаблона находится."""
+        offenders = self.render(Post.objects.all())
+        self.assertEqual(len(offenders), 1)
+        shape, count, template, code = offenders[0]
+        self.assertIn('auth_user', shape)
+        self.assertEqual(count, 3)
+        self.assertTrue(template.endswith(':1'))
+        self.assertIn('test_nplusone.py', code)
+
+    def test_joined_queryset_is_clean(self):
+        """С select_related повторяющихся запросов нет."""
+        self.assertEqual(
+            self.render(Post.objects.select_related('author')), []
+        )
@@ -0,0 +1,57 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Post
+from ..ratelimit import check, parse_rate
+
+User = get_user_model()
+
+
+class RateLimitTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.post = Post.objects.create(text="Тестовый пост", author=cls.author)
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_parse_rate(self):
+        """Правило разбирается на методы, количество и период."""
+        self.assertEqual(parse_rate('10/m'), (None, 10, 60))
+        self.assertEqual(
+            parse_rate('POST,PUT:3/5s'), (frozenset({'POST', 'PUT'}), 3, 5)
+        )
+        with self.assertRaises(ValueError):
+            parse_rate('10 per minute')
+
+    def test_window_slides(self):
+        """Лимит восстанавливается по мере ухода старых запросов."""
+        for _ in range(3):
+            self.assertEqual(check('scope', 'ident', 3, 60, now=60), 0)
+        self.assertEqual(check('scope', 'ident', 3, 60, now=61), 59)
+        self.assertEqual(check('scope', 'ident', 3, 60, now=125), 15)
+        self.assertEqual(check('scope', 'ident', 3, 60, now=170), 0)
+
+    @override_settings(RATELIMITS={'posts:add_comment': 'POST:2/m'})
+    def test_too_many_comments(self):
+        """Запрос сверх лимита получает 429 и Retry-After."""
+        url = reverse('posts:add_comment', kwargs={'post_id': self.post.pk})
+        for _ in range(2):
+            response = self.authorized_client.post(url, {'text': 'Текст'})
+            self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        response = self.authorized_client.post(url, {'text': 'Текст'})
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertTrue(int(response['Retry-After']) > 0)
+        self.assertEqual(Comment.objects.count(), 2)
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
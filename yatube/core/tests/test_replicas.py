@@ -0,0 +1,53 @@
+from django.contrib.sessions.models import Session
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import resolve
+
+from posts.models import Post
+from .. import db
+from ..middleware import ReplicaMiddleware
+
+
+@override_settings(DATABASE_REPLICAS=['replica_0'])
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        self.router = db.ReplicaRouter()
+        self.factory = RequestFactory()
+        self.addCleanup(db.lagging.clear)
+        db.last_check = float('inf')
+        self.addCleanup(setattr, db, 'last_check', float('-inf'))
+
+    def process(self, request, status=200):
+        """Прогоняет запрос через middleware; возвращает базы и ответ."""
+        request.resolver_match = resolve(request.path)
+        used = {}
+
+        def get_response(request):
+            middleware.process_view(request, None, (), {})
+            used['post'] = self.router.db_for_read(Post)
+            used['session'] = self.router.db_for_read(Session)
+            return HttpResponse(status=status)
+
+        middleware = ReplicaMiddleware(get_response)
+        return used, middleware(request)
+
+    def test_read_only_view_uses_replica(self):
+        """Лента читается с реплики, сессии — с основной базы."""
+        used, _ = self.process(self.factory.get('/'))
+        self.assertEqual(used, {'post': 'replica_0', 'session': 'default'})
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_pinned_after_write(self):
+        """После записи пользователь читает с основной базы."""
+        _, response = self.process(self.factory.post('/create/'))
+        self.assertIn('primary_pin', response.cookies)
+        request = self.factory.get('/')
+        request.COOKIES['primary_pin'] = '1'
+        used, _ = self.process(request)
+        self.assertEqual(used['post'], 'default')
+
+    def test_lagging_replica_skipped(self):
+        """Отставшая реплика не используется для чтения."""
+        db.lagging.add('replica_0')
+        used, _ = self.process(self.factory.get('/'))
+        self.assertEqual(used['post'], 'default')
@@ -0,0 +1,44 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.template import engines
+from django.test import SimpleTestCase
+
+from .. import startup
+
+
+class StartupTests(SimpleTestCase):
+    def test_template_names(self):
+        """В список прогрева попадают шаблоны проекта и приложений."""
+        names = startup.template_names(engines['django'])
+        self.assertIn('posts/index.html', names)
+        self.assertIn('admin/base.html', names)
+
+    def test_warm_up(self):
+        """Прогрев компилирует шаблоны без ошибок и замеряет шаги."""
+        timings = startup.warm_up()
+        self.assertGreater(timings['templates_compiled'], 0)
+        self.assertEqual(timings['templates_failed'], 0)
+        for step in ('urls', 'templates', 'translations', 'libraries'):
+            self.assertIn(step, timings)
+
+    def test_bench_startup(self):
+        """Команда пишет замеры холодного и прогретого старта."""
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'startup.json')
+            call_command(
+                'bench_startup', modules='yatube.settings_production',
+                runs=1, output=output, stdout=StringIO(),
+            )
+            with open(output) as file:
+                report = json.load(file)
+        self.assertEqual(set(report), {
+            'yatube.settings_production:cold',
+            'yatube.settings_production:warm',
+        })
+        for row in report.values():
+            self.assertGreater(row['ready_ms'], 0)
+            self.assertGreater(row['master_rss_kb'], 0)
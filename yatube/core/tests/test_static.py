@@ -0,0 +1,88 @@
+import gzip
+import os
+import shutil
+import tempfile
+from http import HTTPStatus
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.utils.http import http_date
+
+from ..middleware import StaticFilesMiddleware
+from ..storage import compress_file
+
+CSS = b'body { margin: 0; padding: 0; }\n' * 100
+
+
+class StaticFilesTests(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.path = os.path.join(self.root, 'site.0123456789ab.css')
+        with open(self.path, 'wb') as file:
+            file.write(CSS)
+        with open(os.path.join(self.root, 'robots.txt'), 'wb') as file:
+            file.write(b'User-agent: *\n')
+        compress_file(self.path)
+        self.factory = RequestFactory()
+        settings = override_settings(
+            STATIC_SERVE=True, STATIC_ROOT=self.root, STATIC_URL='/static/',
+            STATIC_ACCEL_REDIRECT='',
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.middleware = StaticFilesMiddleware(
+            lambda request: HttpResponse('view')
+        )
+
+    def get(self, name, **headers):
+        return self.middleware(self.factory.get(f'/static/{name}', **headers))
+
+    def test_compress_file(self):
+        """Рядом с файлом появляется сжатая копия, а мелочь не сжимается."""
+        self.assertEqual(
+            gzip.decompress(open(self.path + '.gz', 'rb').read()), CSS
+        )
+        small = os.path.join(self.root, 'robots.txt')
+        self.assertEqual(compress_file(small), [])
+
+    def test_hashed_file_is_immutable_and_compressed(self):
+        """Файл с хэшем кэшируется навсегда и отдаётся сжатым."""
+        response = self.get('site.0123456789ab.css',
+                            HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertIn('immutable', response['Cache-Control'])
+        body = b''.join(response.streaming_content)
+        self.assertEqual(gzip.decompress(body), CSS)
+
+    def test_refused_encoding_not_served(self):
+        """Кодировка с нулевым весом не выбирается."""
+        response = self.get('site.0123456789ab.css',
+                            HTTP_ACCEPT_ENCODING='gzip;q=0, identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(response.streaming_content), CSS)
+
+    def test_plain_file(self):
+        """Без Accept-Encoding и хэша — исходный файл и короткий кэш."""
+        response = self.get('robots.txt')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['Cache-Control'], 'public, max-age=3600')
+        response = self.get('robots.txt', HTTP_IF_MODIFIED_SINCE=http_date())
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_missing_file_falls_through(self):
+        """Неизвестный или выходящий за корень путь отдаёт представлению."""
+        self.assertEqual(self.get('missing.css').content, b'view')
+        self.assertEqual(self.get('../etc/passwd').content, b'view')
+
+    def test_accel_redirect(self):
+        """С X-Accel-Redirect тело отдаёт nginx."""
+        with override_settings(STATIC_ACCEL_REDIRECT='/protected/'):
+            response = self.get('site.0123456789ab.css',
+                                HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['X-Accel-Redirect'],
+                         '/protected/site.0123456789ab.css.gz')
+        self.assertEqual(response.content, b'')
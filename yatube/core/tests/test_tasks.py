@@ -0,0 +1,81 @@
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Task
+from ..tasks import claim, enqueue, run_task, task
+
+User = get_user_model()
+
+CALLS = []
+
+
+@task
+def remember(value):
+    CALLS.append(value)
+
+
+@task(max_attempts=2)
+def explode():
+    raise ValueError('boom')
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_delay_runs_task_later(self):
+        """Задача выполняется обработчиком, а не в момент постановки."""
+        remember.delay('x')
+        self.assertEqual(CALLS, [])
+        pks = claim(10)
+        self.assertEqual(Task.objects.get(pk=pks[0]).status, Task.RUNNING)
+        self.assertEqual(run_task(pks[0]), Task.DONE)
+        self.assertEqual(CALLS, ['x'])
+
+    def test_priority_order(self):
+        """Задачи с большим приоритетом забираются первыми."""
+        low = enqueue(remember, ['low'])
+        high = enqueue(remember, ['high'], priority=5)
+        self.assertEqual(claim(2), [high.pk, low.pk])
+
+    def test_retry_then_fail(self):
+        """Упавшая задача повторяется, пока не исчерпаны попытки."""
+        job = explode.delay()
+        self.assertEqual(run_task(claim(1)[0]), Task.PENDING)
+        Task.objects.filter(pk=job.pk).update(run_after=job.created)
+        self.assertEqual(run_task(claim(1)[0]), Task.FAILED)
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 2)
+        self.assertIn('ValueError', job.last_error)
+
+    def test_deleted_task_skipped(self):
+        """Удалённая после захвата задача пропускается без ошибки."""
+        remember.delay('x')
+        pk = claim(1)[0]
+        Task.objects.filter(pk=pk).delete()
+        with self.assertLogs('core.tasks', 'WARNING'):
+            self.assertIsNone(run_task(pk))
+        self.assertEqual(CALLS, [])
+
+    @override_settings(TASKS_ALWAYS_EAGER=True)
+    def test_eager_mode(self):
+        """В синхронном режиме задача выполняется сразу."""
+        remember.delay('now')
+        self.assertEqual(CALLS, ['now'])
+        self.assertFalse(Task.objects.exists())
+
+    def test_password_reset_mail_is_queued(self):
+        """Письмо сброса пароля отправляет обработчик очереди."""
+        User.objects.create_user(
+            username='user', email='user@example.com', password='pass'
+        )
+        Client().post(
+            reverse('users:password_reset_form'),
+            {'email': 'user@example.com'},
+        )
+        self.assertEqual(len(mail.outbox), 0)
+        for pk in claim(10):
+            run_task(pk)
+        self.assertEqual(len(mail.outbox), 1)
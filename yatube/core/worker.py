@@ -0,0 +1,15 @@
+"""Точка входа процессов пула обработчика задач.
+
+Модуль не импортирует модели на верхнем уровне: в процесс, запущенный
+через spawn, он загружается раньше, чем выполнится ``django.setup()``.
+"""
+
+
+def setup():
+    import django
+    django.setup()
+
+
+def run(pk):
+    from .tasks import run_in_worker
+    return run_in_worker(pk)
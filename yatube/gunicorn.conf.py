@@ -0,0 +1,41 @@
+"""Конфигурация gunicorn: ``gunicorn -c gunicorn.conf.py``.
+
+Приложение загружается и прогревается в мастере до fork (preload),
+поэтому воркеры стартуют сразу готовыми и делят память с мастером.
+"""
+import multiprocessing
+import os
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings_production')
+os.environ.setdefault('DJANGO_DOTENV', '0')
+
+wsgi_app = 'yatube.wsgi:application'
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(
+    os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1)
+)
+preload_app = True
+# воркер перезапускается после max_requests запросов со случайным
+# разбросом, чтобы не все сразу
+max_requests = 2000
+max_requests_jitter = 200
+timeout = 30
+accesslog = '-'
+
+
+def when_ready(server):
+    if not server.cfg.preload_app:
+        return
+    from core.startup import freeze, warm_up
+
+    timings = warm_up()
+    freeze()
+    server.log.info('Прогрев до fork: %s', timings)
+
+
+def post_worker_init(worker):
+    # без preload каждый воркер прогревается сам
+    if not worker.cfg.preload_app:
+        from core.startup import warm_up
+
+        warm_up()
@@ -1,35 +1,310 @@
-from django.contrib import admin
+"""Админка, которая остаётся быстрой на миллионах записей.
 
-from .models import Comment, Follow, Group, Post
+Число записей оценивается планировщиком PostgreSQL вместо COUNT(*),
+общий счётчик без фильтров не запрашивается, связанные объекты
+приходят одним JOIN, а внешние ключи редактируются полями с поиском
+вместо выпадающих списков со всеми строками. В порядке по умолчанию
+список листается курсором по индексу, и глубина пролистывания не
+влияет на время запроса. Пользователи и группы удаляются через
+``posts.deletion``: запись сразу скрывается, а связанные строки
+удаляются в фоне.
+"""
+import json
 
+from django import forms
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
+from django.contrib.admin.widgets import ForeignKeyRawIdWidget
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.urls import reverse
+from django.utils.functional import cached_property
+from django.utils.html import format_html
 
-class PostAdmin(admin.ModelAdmin):
+from core import batch
+
+from . import bulk, deletion
+from .models import Comment, Follow, Group, Post, User
+from .utils import decode_cursor, encode_cursor
+
+CURSOR_VAR = 'cursor'
+
+
+def estimate_count(queryset):
+    """Оценка числа строк по плану запроса; None, если не PostgreSQL."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Точный COUNT(*) только для оценки меньше ADMIN_EXACT_COUNT_LIMIT."""
+    estimated = False
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is None or estimate < settings.ADMIN_EXACT_COUNT_LIMIT:
+            return Paginator.count.func(self)
+        self.estimated = True
+        return estimate
+
+
+def after_cursor(queryset, cursor, field):
+    """Записи после курсора в порядке убывания (field, pk)."""
+    if field == 'pk':
+        queryset = queryset.order_by('-pk')
+        if cursor and cursor.isdigit():
+            queryset = queryset.filter(pk__lt=int(cursor))
+        return queryset
+    queryset = queryset.order_by(f'-{field}', '-pk')
+    position = decode_cursor(cursor) if cursor else None
+    if position is not None:
+        moment, pk = position
+        queryset = queryset.filter(
+            Q(**{f'{field}__lt': moment}) | Q(**{field: moment, 'pk__lt': pk})
+        )
+    return queryset
+
+
+def cursor_for(item, field):
+    if field == 'pk':
+        return str(item.pk)
+    return encode_cursor(getattr(item, field), item.pk)
+
+
+class KeysetChangeList(ChangeList):
+    """Список изменений, который без сортировки по столбцу листается
+    курсором вместо номера страницы."""
+    def __init__(self, request, *args, **kwargs):
+        self.cursor = request.GET.get(CURSOR_VAR)
+        super().__init__(request, *args, **kwargs)
+        self.params.pop(CURSOR_VAR, None)
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_results(self, request):
+        field = self.model_admin.keyset_field
+        self.keyset = bool(field) and ORDER_VAR not in self.params
+        if not self.keyset or self.show_all:
+            self.keyset = False
+            return super().get_results(request)
+        self.paginator = self.model_admin.get_paginator(
+            request, self.queryset, self.list_per_page
+        )
+        self.result_count = self.paginator.count
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.can_show_all = False
+        self.result_list = after_cursor(
+            self.queryset, self.cursor, field
+        )[:self.list_per_page]
+        items = list(self.result_list)
+        self.next_cursor = None
+        if len(items) == self.list_per_page:
+            self.next_cursor = cursor_for(items[-1], field)
+        self.multi_page = bool(self.cursor or self.next_cursor)
+
+    @property
+    def next_url(self):
+        return self.get_query_string({CURSOR_VAR: self.next_cursor})
+
+    @property
+    def first_url(self):
+        return self.get_query_string()
+
+
+class BulkActionForm(ActionForm):
+    target = forms.CharField(
+        label='Цель', required=False,
+        help_text='slug группы или имя автора',
+    )
+
+
+def resolve_target(kind, value):
+    """Параметры действия по значению поля «Цель»."""
+    if kind == 'group':
+        if not value:
+            return {'group_id': None}
+        return {'group_id': Group.objects.values_list('pk', flat=True)
+                .get(slug=value, is_active=True)}
+    return {'author_id': User.objects.values_list('pk', flat=True)
+            .get(username=value, is_active=True)}
+
+
+def background_action(action, description, target=None,
+                      permission='change'):
+    """Админ-действие, которое ставит ``action`` над выборкой в очередь
+    вместо выполнения в запросе; ``target`` — 'group' или 'author'."""
+    @admin.action(description=description, permissions=[permission])
+    def admin_action(modeladmin, request, queryset):
+        params = {}
+        if target:
+            value = request.POST.get('target', '').strip()
+            try:
+                params = resolve_target(target, value)
+            except (Group.DoesNotExist, User.DoesNotExist):
+                modeladmin.message_user(
+                    request, f'Не найдено: «{value}».', messages.ERROR
+                )
+                return
+        job = batch.start(action, queryset, params, request.user)
+        modeladmin.message_user(request, format_html(
+            'Задание <a href="{}">№{}</a> поставлено в очередь.',
+            reverse('admin:core_batchjob_change', args=(job.pk,)), job.pk,
+        ))
+
+    admin_action.__name__ = action.__name__
+    return admin_action
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    action_form = BulkActionForm
+    # поле даты для курсора (вместе с pk), 'pk' — курсор только по pk
+    keyset_field = None
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+    def get_actions(self, request):
+        # штатное удаление собирает все связанные объекты в одном запросе
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+
+class BackgroundDeleteAdmin(admin.ModelAdmin):
+    """Удаление, которое скрывает запись и чистит связанные строки в
+    фоне вместо каскада в запросе."""
+    # функция из posts.deletion, которая выключает запись и ставит
+    # её чистку в очередь
+    delete_service = None
+
+    def get_deleted_objects(self, objs, request):
+        # сборщик обошёл бы все связанные записи ради страницы подтверждения
+        objs = list(objs)
+        perms_needed = set()
+        if not self.has_delete_permission(request):
+            perms_needed.add(self.opts.verbose_name)
+        return ([str(obj) for obj in objs],
+                {self.opts.verbose_name_plural: len(objs)}, perms_needed, [])
+
+    def delete_model(self, request, obj):
+        self.delete_service(obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            self.delete_service(obj)
+
+
+class PlainRawIdWidget(ForeignKeyRawIdWidget):
+    """Поле id с окном выбора без запроса подписи для каждой строки."""
+    def label_and_url_for_value(self, value):
+        return '', ''
+
+
+class PostAdmin(ScalableAdmin):
     list_display = (
         "pk",
         "text",
         "pub_date",
         "author",
+        "group_title",
         "group",
     )
     list_editable = ("group",)
+    list_select_related = ("author", "group")
     search_fields = ("text",)
     list_filter = ("pub_date",)
+    date_hierarchy = "pub_date"
+    autocomplete_fields = ("author", "group")
     empty_value_display = "-пусто-"
+    keyset_field = "pub_date"
+    actions = (
+        background_action(bulk.delete_posts, "Удалить в фоне",
+                          permission="delete"),
+        background_action(bulk.move_posts, "Перенести в группу",
+                          target="group"),
+        background_action(bulk.reassign_posts, "Передать автору",
+                          target="author"),
+    )
+
+    @admin.display(description="Группа", ordering="group__title")
+    def group_title(self, post):
+        return post.group.title if post.group else None
+
+    def get_changelist_form(self, request, **kwargs):
+        kwargs.setdefault("widgets", {
+            "group": PlainRawIdWidget(
+                Post._meta.get_field("group").remote_field, self.admin_site
+            ),
+        })
+        return super().get_changelist_form(request, **kwargs)
+
 
+class GroupAdmin(BackgroundDeleteAdmin):
+    list_display = ('title', 'slug', 'is_active')
+    list_filter = ('is_active',)
+    search_fields = ('title', 'slug')
+    delete_service = staticmethod(deletion.delete_group)
 
-class CommentAdmin(admin.ModelAdmin):
+
+class UserAdmin(BackgroundDeleteAdmin, BaseUserAdmin):
+    delete_service = staticmethod(deletion.delete_user)
+
+
+class CommentAdmin(ScalableAdmin):
     list_display = ('text', 'author', 'post')
+    list_select_related = ('author', 'post')
     search_fields = ('text',)
     list_filter = ('created',)
+    date_hierarchy = 'created'
+    autocomplete_fields = ('author',)
+    raw_id_fields = ('post',)
+    keyset_field = 'created'
+    actions = (
+        background_action(bulk.delete_comments, 'Удалить в фоне',
+                          permission='delete'),
+        background_action(bulk.reassign_comments, 'Передать автору',
+                          target='author'),
+    )
 
 
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(ScalableAdmin):
     list_display = ('user', 'author',)
-    search_fields = ('author',)
-    list_filter = ('user',)
+    list_select_related = ('user', 'author')
+    # поиск по точному имени вместо фильтра со списком всех пользователей
+    search_fields = ('=user__username', '=author__username')
+    autocomplete_fields = ('user', 'author')
+    keyset_field = 'pk'
+    actions = (
+        background_action(bulk.delete_follows, 'Удалить в фоне',
+                          permission='delete'),
+        background_action(bulk.reassign_follows, 'Перевести на автора',
+                          target='author'),
+    )
 
 
 admin.site.register(Post, PostAdmin)
-admin.site.register(Group)
+admin.site.register(Group, GroupAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Follow, FollowAdmin)
+admin.site.unregister(User)
+admin.site.register(User, UserAdmin)
@@ -0,0 +1,182 @@
+"""Замеры рендеринга шаблонов лент и страницы поста.
+
+Контексты собираются из несохранённых объектов, а все запросы к БД во
+время рендеринга запрещены, поэтому замер показывает чистую стоимость
+шаблона. Миниатюры берутся из хранилища ключей в памяти — как при
+прогретом кэше sorl.thumbnail в продакшене.
+"""
+import io
+import os
+import statistics
+import tempfile
+from contextlib import ExitStack, contextmanager
+from datetime import timedelta
+from time import perf_counter
+from unittest import mock
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.template.loader import get_template
+from django.test import RequestFactory, override_settings
+from django.urls import resolve, reverse
+from django.utils import timezone
+from PIL import Image
+from sorl.thumbnail import default
+from sorl.thumbnail.kvstores.base import KVStoreBase
+
+from .forms import CommentForm
+from .models import Comment, Group, Post, User
+
+TEMPLATES = ('index', 'group_list', 'profile', 'follow', 'post_detail')
+PAGES = 20
+TEXT = (
+    'Далеко-далеко за словесными горами в стране гласных и согласных '
+    'живут рыбные тексты. Вдали от всех живут они в буквенных домах '
+    'на берегу Семантика большого языкового океана.'
+)
+
+
+class MemoryKVStore(KVStoreBase):
+    def __init__(self):
+        super().__init__()
+        self.data = {}
+
+    def _get_raw(self, key):
+        return self.data.get(key)
+
+    def _set_raw(self, key, value):
+        self.data[key] = value
+
+    def _delete_raw(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def _find_keys_raw(self, prefix):
+        return [key for key in self.data if key.startswith(prefix)]
+
+
+class QueryInTemplate(Exception):
+    pass
+
+
+def forbid_queries(execute, sql, params, many, context):
+    raise QueryInTemplate(f'Шаблон обращается к БД: {sql}')
+
+
+@contextmanager
+def isolated():
+    """Временное хранилище картинок, миниатюры в памяти, БД запрещена."""
+    with ExitStack() as stack:
+        media_root = stack.enter_context(tempfile.TemporaryDirectory())
+        stack.enter_context(override_settings(MEDIA_ROOT=media_root))
+        stack.enter_context(
+            mock.patch.object(default, 'kvstore', MemoryKVStore())
+        )
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(forbid_queries))
+        os.makedirs(os.path.join(media_root, 'posts'))
+        buffer = io.BytesIO()
+        Image.new('RGB', (1280, 720), (90, 140, 200)).save(buffer, 'JPEG')
+        with open(os.path.join(media_root, 'posts', 'bench.jpg'), 'wb') as f:
+            f.write(buffer.getvalue())
+        yield
+
+
+def build_objects(size):
+    now = timezone.now()
+    group = Group(pk=1, title='Тестовая группа', slug='test-group',
+                  description=TEXT)
+    authors = [
+        User(pk=number, username=f'author{number}',
+             first_name='Лев', last_name=f'Толстой {number}')
+        for number in range(1, 6)
+    ]
+    posts = [
+        Post(
+            pk=number,
+            text=TEXT,
+            author=authors[number % len(authors)],
+            group=group if number % 2 else None,
+            image='posts/bench.jpg' if number % 3 == 0 else '',
+            pub_date=now - timedelta(hours=number),
+            comments_count=size,
+        )
+        for number in range(1, size * PAGES + 1)
+    ]
+    comments = [
+        Comment(pk=number, post=posts[0], author=authors[number % 5],
+                text=TEXT, created=now - timedelta(minutes=number))
+        for number in range(1, size + 1)
+    ]
+    return group, authors, posts, comments
+
+
+def build_case(name, size, using=None):
+    """Шаблон, контекст и запрос для страницы с size записями."""
+    group, authors, posts, comments = build_objects(size)
+    page_obj = Paginator(posts, size).get_page(1)
+    post = posts[0]
+    cases = {
+        'index': ('posts/index.html', reverse('posts:index'),
+                  {'index': True, 'page_obj': page_obj}),
+        'group_list': (
+            'posts/group_list.html',
+            reverse('posts:group_list', args=(group.slug,)),
+            {'group': group, 'page_obj': page_obj},
+        ),
+        'profile': (
+            'posts/profile.html',
+            reverse('posts:profile', args=(authors[0].username,)),
+            {'author': authors[0], 'page_obj': page_obj, 'following': False,
+             'suggestions': authors[1:]},
+        ),
+        'follow': ('posts/follow.html', reverse('posts:follow_index'),
+                   {'follow': True, 'page_obj': page_obj,
+                    'suggestions': authors[1:]}),
+        'post_detail': (
+            'posts/post_detail.html',
+            reverse('posts:post_detail', args=(post.pk,)),
+            {
+                'post': post,
+                'form': CommentForm(),
+                'comments': comments,
+                'comments_cursor': None,
+                'author_posts_count': size,
+            },
+        ),
+    }
+    template_name, url, context = cases[name]
+    request = RequestFactory().get(url)
+    request.resolver_match = resolve(url)
+    request.user = authors[0]
+    request.session = {}
+    return get_template(template_name, using=using), context, request
+
+
+def measure(template, context, request, number, repeat):
+    """Лучшее и медианное время одного рендеринга, в миллисекундах."""
+    template.render(context, request)
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        for _ in range(number):
+            template.render(context, request)
+        timings.append((perf_counter() - start) / number * 1000)
+    return min(timings), statistics.median(timings)
+
+
+def run(sizes, number=20, repeat=5, templates=TEMPLATES, using=None):
+    results = {}
+    suffix = f':{using}' if using else ''
+    with isolated():
+        for name in templates:
+            for size in sizes:
+                template, context, request = build_case(name, size, using)
+                best, median = measure(
+                    template, context, request, number, repeat
+                )
+                results[f'{name}:{size}{suffix}'] = {
+                    'best_ms': round(best, 4),
+                    'median_ms': round(median, 4),
+                }
+    return results
@@ -0,0 +1,134 @@
+"""Массовые действия над постами, комментариями и подписками.
+
+Каждая функция получает одну порцию записей из ``core.batch`` и
+меняет её одним ``UPDATE`` или удаляет одним ``DELETE`` без загрузки
+объектов в память, поэтому сигналы моделей не срабатывают: счётчики и
+кэши, которые они поддерживают, обновляются здесь же.
+"""
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Min, Q
+from sorl.thumbnail import delete as delete_thumbnails
+
+from core.batch import batch_action
+
+from . import markup, tags, unread
+from .models import Comment, Follow, Mention, Post, PostTag
+from .utils import following_cache_key, invalidate_counts
+
+
+def raw_delete(queryset):
+    """DELETE по условию выборки, без сборщика связанных объектов."""
+    return queryset._raw_delete(queryset.db)
+
+
+def delete_images(names):
+    for name in names:
+        delete_thumbnails(name)
+
+
+def forget_following(user_ids):
+    keys = [following_cache_key(user_id) for user_id in user_ids]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def decrement_comments_count(comments):
+    """Уменьшает comments_count постов на число удаляемых комментариев."""
+    by_count = defaultdict(list)
+    for row in (comments.exclude(post=None).values('post')
+                .annotate(count=Count('pk')).order_by()):
+        by_count[row['count']].append(row['post'])
+    for count, post_ids in by_count.items():
+        Post.objects.filter(pk__in=post_ids).update(
+            comments_count=F('comments_count') - count
+        )
+
+
+def post_authors(posts):
+    return set(posts.values_list('author_id', flat=True))
+
+
+@batch_action
+def delete_posts(posts):
+    images = list(posts.exclude(image='').values_list('image', flat=True))
+    authors = post_authors(posts)
+    for model in (Comment, PostTag, Mention):
+        raw_delete(model.objects.filter(post__in=posts.values('pk')))
+    raw_delete(posts)
+    invalidate_counts()
+    unread.forget_recent(authors)
+    transaction.on_commit(lambda: delete_images(images))
+
+
+@batch_action
+def move_posts(posts, group_id):
+    posts.update(group=group_id)
+    invalidate_counts()
+
+
+@batch_action
+def reassign_posts(posts, author_id):
+    authors = post_authors(posts) | {author_id}
+    posts.update(author=author_id)
+    invalidate_counts()
+    unread.forget_recent(authors)
+
+
+@batch_action
+def delete_comments(comments):
+    decrement_comments_count(comments)
+    raw_delete(comments)
+
+
+@batch_action
+def reassign_comments(comments, author_id):
+    comments.update(author=author_id)
+
+
+@batch_action
+def delete_follows(follows):
+    user_ids = set(follows.values_list('user_id', flat=True))
+    raw_delete(follows)
+    forget_following(user_ids)
+
+
+@batch_action
+def reassign_follows(follows, author_id):
+    user_ids = set(follows.values_list('user_id', flat=True))
+    # подписка на себя и повторная подписка нарушили бы уникальность
+    raw_delete(follows.exclude(author=author_id).filter(
+        Q(user=author_id)
+        | Q(user__in=Follow.objects.filter(author=author_id).values('user'))
+    ))
+    first = follows.values('user').annotate(first=Min('pk')).order_by()
+    raw_delete(follows.exclude(pk__in=first.values('first')))
+    follows.update(author=author_id)
+    forget_following(user_ids)
+
+
+@batch_action
+def delete_suggestions(suggestions):
+    raw_delete(suggestions)
+
+
+@batch_action
+def delete_mentions(mentions):
+    raw_delete(mentions)
+
+
+@batch_action
+def render_markup(objects):
+    """Пересчитывает text_html порции текущей версией рендерера, а у
+    постов заодно их теги и упоминания."""
+    rows = list(objects)
+    for row in rows:
+        row.text_html = markup.render(row.text)
+        row.markup_version = markup.VERSION
+        if isinstance(row, Post):
+            tags.index_post(row)
+    objects.model._base_manager.bulk_update(
+        rows, ['text_html', 'markup_version']
+    )
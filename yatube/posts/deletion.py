@@ -0,0 +1,79 @@
+"""Удаление пользователей и групп без долгих блокировок.
+
+Сборщик ``delete()`` загрузил бы в память все связанные записи и держал
+бы блокировки до конца каскада. Вместо этого запись сразу помечается
+неактивной — её посты, комментарии и страница пропадают из лент, — а
+задача ``purge_*`` по очереди запускает массовые действия
+``posts.bulk`` над связанными строками. Каждое из них идёт порциями в
+фоне и по завершении снова ставит задачу в очередь; когда ссылок не
+остаётся, удаляется сама запись.
+"""
+from django.db import transaction
+from django.db.models import Q
+
+from core import batch
+from core.tasks import enqueue_on_commit, task
+
+from . import bulk
+from .models import (Comment, Follow, FollowSuggestion, Group, Mention, Post,
+                     User)
+
+
+def user_steps(user_id):
+    # посты раньше комментариев: вместе с постами уходят и ответы на них
+    return (
+        (bulk.delete_posts, Post.objects.filter(author=user_id), {}),
+        (bulk.delete_comments, Comment.objects.filter(author=user_id), {}),
+        (bulk.delete_follows,
+         Follow.objects.filter(Q(user=user_id) | Q(author=user_id)), {}),
+        (bulk.delete_suggestions, FollowSuggestion.objects.filter(
+            Q(user=user_id) | Q(author=user_id)), {}),
+        (bulk.delete_mentions, Mention.objects.filter(user=user_id), {}),
+    )
+
+
+def group_steps(group_id):
+    return (
+        (bulk.move_posts, Post.objects.filter(group=group_id),
+         {'group_id': None}),
+    )
+
+
+def start_next_step(steps, purge, pk):
+    """Запускает первое действие с непустой выборкой; False, если
+    удалять больше нечего."""
+    for action, queryset, params in steps:
+        if queryset.exists():
+            batch.start(action, queryset, params, then=purge,
+                        then_args=(pk,))
+            return True
+    return False
+
+
+@transaction.atomic
+def delete_user(user):
+    """Выключает учётную запись и ставит удаление её данных в очередь."""
+    user.is_active = False
+    user.set_unusable_password()
+    user.save(update_fields=['is_active', 'password'])
+    enqueue_on_commit(purge_user, (user.pk,))
+
+
+@transaction.atomic
+def delete_group(group):
+    """Скрывает группу и ставит отвязку её постов в очередь."""
+    group.is_active = False
+    group.save(update_fields=['is_active'])
+    enqueue_on_commit(purge_group, (group.pk,))
+
+
+@task
+def purge_user(user_id):
+    if not start_next_step(user_steps(user_id), purge_user, user_id):
+        User.objects.filter(pk=user_id, is_active=False).delete()
+
+
+@task
+def purge_group(group_id):
+    if not start_next_step(group_steps(group_id), purge_group, group_id):
+        Group.objects.filter(pk=group_id, is_active=False).delete()
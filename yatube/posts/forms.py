@@ -1,6 +1,6 @@
 from django import forms
 
-from .models import Comment, Post
+from .models import Comment, Group, Post
 
 
 class PostForm(forms.ModelForm):
@@ -19,6 +19,10 @@ class PostForm(forms.ModelForm):
             "text": "Текст поста",
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["group"].queryset = Group.objects.filter(is_active=True)
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,35 @@
+"""Картинки постов: удаление заменённых файлов и прогрев миниатюр.
+
+Имя файла запоминается, когда пост загружается из БД, поэтому
+сохранение без смены картинки не трогает ни диск, ни хранилище
+sorl.thumbnail. Если картинка сменилась, задача удаляет старый
+оригинал вместе с его миниатюрами и записями хранилища и заранее
+создаёт миниатюры новой, чтобы их не строил первый просмотр страницы.
+"""
+from django.conf import settings
+from sorl.thumbnail import delete, get_thumbnail
+
+from core.tasks import enqueue_on_commit, task
+
+
+def image_name(post):
+    """Имя файла картинки; None, если поле не загружено из БД."""
+    value = post.__dict__.get('image')
+    return getattr(value, 'name', value)
+
+
+def schedule_replace(old_name, new_name):
+    """Ставит замену картинки в очередь; False, если она не менялась."""
+    if old_name is None or old_name == new_name:
+        return False
+    enqueue_on_commit(replace_image, (old_name, new_name))
+    return True
+
+
+@task
+def replace_image(old_name, new_name):
+    if old_name:
+        delete(old_name)
+    if new_name:
+        for geometry, options in settings.POST_THUMBNAILS:
+            get_thumbnail(new_name, geometry, **options)
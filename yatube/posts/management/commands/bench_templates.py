@@ -0,0 +1,96 @@
+import json
+import os
+import subprocess
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from posts import benchmarks
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, cwd=settings.BASE_DIR,
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет рендеринг шаблонов лент и страницы поста без БД, '
+        'сохраняет результат в историю и сравнивает с прошлым прогоном.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default='1,10,50',
+            help='Количество записей на странице, через запятую.',
+        )
+        parser.add_argument(
+            '--templates', default=','.join(benchmarks.TEMPLATES),
+        )
+        parser.add_argument(
+            '--engine', help='Имя движка шаблонов, например jinja2.'
+        )
+        parser.add_argument('--number', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument(
+            '--history',
+            default=os.path.join(settings.BASE_DIR, 'benchmarks',
+                                 'templates.jsonl'),
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=0.1,
+            help='Допустимый рост медианы относительно прошлого прогона.',
+        )
+        parser.add_argument('--no-save', action='store_true')
+        parser.add_argument('--fail-on-regression', action='store_true')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        results = benchmarks.run(
+            sizes,
+            number=options['number'],
+            repeat=options['repeat'],
+            templates=options['templates'].split(','),
+            using=options['engine'],
+        )
+        previous = self.last_results(options['history'])
+        regressions = []
+        for case, row in results.items():
+            line = f'{case:<24}{row["median_ms"]:>10.3f} мс'
+            before = previous.get(case)
+            if before:
+                change = row['median_ms'] / before['median_ms'] - 1
+                line += f'  {change:+.1%}'
+                if change > options['threshold']:
+                    regressions.append(case)
+                    line += '  регрессия'
+            self.stdout.write(line)
+        if not options['no_save']:
+            self.save(options['history'], results)
+        if regressions and options['fail_on_regression']:
+            raise CommandError(
+                'Рендеринг замедлился: ' + ', '.join(regressions)
+            )
+
+    def last_results(self, path):
+        if not os.path.exists(path):
+            return {}
+        with open(path) as file:
+            lines = file.read().splitlines()
+        return json.loads(lines[-1])['results'] if lines else {}
+
+    def save(self, path, results):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        record = {
+            'date': timezone.now().isoformat(timespec='seconds'),
+            'commit': current_commit(),
+            'results': results,
+        }
+        with open(path, 'a') as file:
+            file.write(json.dumps(record) + '\n')
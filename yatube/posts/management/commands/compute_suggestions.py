@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.models import Follow, FollowSuggestion
+from posts.suggestions import build_graphs, follow_edges, store, suggest
+
+
+class Command(BaseCommand):
+    help = (
+        'Полностью пересчитывает рекомендации авторов по графу подписок. '
+        'Между запусками они обновляются задачей после каждой подписки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=1000)
+        parser.add_argument(
+            '--fanout', type=int, default=settings.FOLLOW_SUGGESTIONS_FANOUT
+        )
+        parser.add_argument(
+            '--limit', type=int, default=settings.FOLLOW_SUGGESTIONS_LIMIT
+        )
+
+    def handle(self, *args, **options):
+        following, followers = build_graphs(follow_edges())
+        self.stdout.write(f'Граф: {len(following)} подписчиков.')
+        batch = {}
+        done = 0
+        for user_id in following.index:
+            batch[user_id] = suggest(
+                user_id, following, followers,
+                options['limit'], options['fanout'],
+            )
+            if len(batch) >= options['batch']:
+                store(batch)
+                done += len(batch)
+                batch = {}
+                self.stdout.write(f'Пользователи: {done}')
+        store(batch)
+        # у тех, кто ни на кого не подписан, рекомендаций быть не может
+        FollowSuggestion.objects.exclude(
+            user__in=Follow.objects.values('user')
+        ).delete()
+        self.stdout.write(self.style.SUCCESS('Рекомендации пересчитаны.'))
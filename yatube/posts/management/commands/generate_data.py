@@ -0,0 +1,210 @@
+import io
+import os
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from faker import Faker
+from PIL import Image
+
+from posts.models import Comment, Follow, Group, Post, User
+from posts.utils import invalidate_counts
+
+TEXT_POOL_SIZE = 2000
+IMAGE_POOL_SIZE = 20
+
+
+@contextmanager
+def auto_now_add_disabled(model, field_name):
+    """Позволяет задать дату вручную полю с auto_now_add."""
+    field = model._meta.get_field(field_name)
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def zipf_weights(size, exponent):
+    """Накопленные веса степенного закона для random.choices."""
+    return list(accumulate(1 / (rank + 1) ** exponent
+                           for rank in range(size)))
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерирует тестовый набор данных: пользователей, группы, посты, '
+        'комментарии, картинки и подписки со степенным распределением.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=1_000_000)
+        parser.add_argument('--comments', type=int, default=1_000_000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Среднее число подписок на пользователя.',
+        )
+        parser.add_argument(
+            '--images', type=float, default=0.1,
+            help='Доля постов с картинкой.',
+        )
+        parser.add_argument(
+            '--exponent', type=float, default=1.1,
+            help='Показатель степенного закона популярности авторов.',
+        )
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--batch', type=int, default=5000)
+        parser.add_argument('--prefix', default='load')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        Faker.seed(options['seed'])
+        self.faker = Faker('ru_RU')
+        self.batch = options['batch']
+        self.texts = [self.faker.paragraph(nb_sentences=3)
+                      for _ in range(TEXT_POOL_SIZE)]
+
+        user_ids = self.create_users(options['users'], options['prefix'])
+        group_ids = self.create_groups(options['groups'], options['prefix'])
+        popularity = zipf_weights(len(user_ids), options['exponent'])
+        self.create_follows(user_ids, popularity, options['follows'])
+        images = self.create_images(options['prefix'])
+        self.create_posts(
+            options['posts'], user_ids, popularity, group_ids,
+            images, options['images'], options['days'],
+        )
+        self.create_comments(options['comments'], user_ids)
+        self.stdout.write(self.style.SUCCESS('Данные созданы.'))
+
+    def bulk_create(self, model, objects, **kwargs):
+        model.objects.bulk_create(objects, batch_size=self.batch, **kwargs)
+
+    def create_users(self, total, prefix):
+        password = make_password(prefix)
+        for start in range(0, total, self.batch):
+            end = min(start + self.batch, total)
+            self.bulk_create(User, [
+                User(
+                    username=f'{prefix}{number}',
+                    first_name=self.faker.first_name(),
+                    last_name=self.faker.last_name(),
+                    password=password,
+                )
+                for number in range(start, end)
+            ])
+            self.stdout.write(f'Пользователи: {end}')
+        return list(
+            User.objects.filter(username__startswith=prefix)
+            .order_by('pk').values_list('pk', flat=True)
+        )
+
+    def create_groups(self, total, prefix):
+        self.bulk_create(Group, [
+            Group(
+                title=self.faker.catch_phrase()[:200],
+                slug=f'{prefix}-{number}',
+                description=self.random.choice(self.texts),
+            )
+            for number in range(total)
+        ])
+        return list(
+            Group.objects.filter(slug__startswith=f'{prefix}-')
+            .values_list('pk', flat=True)
+        )
+
+    def create_follows(self, user_ids, popularity, average):
+        """Подписки: число подписок и популярность авторов — степенные."""
+        created = 0
+        follows = []
+        for user_id in user_ids:
+            count = min(
+                int(self.random.paretovariate(2) * average / 2),
+                len(user_ids) - 1,
+            )
+            authors = set(self.random.choices(
+                user_ids, cum_weights=popularity, k=count
+            ))
+            authors.discard(user_id)
+            follows.extend(Follow(user_id=user_id, author_id=author_id)
+                           for author_id in authors)
+            if len(follows) >= self.batch:
+                self.bulk_create(Follow, follows, ignore_conflicts=True)
+                created += len(follows)
+                follows = []
+                self.stdout.write(f'Подписки: {created}')
+        self.bulk_create(Follow, follows, ignore_conflicts=True)
+
+    def create_images(self, prefix):
+        names = []
+        directory = os.path.join(settings.MEDIA_ROOT, 'posts')
+        os.makedirs(directory, exist_ok=True)
+        for number in range(IMAGE_POOL_SIZE):
+            name = f'posts/{prefix}-{number}.jpg'
+            color = tuple(self.random.randrange(256) for _ in range(3))
+            buffer = io.BytesIO()
+            Image.new('RGB', (1280, 720), color).save(buffer, 'JPEG')
+            with open(os.path.join(settings.MEDIA_ROOT, name), 'wb') as file:
+                file.write(buffer.getvalue())
+            names.append(name)
+        return names
+
+    def create_posts(self, total, user_ids, popularity, group_ids,
+                     images, image_share, days):
+        now = timezone.now()
+        span = days * 86400
+        with auto_now_add_disabled(Post, 'pub_date'):
+            for start in range(0, total, self.batch):
+                size = min(self.batch, total - start)
+                authors = self.random.choices(
+                    user_ids, cum_weights=popularity, k=size
+                )
+                self.bulk_create(Post, [
+                    Post(
+                        author_id=author_id,
+                        text=self.random.choice(self.texts),
+                        group_id=(self.random.choice(group_ids)
+                                  if self.random.random() < 0.5 else None),
+                        image=(self.random.choice(images)
+                               if self.random.random() < image_share
+                               else ''),
+                        pub_date=now - timedelta(
+                            seconds=self.random.randrange(span)
+                        ),
+                    )
+                    for author_id in authors
+                ])
+                self.stdout.write(f'Посты: {start + size}')
+        # bulk_create обходит сигналы, которые сбрасывают числа записей
+        invalidate_counts()
+
+    def create_comments(self, total, user_ids):
+        post_ids = list(Post.objects.values_list('pk', flat=True))
+        if not post_ids:
+            return
+        for start in range(0, total, self.batch):
+            size = min(self.batch, total - start)
+            self.bulk_create(Comment, [
+                Comment(
+                    post_id=self.random.choice(post_ids),
+                    author_id=self.random.choice(user_ids),
+                    text=self.random.choice(self.texts)[:300],
+                )
+                for _ in range(size)
+            ])
+            self.stdout.write(f'Комментарии: {start + size}')
+        counts = (
+            Comment.objects.filter(post=OuterRef('pk'))
+            .order_by().values('post')
+            .annotate(total=Count('pk')).values('total')
+        )
+        Post.objects.update(comments_count=Coalesce(Subquery(counts), 0))
@@ -0,0 +1,277 @@
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from http.cookies import SimpleCookie
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import HTTPRedirectHandler, Request, build_opener
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY
+from django.contrib.auth import SESSION_KEY
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from posts.models import Group, Post, Tag, User
+from posts.urls import urlpatterns
+
+# имя URL из posts.urls: (вес в смеси, метод)
+ROUTES = {
+    'index': (30, 'GET'),
+    'index_more': (10, 'GET'),
+    'group_list': (10, 'GET'),
+    'group_more': (4, 'GET'),
+    'profile': (12, 'GET'),
+    'profile_more': (4, 'GET'),
+    'post_detail': (20, 'GET'),
+    'post_comments': (5, 'GET'),
+    'follow_index': (8, 'GET'),
+    'follow_more': (3, 'GET'),
+    'tag_posts': (4, 'GET'),
+    'mentions': (2, 'GET'),
+    'post_create': (2, 'POST'),
+    'post_edit': (1, 'POST'),
+    'add_comment': (4, 'POST'),
+    'profile_follow': (1, 'POST'),
+    'profile_unfollow': (1, 'POST'),
+    'follow_bulk': (0.1, 'POST'),
+}
+BULK_FOLLOW_SIZE = 20
+SAMPLE_SIZE = 5000
+
+
+class NoRedirect(HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def percentile(values, share):
+    """Процентиль методом ближайшего ранга по отсортированному списку."""
+    if not values:
+        return None
+    return values[max(math.ceil(share * len(values)) - 1, 0)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный прогон: взвешенная смесь маршрутов posts.urls против '
+        'запущенного сервера; пишет пропускную способность и p50/p95/p99 '
+        'по маршрутам в JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--duration', type=float, default=30)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument(
+            '--user', help='Пользователь для авторизованных маршрутов.'
+        )
+        parser.add_argument('--output', default='loadtest.json')
+        parser.add_argument(
+            '--compare', help='Предыдущий результат для сравнения.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        names = {pattern.name for pattern in urlpatterns}
+        for name in sorted(names - set(ROUTES)):
+            self.stderr.write(f'Маршрут {name} не входит в смесь нагрузки.')
+        self.base_url = options['base_url'].rstrip('/')
+        self.prepare_data(options['user'])
+        self.opener = build_opener(NoRedirect)
+        self.csrf_token = self.fetch_csrf_token()
+
+        routes = [name for name in ROUTES if name in names]
+        weights = [ROUTES[name][0] for name in routes]
+        results = defaultdict(list)
+        lock = threading.Lock()
+        deadline = time.monotonic() + options['duration']
+
+        def worker(seed):
+            rnd = random.Random(seed)
+            local = defaultdict(list)
+            while time.monotonic() < deadline:
+                name = rnd.choices(routes, weights=weights)[0]
+                local[name].append(self.hit(name, rnd))
+            with lock:
+                for name, samples in local.items():
+                    results[name].extend(samples)
+
+        started = time.monotonic()
+        threads = [
+            threading.Thread(target=worker, args=(options['seed'] + number,))
+            for number in range(options['concurrency'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        report = self.build_report(results, elapsed, options)
+        with open(options['output'], 'w') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        self.print_report(report, options['compare'])
+
+    def prepare_data(self, username):
+        users = User.objects.order_by('pk')
+        user = (users.filter(username=username).first() if username
+                else users.first())
+        if user is None:
+            raise CommandError('Нет пользователя для нагрузочного прогона.')
+        session = SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        self.session_key = session.session_key
+        self.post_ids = list(
+            Post.objects.order_by('-pk')
+            .values_list('pk', flat=True)[:SAMPLE_SIZE]
+        )
+        self.own_post_ids = list(
+            user.posts.order_by('-pk')
+            .values_list('pk', flat=True)[:SAMPLE_SIZE]
+        )
+        self.usernames = list(
+            users.exclude(pk=user.pk)
+            .values_list('username', flat=True)[:SAMPLE_SIZE]
+        )
+        self.slugs = list(
+            Group.objects.values_list('slug', flat=True)[:SAMPLE_SIZE]
+        )
+        # пока тегов нет, лента тега отвечает 404
+        self.tags = list(
+            Tag.objects.values_list('name', flat=True)[:SAMPLE_SIZE]
+        ) or ['yatube']
+        if not (self.post_ids and self.usernames and self.slugs):
+            raise CommandError('Сначала заполните базу: generate_data.')
+
+    def fetch_csrf_token(self):
+        request = Request(
+            self.base_url + reverse('posts:post_create'),
+            headers={'Cookie': f'{settings.SESSION_COOKIE_NAME}='
+                               f'{self.session_key}'},
+        )
+        with self.opener.open(request) as response:
+            cookie = SimpleCookie()
+            for header in response.headers.get_all('Set-Cookie') or ():
+                cookie.load(header)
+        morsel = cookie.get(settings.CSRF_COOKIE_NAME)
+        if morsel is None:
+            raise CommandError('Сервер не выдал CSRF-токен.')
+        return morsel.value
+
+    def build_request(self, name, rnd):
+        method = ROUTES[name][1]
+        kwargs = {}
+        data = None
+        if name in ('group_list', 'group_more'):
+            kwargs['slug'] = rnd.choice(self.slugs)
+        elif name in ('profile', 'profile_more', 'profile_follow',
+                      'profile_unfollow'):
+            kwargs['username'] = rnd.choice(self.usernames)
+        elif name in ('post_detail', 'post_comments', 'add_comment'):
+            kwargs['post_id'] = rnd.choice(self.post_ids)
+        elif name == 'tag_posts':
+            kwargs['name'] = rnd.choice(self.tags)
+        elif name == 'post_edit':
+            kwargs['post_id'] = rnd.choice(self.own_post_ids or self.post_ids)
+        if name == 'follow_bulk':
+            data = json.dumps({'usernames': rnd.sample(
+                self.usernames, min(BULK_FOLLOW_SIZE, len(self.usernames))
+            )}).encode()
+        elif method == 'POST':
+            data = urlencode({'text': f'Нагрузка {rnd.random()}'}).encode()
+        return Request(
+            self.base_url + reverse(f'posts:{name}', kwargs=kwargs),
+            data=data,
+            method=method,
+            headers={
+                'Cookie': (
+                    f'{settings.SESSION_COOKIE_NAME}={self.session_key}; '
+                    f'{settings.CSRF_COOKIE_NAME}={self.csrf_token}'
+                ),
+                'X-CSRFToken': self.csrf_token,
+            },
+        )
+
+    def hit(self, name, rnd):
+        request = self.build_request(name, rnd)
+        start = time.perf_counter()
+        try:
+            with self.opener.open(request) as response:
+                response.read()
+                status = response.status
+        except HTTPError as error:
+            status = error.code
+        except (URLError, OSError):
+            status = 0
+        return status, time.perf_counter() - start
+
+    def build_report(self, results, elapsed, options):
+        report = {
+            'meta': {
+                'base_url': self.base_url,
+                'duration': round(elapsed, 3),
+                'concurrency': options['concurrency'],
+                'started': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            },
+            'routes': {},
+        }
+        every = []
+        for name, samples in sorted(results.items()):
+            latencies = sorted(latency for _, latency in samples)
+            every.extend(latencies)
+            report['routes'][name] = self.summary(
+                latencies, Counter(status for status, _ in samples), elapsed
+            )
+        report['total'] = self.summary(
+            sorted(every),
+            Counter(status for samples in results.values()
+                    for status, _ in samples),
+            elapsed,
+        )
+        return report
+
+    def summary(self, latencies, statuses, elapsed):
+        def ms(value):
+            return None if value is None else round(value * 1000, 2)
+
+        return {
+            'requests': len(latencies),
+            'errors': sum(count for status, count in statuses.items()
+                          if status == 0 or status >= 500),
+            'rps': round(len(latencies) / elapsed, 2) if elapsed else 0,
+            'p50_ms': ms(percentile(latencies, 0.5)),
+            'p95_ms': ms(percentile(latencies, 0.95)),
+            'p99_ms': ms(percentile(latencies, 0.99)),
+            'statuses': {str(status): count
+                         for status, count in sorted(statuses.items())},
+        }
+
+    def print_report(self, report, compare):
+        previous = {}
+        if compare:
+            with open(compare) as file:
+                previous = json.load(file)['routes']
+        self.stdout.write(
+            f'{"маршрут":<18}{"rps":>9}{"p50":>9}{"p95":>9}{"p99":>9}'
+        )
+        for name, row in report['routes'].items():
+            line = (f'{name:<18}{row["rps"]:>9}{row["p50_ms"]:>9}'
+                    f'{row["p95_ms"]:>9}{row["p99_ms"]:>9}')
+            before = previous.get(name)
+            if before and before['p95_ms']:
+                change = row['p95_ms'] / before['p95_ms'] - 1
+                line += f'  p95 {change:+.0%}'
+            self.stdout.write(line)
+        total = report['total']
+        self.stdout.write(
+            f'Всего {total["requests"]} запросов, {total["rps"]} rps, '
+            f'ошибок {total["errors"]}.'
+        )
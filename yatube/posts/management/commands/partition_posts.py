@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import partitions
+
+
+class Command(BaseCommand):
+    help = (
+        'Помесячные партиции постов и комментариев (только PostgreSQL): '
+        'перевод таблиц, создание партиций наперёд и архивирование.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--convert', action='store_true',
+            help='Перевести таблицы в секционированные (один раз, '
+                 'под блокировкой таблиц).',
+        )
+        parser.add_argument(
+            '--ahead', type=int,
+            help='На сколько месяцев вперёд создавать партиции.',
+        )
+        parser.add_argument(
+            '--archive', action='store_true',
+            help='Перенести старые партиции в архивное табличное '
+                 'пространство.',
+        )
+        parser.add_argument('--older-than', type=int)
+        parser.add_argument('--tablespace')
+        parser.add_argument(
+            '--schedule', action='store_true',
+            help='Поставить ежедневное создание партиций в очередь задач.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            if options['convert']:
+                for model in partitions.PARTITIONED:
+                    if partitions.convert(model):
+                        self.stdout.write(
+                            f'{model._meta.db_table}: секционирована.'
+                        )
+            for name in partitions.ensure_partitions(options['ahead']):
+                self.stdout.write(f'Создана партиция {name}.')
+            if options['archive']:
+                for name in partitions.archive(
+                    options['older_than'], options['tablespace']
+                ):
+                    self.stdout.write(f'{name} перенесена в архив.')
+        except partitions.PartitioningError as error:
+            raise CommandError(error)
+        if options['schedule']:
+            partitions.maintain_partitions.delay()
+        self.stdout.write(self.style.SUCCESS('Готово.'))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from core import batch
+from posts import bulk, markup
+from posts.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Ставит в очередь пересчёт HTML постов и комментариев, '
+        'отрендеренных прежней версией Markdown.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересчитать все записи, а не только устаревшие.',
+        )
+
+    def handle(self, *args, **options):
+        for model in (Post, Comment):
+            queryset = model.objects.all()
+            if not options['all']:
+                queryset = queryset.exclude(markup_version=markup.VERSION)
+            job = batch.start(bulk.render_markup, queryset)
+            self.stdout.write(
+                f'{model._meta.label}: задание №{job.pk} в очереди.'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Версия разметки {markup.VERSION}.'
+        ))
@@ -0,0 +1,107 @@
+"""Markdown в текстах постов и комментариев.
+
+HTML строится один раз при сохранении и хранится в ``text_html``, так
+что страницы со списками Markdown не разбирают. Разметка пропускается
+через белый список тегов и атрибутов: сырой HTML автора, обработчики
+событий и ссылки ``javascript:`` в результат не попадают. После смены
+правил увеличьте ``VERSION`` и запустите ``manage.py render_markup``.
+
+Хэштеги становятся ссылками на ленту тега, упоминания — на профиль.
+Чтобы ``#тег`` в начале строки не превращался в заголовок, после
+решёток заголовка нужен пробел.
+"""
+import re
+import xml.etree.ElementTree as etree
+from functools import partial
+
+import bleach
+import markdown
+from bleach.linkifier import LinkifyFilter
+from django.urls import reverse
+from markdown.blockprocessors import HashHeaderProcessor
+from markdown.extensions import Extension
+from markdown.inlinepatterns import InlineProcessor
+from markdown.util import AtomicString
+
+VERSION = 2
+
+# не внутри слова, адреса или HTML-сущности; хотя бы одна буква
+HASHTAG = re.compile(r'(?<![\w/#&])#(?=\w*[^\W\d])(\w{1,100})(?!\w)')
+# имя пользователя Django, без точки или дефиса в конце предложения
+MENTION = re.compile(r'(?<![\w@/])@(\w(?:[\w.+-]{0,148}\w)?)(?![\w@])')
+
+
+def tag_url(name):
+    return reverse('posts:tag_posts', args=(name.lower(),))
+
+
+def profile_url(username):
+    return reverse('posts:profile', args=(username,))
+
+
+class SpacedHashHeaderProcessor(HashHeaderProcessor):
+    RE = re.compile(
+        r'(?:^|\n)(?P<level>#{1,6})[ \t]+(?P<header>(?:\\.|[^\\])*?)#*'
+        r'(?:\n|$)'
+    )
+
+
+class LinkProcessor(InlineProcessor):
+    """Ссылка из найденного хэштега или упоминания."""
+    def __init__(self, pattern, md, prefix, url):
+        super().__init__(pattern.pattern, md)
+        self.prefix = prefix
+        self.url = url
+
+    def handleMatch(self, match, data):
+        link = etree.Element('a')
+        link.set('href', self.url(match.group(1)))
+        link.text = AtomicString(self.prefix + match.group(1))
+        return link, match.start(0), match.end(0)
+
+
+class TagsExtension(Extension):
+    def extendMarkdown(self, md):
+        md.parser.blockprocessors.register(
+            SpacedHashHeaderProcessor(md.parser), 'hashheader', 70
+        )
+        # после ссылок и кода: внутри них хэштеги не ищутся
+        md.inlinePatterns.register(
+            LinkProcessor(HASHTAG, md, '#', tag_url), 'hashtag', 105
+        )
+        md.inlinePatterns.register(
+            LinkProcessor(MENTION, md, '@', profile_url), 'mention', 104
+        )
+
+
+EXTENSIONS = ['fenced_code', 'nl2br', 'sane_lists', TagsExtension()]
+ALLOWED_TAGS = [
+    'a', 'blockquote', 'br', 'code', 'em', 'h3', 'h4', 'h5', 'h6', 'hr',
+    'li', 'ol', 'p', 'pre', 'strong', 'ul',
+]
+ALLOWED_ATTRIBUTES = {'a': ['href', 'title', 'rel']}
+ALLOWED_PROTOCOLS = ['http', 'https', 'mailto']
+
+
+def hashtags(text):
+    """Имена хэштегов текста в нижнем регистре."""
+    return {name.lower() for name in HASHTAG.findall(text)}
+
+
+def mentions(text):
+    """Имена упомянутых в тексте пользователей."""
+    return set(MENTION.findall(text))
+
+
+def render(text):
+    """Безопасный HTML из Markdown."""
+    # Cleaner и Markdown хранят состояние разбора, поэтому на каждый вызов
+    # создаются заново: рендеринг идёт только при записи
+    cleaner = bleach.Cleaner(
+        tags=ALLOWED_TAGS,
+        attributes=ALLOWED_ATTRIBUTES,
+        protocols=ALLOWED_PROTOCOLS,
+        strip=True,
+        filters=[partial(LinkifyFilter, skip_tags=['pre', 'code'])],
+    )
+    return cleaner.clean(markdown.markdown(text, extensions=EXTENSIONS))
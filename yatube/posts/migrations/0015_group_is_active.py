@@ -0,0 +1,18 @@
+# Generated by Django 3.2.13 on 2026-10-19 09:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_post_comment_date_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='is_active',
+            field=models.BooleanField(default=True),
+        ),
+    ]
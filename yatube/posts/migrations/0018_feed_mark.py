@@ -0,0 +1,29 @@
+# Generated by Django 3.2.13 on 2026-10-19 09:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0017_tags_mentions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedMark',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('feed', models.CharField(choices=[('index', 'Все авторы'), ('follow', 'Избранные авторы')], max_length=10, verbose_name='Лента')),
+                ('seen', models.DateTimeField(verbose_name='Просмотрено до')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_marks', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='feedmark',
+            constraint=models.UniqueConstraint(fields=('user', 'feed'), name='unique_feed_mark'),
+        ),
+    ]
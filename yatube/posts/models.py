@@ -1,19 +1,56 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.utils.html import linebreaks
+from django.utils.safestring import mark_safe
+
+from . import markup
 
 User = get_user_model()
 
 
+class MarkupModel(models.Model):
+    """Абстрактная модель. Хранит HTML, отрендеренный из Markdown поля
+    text при сохранении."""
+    text_html = models.TextField('HTML текста', blank=True, editable=False)
+    markup_version = models.PositiveSmallIntegerField(
+        'Версия разметки', default=0, editable=False
+    )
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'text' in update_fields:
+            self.text_html = markup.render(self.text)
+            self.markup_version = markup.VERSION
+            if update_fields is not None:
+                kwargs['update_fields'] = {
+                    *update_fields, 'text_html', 'markup_version'
+                }
+        super().save(*args, **kwargs)
+
+    @property
+    def formatted_text(self):
+        # пока render_markup не дошёл до старой записи, текст выводится
+        # как раньше
+        if self.text_html:
+            return mark_safe(self.text_html)
+        return linebreaks(self.text, autoescape=True)
+
+
 class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(max_length=150, unique=True)
     description = models.TextField()
+    # снятая группа скрыта, пока посты отвязываются от неё в фоне
+    is_active = models.BooleanField(default=True)
 
     def __str__(self):
         return self.title
 
 
-class Post(models.Model):
+class Post(MarkupModel):
     text = models.TextField(blank=False)
     pub_date = models.DateTimeField(auto_now_add=True)
     author = models.ForeignKey(
@@ -31,21 +68,39 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         ordering = ["-pub_date"]
+        indexes = [
+            models.Index(
+                fields=["-pub_date", "-id"],
+                name="post_pub_date_idx",
+            ),
+            models.Index(
+                fields=["author", "-pub_date"],
+                name="post_author_pub_date_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.text
 
 
-class Comment(models.Model):
+class Comment(MarkupModel):
+    # у секционированной таблицы постов нет уникального id, поэтому
+    # ссылочную целостность обеспечивает Django
     post = models.ForeignKey(
         Post,
         blank=True,
         null=True,
         on_delete=models.CASCADE,
         related_name="comments",
+        db_constraint=False,
     )
     author = models.ForeignKey(
         User, on_delete=models.CASCADE,
@@ -56,6 +111,16 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ["-created"]
+        indexes = [
+            models.Index(
+                fields=["post", "created", "id"],
+                name="comment_post_keyset_idx",
+            ),
+            models.Index(
+                fields=["-created", "-id"],
+                name="comment_created_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.text
@@ -79,3 +144,122 @@ class Follow(models.Model):
                 name='unique_follow',
             ),
         ]
+
+
+class FollowSuggestion(models.Model):
+    """Рекомендованный автор, рассчитанный по графу подписок."""
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name="follow_suggestions"
+    )
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name="+"
+    )
+    score = models.FloatField('Вес рекомендации')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_follow_suggestion',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-score'],
+                name='follow_suggestion_user_idx',
+            ),
+        ]
+
+
+class Tag(models.Model):
+    """Хэштег; имя хранится в нижнем регистре."""
+    name = models.CharField('Хэштег', max_length=100, unique=True)
+
+    def __str__(self):
+        return f'#{self.name}'
+
+
+class PostTag(models.Model):
+    """Хэштег в тексте поста. Дата поста продублирована, чтобы лента
+    тега читалась по одному индексу без сортировки постов."""
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="post_tags",
+        db_constraint=False,
+    )
+    tag = models.ForeignKey(
+        Tag, on_delete=models.CASCADE,
+        related_name="post_tags"
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'tag'],
+                name='unique_post_tag',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['tag', '-pub_date', '-id'],
+                name='post_tag_feed_idx',
+            ),
+        ]
+
+
+class Mention(models.Model):
+    """Упоминание пользователя в тексте поста."""
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="mentions",
+        db_constraint=False,
+    )
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name="mentions"
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'user'],
+                name='unique_mention',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-id'],
+                name='mention_feed_idx',
+            ),
+        ]
+
+
+class FeedMark(models.Model):
+    """Дата самого нового поста ленты, который видел пользователь."""
+    INDEX = 'index'
+    FOLLOW = 'follow'
+    FEED_CHOICES = (
+        (INDEX, 'Все авторы'),
+        (FOLLOW, 'Избранные авторы'),
+    )
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name="feed_marks"
+    )
+    feed = models.CharField('Лента', max_length=10, choices=FEED_CHOICES)
+    seen = models.DateTimeField('Просмотрено до')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'feed'],
+                name='unique_feed_mark',
+            ),
+        ]
@@ -0,0 +1,205 @@
+"""Помесячные партиции постов и комментариев в PostgreSQL.
+
+Таблица превращается в секционированную по дате (``convert``), после
+чего партиции на ``POSTS_PARTITION_AHEAD`` месяцев вперёд создаются
+заранее (``ensure_partitions``), а старые переносятся в дешёвое
+табличное пространство (``archive``). Первичный ключ секционированной
+таблицы обязан включать дату, поэтому он становится (id, дата), а
+внешний ключ комментария на пост проверяется только Django.
+"""
+from datetime import date
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.tasks import enqueue, task
+
+from .models import Comment, Post
+
+# модель: поле даты, по которому режется таблица
+PARTITIONED = {
+    Post: 'pub_date',
+    Comment: 'created',
+}
+DAY = 86400
+
+
+class PartitioningError(Exception):
+    pass
+
+
+def month_start(moment):
+    return date(moment.year, moment.month, 1)
+
+
+def add_months(month, count):
+    number = month.year * 12 + month.month - 1 + count
+    return date(number // 12, number % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    return f'{table}_p{month:%Y%m}'
+
+
+def check_vendor():
+    if connection.vendor != 'postgresql':
+        raise PartitioningError(
+            'Секционирование поддерживается только в PostgreSQL.'
+        )
+
+
+def is_partitioned(table):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p "
+            "JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = %s)",
+            [table],
+        )
+        return cursor.fetchone()[0]
+
+
+def existing_partitions(table):
+    """Имена партиций таблицы, кроме партиции по умолчанию."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = %s AND c.relname <> %s",
+            [table, f'{table}_default'],
+        )
+        return sorted(name for name, in cursor.fetchall())
+
+
+def create_partition(table, month):
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS {qn(partition_name(table, month))} '
+            f'PARTITION OF {qn(table)} FOR VALUES FROM (%s) TO (%s)',
+            [month, add_months(month, 1)],
+        )
+
+
+def convert(model):
+    """Переносит таблицу модели в секционированную с тем же именем."""
+    check_vendor()
+    table = model._meta.db_table
+    field = model._meta.get_field(PARTITIONED[model]).column
+    legacy = f'{table}_legacy'
+    qn = connection.ops.quote_name
+    if is_partitioned(table):
+        return False
+    with transaction.atomic(), connection.schema_editor() as editor:
+        editor.execute(f'ALTER TABLE {qn(table)} RENAME TO {qn(legacy)}')
+        editor.execute(
+            f'ALTER TABLE {qn(legacy)} RENAME CONSTRAINT '
+            f'{qn(table + "_pkey")} TO {qn(legacy + "_pkey")}'
+        )
+        editor.execute(
+            f'CREATE TABLE {qn(table)} (LIKE {qn(legacy)} '
+            f'INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            f'PARTITION BY RANGE ({qn(field)})'
+        )
+        editor.execute(
+            f'ALTER TABLE {qn(table)} ADD PRIMARY KEY ("id", {qn(field)})'
+        )
+        editor.execute(
+            f"ALTER SEQUENCE {qn(table + '_id_seq')} OWNED BY {qn(table)}.id"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT MIN({qn(field)}) FROM {qn(legacy)}'
+            )
+            oldest = cursor.fetchone()[0] or timezone.now()
+        month = month_start(oldest)
+        last = add_months(month_start(timezone.now()),
+                          settings.POSTS_PARTITION_AHEAD)
+        while month <= last:
+            create_partition(table, month)
+            month = add_months(month, 1)
+        editor.execute(
+            f'CREATE TABLE {qn(table + "_default")} '
+            f'PARTITION OF {qn(table)} DEFAULT'
+        )
+        editor.execute(
+            f'INSERT INTO {qn(table)} SELECT * FROM {qn(legacy)}'
+        )
+        # имена индексов освобождаются только вместе со старой таблицей
+        editor.execute(f'DROP TABLE {qn(legacy)}')
+        for statement in editor._model_indexes_sql(model):
+            editor.execute(statement)
+        for field in model._meta.local_fields:
+            if field.remote_field and field.db_constraint:
+                editor.execute(editor._create_fk_sql(
+                    model, field, '_fk_%(to_table)s_%(to_column)s'
+                ))
+    return True
+
+
+def ensure_partitions(ahead=None):
+    """Создаёт партиции от текущего месяца на ``ahead`` месяцев вперёд."""
+    check_vendor()
+    ahead = settings.POSTS_PARTITION_AHEAD if ahead is None else ahead
+    created = []
+    current = month_start(timezone.now())
+    for model in PARTITIONED:
+        table = model._meta.db_table
+        if not is_partitioned(table):
+            continue
+        existing = set(existing_partitions(table))
+        for offset in range(ahead + 1):
+            month = add_months(current, offset)
+            if partition_name(table, month) not in existing:
+                create_partition(table, month)
+                created.append(partition_name(table, month))
+    return created
+
+
+def archive(older_than=None, tablespace=None):
+    """Переносит партиции старше ``older_than`` месяцев вместе с индексами
+    в табличное пространство ``tablespace``."""
+    check_vendor()
+    older_than = older_than or settings.POSTS_ARCHIVE_MONTHS
+    tablespace = tablespace or settings.POSTS_ARCHIVE_TABLESPACE
+    border = partition_name('', add_months(
+        month_start(timezone.now()), -older_than
+    ))
+    qn = connection.ops.quote_name
+    moved = []
+    with connection.cursor() as cursor:
+        for model in PARTITIONED:
+            table = model._meta.db_table
+            for name in existing_partitions(table):
+                if name[len(table):] >= border:
+                    continue
+                cursor.execute(
+                    'SELECT indexname FROM pg_indexes WHERE tablename = %s '
+                    'AND COALESCE(tablespace, %s) <> %s',
+                    [name, '', tablespace],
+                )
+                indexes = [index for index, in cursor.fetchall()]
+                cursor.execute(
+                    'SELECT COALESCE(tablespace, %s) FROM pg_tables '
+                    'WHERE tablename = %s', ['', name],
+                )
+                if cursor.fetchone()[0] != tablespace:
+                    cursor.execute(
+                        f'ALTER TABLE {qn(name)} '
+                        f'SET TABLESPACE {qn(tablespace)}'
+                    )
+                    moved.append(name)
+                for index in indexes:
+                    cursor.execute(
+                        f'ALTER INDEX {qn(index)} '
+                        f'SET TABLESPACE {qn(tablespace)}'
+                    )
+    return moved
+
+
+@task
+def maintain_partitions():
+    """Ежедневно создаёт партиции наперёд и ставит себя в очередь снова."""
+    ensure_partitions()
+    enqueue(maintain_partitions, countdown=DAY)
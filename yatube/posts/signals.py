@@ -0,0 +1,88 @@
+from django.core.cache import cache
+from django.db.models import F
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import images, tags, unread
+from .models import Comment, Follow, Post, User
+from .utils import following_cache_key, invalidate_counts
+
+
+@receiver(post_save, sender=Comment)
+def increment_comments_count(sender, instance, created, **kwargs):
+    if created and instance.post_id:
+        Post.objects.filter(pk=instance.post_id).update(
+            comments_count=F("comments_count") + 1
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comments_count(sender, instance, **kwargs):
+    if instance.post_id:
+        Post.objects.filter(
+            pk=instance.post_id, comments_count__gt=0
+        ).update(comments_count=F("comments_count") - 1)
+
+
+@receiver(post_save, sender=Post)
+def post_added(sender, instance, created, **kwargs):
+    # правка поста не меняет числа записей в лентах
+    if created:
+        invalidate_counts()
+
+
+@receiver(post_delete, sender=Post)
+def post_removed(sender, instance, **kwargs):
+    invalidate_counts()
+
+
+@receiver(post_save, sender=User)
+def user_activity_changed(sender, instance, created, update_fields=None,
+                          **kwargs):
+    # ленты показывают только активных авторов
+    if not created and (update_fields is None
+                        or "is_active" in update_fields):
+        invalidate_counts()
+
+
+@receiver(post_init, sender=Post)
+def remember_image(sender, instance, **kwargs):
+    instance._loaded_image = images.image_name(instance)
+
+
+@receiver(post_save, sender=Post)
+def replace_image(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    old_name = '' if created else instance._loaded_image
+    new_name = images.image_name(instance) or ''
+    if images.schedule_replace(old_name, new_name):
+        instance._loaded_image = new_name
+
+
+@receiver(post_save, sender=Post)
+def index_tags(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is None or 'text' in update_fields:
+        tags.index_post(instance, created)
+
+
+@receiver(post_save, sender=Post)
+def push_unread(sender, instance, created, **kwargs):
+    if created:
+        unread.post_created(instance)
+
+
+@receiver(post_delete, sender=Post)
+def forget_unread(sender, instance, **kwargs):
+    unread.post_deleted(instance)
+
+
+@receiver(post_delete, sender=Post)
+def delete_image(sender, instance, **kwargs):
+    images.schedule_replace(instance._loaded_image, '')
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def forget_following(sender, instance, **kwargs):
+    cache.delete(following_cache_key(instance.user_id))
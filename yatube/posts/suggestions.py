@@ -0,0 +1,165 @@
+"""Рекомендации авторов по графу подписок.
+
+Граф хранится в формате CSR: подписки вершины — срез одного общего
+массива ``targets`` от ``offsets[i]`` до ``offsets[i + 1]``. Кандидат
+получает очки, если на него подписаны авторы, на которых подписан
+пользователь (друзья друзей), и если на него подписаны те, кто читает
+тех же авторов, что и пользователь (совместные подписки). Результат
+хранится в ``FollowSuggestion``, поэтому показ — одно чтение по индексу.
+"""
+import heapq
+from array import array
+from itertools import accumulate
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core.tasks import enqueue_on_commit, task
+
+from .models import Follow, FollowSuggestion
+from .utils import following_cache_key
+
+FRIEND_WEIGHT = 2.0
+CO_FOLLOW_WEIGHT = 1.0
+
+
+class Graph:
+    """Списки смежности в двух массивах, соседи идут в порядке рёбер."""
+    def __init__(self, sources, targets):
+        self.index = {}
+        for source in sources:
+            if source not in self.index:
+                self.index[source] = len(self.index)
+        degrees = array('q', bytes(8 * len(self.index)))
+        for source in sources:
+            degrees[self.index[source]] += 1
+        self.offsets = array('q', [0])
+        self.offsets.extend(accumulate(degrees))
+        self.targets = array('q', bytes(8 * len(targets)))
+        position = array('q', self.offsets[:-1])
+        for source, target in zip(sources, targets):
+            number = self.index[source]
+            self.targets[position[number]] = target
+            position[number] += 1
+
+    def __len__(self):
+        return len(self.index)
+
+    def neighbours(self, pk, limit=None):
+        number = self.index.get(pk)
+        if number is None:
+            return ()
+        start, end = self.offsets[number], self.offsets[number + 1]
+        if limit is not None:
+            end = min(end, start + limit)
+        return self.targets[start:end]
+
+
+def build_graphs(edges):
+    """Графы подписок и подписчиков из пар (пользователь, автор)."""
+    users, authors = array('q'), array('q')
+    for user_id, author_id in edges:
+        users.append(user_id)
+        authors.append(author_id)
+    return Graph(users, authors), Graph(authors, users)
+
+
+def suggest(user_id, following, followers, limit, fanout):
+    """Лучшие ``limit`` пар (автор, вес) для пользователя."""
+    followed = following.neighbours(user_id)
+    scores = {}
+    for author in followed[:fanout]:
+        for candidate in following.neighbours(author, fanout):
+            scores[candidate] = scores.get(candidate, 0) + FRIEND_WEIGHT
+        for follower in followers.neighbours(author, fanout):
+            if follower == user_id:
+                continue
+            for candidate in following.neighbours(follower, fanout):
+                scores[candidate] = (
+                    scores.get(candidate, 0) + CO_FOLLOW_WEIGHT
+                )
+    scores.pop(user_id, None)
+    for author in followed:
+        scores.pop(author, None)
+    return heapq.nlargest(
+        limit, scores.items(), key=lambda item: (item[1], -item[0])
+    )
+
+
+def store(suggestions):
+    """Заменяет сохранённые рекомендации: {пользователь: [(автор, вес)]}."""
+    with transaction.atomic():
+        FollowSuggestion.objects.filter(user__in=list(suggestions)).delete()
+        FollowSuggestion.objects.bulk_create([
+            FollowSuggestion(user_id=user_id, author_id=author_id,
+                             score=score)
+            for user_id, pairs in suggestions.items()
+            for author_id, score in pairs
+        ])
+
+
+def follow_edges():
+    """Все подписки, свежие первыми: они и попадают в ограничение fanout."""
+    return (
+        Follow.objects.order_by('-pk')
+        .values_list('user_id', 'author_id')
+        .iterator(chunk_size=10000)
+    )
+
+
+@task
+def refresh_suggestions(user_id):
+    """Пересчёт рекомендаций одного пользователя по окрестности в графе."""
+    fanout = settings.FOLLOW_SUGGESTIONS_FANOUT
+    follows = Follow.objects.order_by('-pk')
+    authors = list(
+        follows.filter(user=user_id).values_list('author_id', flat=True)
+    )
+    edges = [(user_id, author) for author in authors]
+    edges.extend(
+        follows.filter(user__in=authors[:fanout])
+        .values_list('user_id', 'author_id')
+    )
+    readers = set()
+    for author in authors[:fanout]:
+        for reader in (
+            follows.filter(author=author).exclude(user=user_id)
+            .values_list('user_id', flat=True)[:fanout]
+        ):
+            edges.append((reader, author))
+            readers.add(reader)
+    edges.extend(
+        follows.filter(user__in=readers)
+        .exclude(author__in=authors[:fanout])
+        .values_list('user_id', 'author_id')
+    )
+    following, followers = build_graphs(dict.fromkeys(edges))
+    store({user_id: suggest(
+        user_id, following, followers,
+        settings.FOLLOW_SUGGESTIONS_LIMIT, fanout,
+    )})
+
+
+def follows_changed(user_id, author_ids):
+    """Сбрасывает кэш подписок, убирает новых авторов из рекомендаций
+    и ставит их пересчёт в очередь."""
+    key = following_cache_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+    FollowSuggestion.objects.filter(
+        user=user_id, author__in=author_ids
+    ).delete()
+    enqueue_on_commit(refresh_suggestions, (user_id,))
+
+
+def get_suggestions(user):
+    """Авторы для блока «Кого почитать»."""
+    if not user.is_authenticated:
+        return []
+    return [
+        suggestion.author for suggestion in
+        FollowSuggestion.objects.filter(user=user, author__is_active=True)
+        .select_related('author')
+        .order_by('-score')[:settings.FOLLOW_SUGGESTIONS_SHOWN]
+    ]
@@ -0,0 +1,52 @@
+"""Хэштеги и упоминания постов.
+
+При сохранении поста найденные в тексте ``#теги`` и ``@имена``
+записываются в таблицы ``PostTag`` и ``Mention`` вместе с датой поста.
+Ленты тега и упоминаний читают эти таблицы по индексам
+``(тег, -дата)`` и ``(пользователь, -дата)``; текст постов при чтении
+не просматривается.
+"""
+from . import markup
+from .models import Mention, PostTag, Tag, User
+
+
+def tag_ids(names):
+    """Первичные ключи тегов, недостающие теги создаются."""
+    if not names:
+        return set()
+    Tag.objects.bulk_create(
+        [Tag(name=name) for name in names], ignore_conflicts=True
+    )
+    return set(
+        Tag.objects.filter(name__in=names).values_list('pk', flat=True)
+    )
+
+
+def mentioned_ids(post):
+    usernames = markup.mentions(post.text)
+    if not usernames:
+        return set()
+    return set(
+        User.objects.filter(username__in=usernames, is_active=True)
+        .exclude(pk=post.author_id)
+        .values_list('pk', flat=True)
+    )
+
+
+def index_post(post, created=False):
+    """Приводит теги и упоминания поста в соответствие с его текстом."""
+    tags = tag_ids(markup.hashtags(post.text))
+    users = mentioned_ids(post)
+    if not created:
+        PostTag.objects.filter(post=post).exclude(tag__in=tags).delete()
+        Mention.objects.filter(post=post).exclude(user__in=users).delete()
+    PostTag.objects.bulk_create(
+        [PostTag(post=post, tag_id=tag_id, pub_date=post.pub_date)
+         for tag_id in tags],
+        ignore_conflicts=True,
+    )
+    Mention.objects.bulk_create(
+        [Mention(post=post, user_id=user_id, pub_date=post.pub_date)
+         for user_id in users],
+        ignore_conflicts=True,
+    )
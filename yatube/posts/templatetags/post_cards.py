@@ -0,0 +1,58 @@
+"""Карточки постов, закэшированные готовым HTML.
+
+Ключ кэша содержит id поста и отпечаток всех полей, которые выводит
+карточка, поэтому после правки поста, смены группы или имени автора
+ключ меняется сам и старый HTML просто перестаёт читаться.
+"""
+import hashlib
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+CARD_TEMPLATE = 'posts/includes/post_card.html'
+
+
+def card_key(post, profile=False, using=None):
+    group = post.group
+    parts = (
+        using or 'django',
+        # готовый HTML: render_markup может обновить его без смены версии
+        str(post.formatted_text),
+        post.pub_date.isoformat() if post.pub_date else '',
+        post.image.name or '',
+        group.slug if group and group.is_active else '',
+        post.author.username,
+        post.author.get_full_name(),
+        'profile' if profile else 'feed',
+    )
+    digest = hashlib.md5('\x1f'.join(parts).encode()).hexdigest()
+    return f'post_card:{post.pk}:{digest}'
+
+
+def render_cards(posts, profile=False, using=None):
+    """HTML карточек: из кэша одним get_many, недостающие рендерятся."""
+    posts = list(posts)
+    keys = [card_key(post, profile, using) for post in posts]
+    found = cache.get_many(keys)
+    missing = {}
+    for post, key in zip(posts, keys):
+        if key not in found:
+            card = get_template(CARD_TEMPLATE, using=using)
+            found[key] = missing[key] = card.render(
+                {'post': post, 'profile': profile}
+            )
+    if missing:
+        cache.set_many(missing, settings.POST_CARD_TIMEOUT)
+    return [found[key] for key in keys]
+
+
+@register.simple_tag
+def post_cards(posts, profile=False):
+    """Список готовых карточек для цикла в шаблоне:
+    ``{% post_cards page_obj as cards %}``."""
+    return [mark_safe(card) for card in render_cards(posts, profile)]
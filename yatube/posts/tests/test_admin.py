@@ -0,0 +1,196 @@
+from http import HTTPStatus
+from unittest import mock
+
+from django.contrib import admin
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import BatchJob
+from .. import bulk
+from ..models import Comment, Follow, Group, Post, User
+
+
+class ScalableAdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser(
+            username='admin', password='pass', email='admin@example.com'
+        )
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='test'
+        )
+        cls.authors = [
+            User.objects.create_user(username=f'author{number}')
+            for number in range(5)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+
+    def create_posts(self, count):
+        for number in range(count):
+            post = Post.objects.create(
+                text=f'Пост {number}', group=self.group,
+                author=self.authors[number % len(self.authors)],
+            )
+            Comment.objects.create(post=post, author=post.author,
+                                   text='Комментарий')
+
+    def changelist_queries(self, model):
+        url = reverse(f'admin:posts_{model}_changelist')
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return len(context)
+
+    def test_changelist_queries_do_not_grow(self):
+        """Число запросов списка не зависит от числа строк."""
+        self.create_posts(2)
+        Follow.objects.create(user=self.authors[0], author=self.authors[1])
+        # первый запрос кладёт сессию и пользователя в кэш
+        self.changelist_queries('post')
+        before = {model: self.changelist_queries(model)
+                  for model in ('post', 'comment', 'follow')}
+        self.create_posts(8)
+        Follow.objects.create(user=self.authors[2], author=self.authors[3])
+        Follow.objects.create(user=self.authors[3], author=self.authors[4])
+        for model, queries in before.items():
+            with self.subTest(model=model):
+                self.assertEqual(self.changelist_queries(model), queries)
+
+    def test_keyset_paging(self):
+        """Список листается курсором до конца без повторов и пропусков."""
+        self.create_posts(7)
+        url = reverse('admin:posts_post_changelist')
+        seen = []
+        with mock.patch.object(admin.site._registry[Post],
+                               'list_per_page', 3):
+            while url:
+                response = self.client.get(url)
+                changelist = response.context['cl']
+                self.assertTrue(changelist.keyset)
+                seen.extend(post.pk for post in changelist.result_list)
+                url = (changelist.next_cursor
+                       and reverse('admin:posts_post_changelist')
+                       + changelist.next_url)
+        self.assertEqual(
+            seen, list(Post.objects.order_by('-pub_date', '-pk')
+                       .values_list('pk', flat=True))
+        )
+
+    def test_sorted_changelist_uses_pages(self):
+        """При сортировке по столбцу работает обычная пагинация."""
+        self.create_posts(3)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'o': '1'}
+        )
+        self.assertFalse(response.context['cl'].keyset)
+        self.assertEqual(response.context['cl'].result_count, 3)
+
+    def test_group_is_not_a_select(self):
+        """Редактируемая группа — поле id, а не список всех групп."""
+        self.create_posts(1)
+        response = self.client.get(reverse('admin:posts_post_changelist'))
+        self.assertNotContains(response, '<select name="form-0-group"')
+        self.assertContains(response, 'name="form-0-group"')
+
+
+@override_settings(TASKS_ALWAYS_EAGER=True, BATCH_JOB_CHUNK=2)
+class BulkActionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser(
+            username='admin', password='pass', email='admin@example.com'
+        )
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='test'
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+        self.posts = [
+            Post.objects.create(text=f'Пост {number}', author=self.author)
+            for number in range(5)
+        ]
+        for post in self.posts:
+            Comment.objects.create(post=post, author=self.other, text='К')
+
+    def run_action(self, model, action, target=''):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse(f'admin:posts_{model}_changelist'),
+                {'action': action, 'select_across': '1', 'index': '0',
+                 'target': target, '_selected_action': ['0']},
+            )
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        return BatchJob.objects.get()
+
+    def test_default_delete_action_removed(self):
+        """Штатное удаление заменено фоновым."""
+        response = self.client.get(reverse('admin:posts_post_changelist'))
+        actions = response.context['action_form'].fields['action'].choices
+        names = [name for name, _ in actions]
+        self.assertNotIn('delete_selected', names)
+        self.assertIn('delete_posts', names)
+
+    def test_delete_posts(self):
+        """Посты удаляются в фоне вместе с комментариями."""
+        job = self.run_action('post', 'delete_posts')
+        self.assertEqual((job.status, job.processed), (BatchJob.DONE, 5))
+        self.assertFalse(Post.objects.exists())
+        self.assertFalse(Comment.objects.exists())
+
+    def test_move_posts(self):
+        """Посты переносятся в группу по её slug."""
+        self.run_action('post', 'move_posts', self.group.slug)
+        self.assertEqual(Post.objects.filter(group=self.group).count(), 5)
+
+    def test_unknown_target(self):
+        """Неизвестная цель не запускает задание."""
+        self.client.post(
+            reverse('admin:posts_post_changelist'),
+            {'action': 'reassign_posts', 'select_across': '1',
+             'index': '0', 'target': 'nobody', '_selected_action': ['0']},
+        )
+        self.assertFalse(BatchJob.objects.exists())
+
+    def test_delete_comments_updates_counts(self):
+        """Удаление комментариев уменьшает счётчики постов."""
+        self.run_action('comment', 'delete_comments')
+        self.assertEqual(
+            list(Post.objects.values_list('comments_count', flat=True)),
+            [0] * 5,
+        )
+
+    def test_reassign_follows_keeps_unique(self):
+        """Перевод подписок не создаёт дублей и подписок на себя."""
+        readers = [
+            User.objects.create_user(username=f'reader{number}')
+            for number in range(3)
+        ]
+        for reader in readers:
+            Follow.objects.create(user=reader, author=self.author)
+            Follow.objects.create(user=reader, author=self.admin_user)
+        Follow.objects.create(user=self.other, author=self.author)
+        Follow.objects.create(user=readers[0], author=self.other)
+        bulk.reassign_follows(Follow.objects.all(), self.other.pk)
+        self.assertEqual(
+            sorted(Follow.objects.values_list('user', 'author')),
+            sorted((reader.pk, self.other.pk) for reader in readers),
+        )
+
+    def test_delete_user_in_background(self):
+        """Удаление пользователя в админке выключает его без каскада."""
+        with self.captureOnCommitCallbacks():
+            response = self.client.post(
+                reverse('admin:auth_user_delete', args=(self.author.pk,)),
+                {'post': 'yes'},
+            )
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        self.author.refresh_from_db()
+        self.assertFalse(self.author.is_active)
+        self.assertEqual(Post.objects.count(), 5)
@@ -0,0 +1,57 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db.models import F, Sum
+from django.test import TestCase, override_settings
+
+from ..models import Comment, Follow, Group, Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class GenerateDataTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_generate_data(self):
+        """Команда создаёт заданный объём согласованных данных."""
+        call_command(
+            'generate_data', users=30, groups=3, posts=200, comments=50,
+            follows=5, batch=40, stdout=StringIO(),
+        )
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 50)
+        self.assertTrue(Follow.objects.exists())
+        self.assertFalse(Follow.objects.filter(user=F('author')).exists())
+        self.assertEqual(
+            Post.objects.aggregate(total=Sum('comments_count'))['total'], 50
+        )
+        self.assertGreater(Post.objects.dates('pub_date', 'day').count(), 1)
+
+
+class BenchTemplatesTests(TestCase):
+    def test_bench_templates(self):
+        """Замер проходит по всем шаблонам без запросов к БД и пишет историю."""
+        history = tempfile.NamedTemporaryFile(suffix='.jsonl', delete=False)
+        history.close()
+        self.addCleanup(os.remove, history.name)
+        for _ in range(2):
+            call_command(
+                'bench_templates', sizes='1,3', number=1, repeat=1,
+                history=history.name, stdout=StringIO(),
+            )
+        with open(history.name) as file:
+            records = [json.loads(line) for line in file]
+        self.assertEqual(len(records), 2)
+        self.assertEqual(len(records[-1]['results']), 10)
+        self.assertIn('post_detail:3', records[-1]['results'])
@@ -0,0 +1,104 @@
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.models import BatchJob
+from ..deletion import delete_group, delete_user
+from ..models import Comment, Follow, FollowSuggestion, Group, Post, User
+
+
+@override_settings(TASKS_ALWAYS_EAGER=True, BATCH_JOB_CHUNK=2)
+class DeletionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='test'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.posts = [
+            Post.objects.create(text=f'Пост {number}', author=self.author,
+                                group=self.group)
+            for number in range(3)
+        ]
+        self.reader_post = Post.objects.create(text='Чужой пост',
+                                               author=self.reader)
+        Comment.objects.create(post=self.posts[0], author=self.reader,
+                               text='Ответ')
+        Comment.objects.create(post=self.reader_post, author=self.author,
+                               text='Комментарий')
+        Follow.objects.create(user=self.reader, author=self.author)
+        FollowSuggestion.objects.create(user=self.reader,
+                                        author=self.author, score=1)
+
+    def run_on_commit(self, func, *args):
+        """Выполняет функцию и по цепочке всё, что она отложила."""
+        with self.captureOnCommitCallbacks() as callbacks:
+            func(*args)
+        while callbacks:
+            callback = callbacks.pop(0)
+            with self.captureOnCommitCallbacks() as added:
+                callback()
+            callbacks.extend(added)
+
+    def test_deleted_user_hidden_at_once(self):
+        """Выключенный автор сразу пропадает из лент и профиля."""
+        with self.captureOnCommitCallbacks():
+            delete_user(self.author)
+        self.assertTrue(Post.objects.filter(author=self.author).exists())
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']],
+            [self.reader_post.pk],
+        )
+        response = self.client.get(
+            reverse('posts:profile', args=(self.author.username,))
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.reader_post.pk,))
+        )
+        self.assertEqual(list(response.context['comments']), [])
+
+    def test_user_purged_in_background(self):
+        """Данные пользователя удаляются порциями, затем и он сам."""
+        self.run_on_commit(delete_user, self.author)
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+        self.assertEqual(list(Post.objects.all()), [self.reader_post])
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(FollowSuggestion.objects.exists())
+        self.reader_post.refresh_from_db()
+        self.assertEqual(self.reader_post.comments_count, 0)
+        self.assertEqual(
+            list(BatchJob.objects.order_by('pk')
+                 .values_list('name', 'status')),
+            [('posts.bulk.delete_posts', BatchJob.DONE),
+             ('posts.bulk.delete_comments', BatchJob.DONE),
+             ('posts.bulk.delete_follows', BatchJob.DONE),
+             ('posts.bulk.delete_suggestions', BatchJob.DONE)],
+        )
+
+    def test_group_purged_in_background(self):
+        """Группа скрывается, посты отвязываются от неё в фоне."""
+        with self.captureOnCommitCallbacks() as callbacks:
+            delete_group(self.group)
+        response = self.client.get(
+            reverse('posts:group_list', args=(self.group.slug,))
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(len(response.context['page_obj']), 4)
+        self.assertNotContains(
+            response, reverse('posts:group_list', args=(self.group.slug,))
+        )
+        for callback in callbacks:
+            self.run_on_commit(callback)
+        self.assertFalse(Group.objects.exists())
+        self.assertEqual(Post.objects.count(), 4)
+        self.assertFalse(Post.objects.exclude(group=None).exists())
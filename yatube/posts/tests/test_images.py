@@ -0,0 +1,92 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def upload(name):
+    return SimpleUploadedFile(name, SMALL_GIF, content_type='image/gif')
+
+
+def thumbnail_names(name):
+    """Имена миниатюр файла, записанные в хранилище sorl.thumbnail."""
+    kvstore = default.kvstore
+    keys = kvstore._get(ImageFile(name).key, identity='thumbnails')
+    return [kvstore._get(key).name for key in keys or ()]
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, TASKS_ALWAYS_EAGER=True)
+class PostImageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_login(self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post = Post.objects.create(
+                text='Пост', author=self.author, image=upload('old.gif')
+            )
+        self.old_name = self.post.image.name
+
+    def test_new_image_thumbnails_prewarmed(self):
+        """Миниатюры загруженной картинки создаются сразу."""
+        thumbnails = thumbnail_names(self.old_name)
+        self.assertEqual(len(thumbnails), len(settings.POST_THUMBNAILS))
+        self.assertTrue(default_storage.exists(thumbnails[0]))
+
+    def test_replaced_image_cleaned_up(self):
+        """При замене картинки старый файл и его миниатюры удаляются."""
+        old_thumbnails = thumbnail_names(self.old_name)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse('posts:post_edit', args=(self.post.pk,)),
+                {'text': 'Пост', 'image': upload('new.gif')},
+            )
+        self.post.refresh_from_db()
+        self.assertNotEqual(self.post.image.name, self.old_name)
+        self.assertFalse(default_storage.exists(self.old_name))
+        self.assertFalse(default_storage.exists(old_thumbnails[0]))
+        self.assertTrue(thumbnail_names(self.post.image.name))
+
+    def test_unchanged_image_skipped(self):
+        """Сохранение без смены картинки не ставит задач."""
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post(
+                reverse('posts:post_edit', args=(self.post.pk,)),
+                {'text': 'Другой текст'},
+            )
+            post = Post.objects.get(pk=self.post.pk)
+            post.text = 'Ещё текст'
+            post.save()
+        self.assertEqual(callbacks, [])
+        self.assertTrue(default_storage.exists(self.old_name))
+
+    def test_deleted_post_image_removed(self):
+        """Удаление поста удаляет и файл картинки."""
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.get(pk=self.post.pk).delete()
+        self.assertFalse(default_storage.exists(self.old_name))
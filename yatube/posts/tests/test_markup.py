@@ -0,0 +1,83 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import markup
+from ..models import Comment, Post, User
+
+
+class MarkupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_markdown_rendered(self):
+        """Разметка Markdown превращается в HTML."""
+        self.assertHTMLEqual(
+            markup.render('**жирный** и *курсив*\n\n- раз\n- два'),
+            '<p><strong>жирный</strong> и <em>курсив</em></p>'
+            '<ul><li>раз</li><li>два</li></ul>',
+        )
+
+    def test_unsafe_html_removed(self):
+        """Сырой HTML, обработчики событий и javascript: вырезаются."""
+        html = markup.render(
+            '<script>alert(1)</script> <img src=x onerror=alert(2)> '
+            '[ссылка](javascript:alert(3)) <b onclick="x()">b</b>'
+        )
+        for fragment in ('<script', '<img', 'onerror', 'javascript:',
+                         'onclick', '<b'):
+            with self.subTest(fragment=fragment):
+                self.assertNotIn(fragment, html)
+
+    def test_links_get_nofollow(self):
+        """Ссылки, в том числе голые адреса, получают rel=nofollow."""
+        html = markup.render('[сайт](https://example.com) и http://a.ru')
+        self.assertEqual(html.count('rel="nofollow"'), 2)
+
+    def test_html_stored_on_save(self):
+        """HTML считается при сохранении, а не при показе."""
+        post = Post.objects.create(text='*Пост*', author=self.author)
+        comment = Comment.objects.create(post=post, author=self.author,
+                                         text='`код`')
+        self.assertEqual(post.text_html, '<p><em>Пост</em></p>')
+        self.assertEqual(comment.text_html, '<p><code>код</code></p>')
+        post.text = '**Правка**'
+        post.save(update_fields=['text'])
+        post.refresh_from_db()
+        self.assertEqual(post.text_html, '<p><strong>Правка</strong></p>')
+        self.assertEqual(post.markup_version, markup.VERSION)
+        with mock.patch('posts.markup.render') as render:
+            response = self.client.get(reverse('posts:index'))
+        render.assert_not_called()
+        self.assertContains(response, '<strong>Правка</strong>')
+
+    @override_settings(TASKS_ALWAYS_EAGER=True)
+    def test_render_markup_command(self):
+        """Команда пересчитывает только устаревшие записи."""
+        stale = Post.objects.create(text='*Старый*', author=self.author)
+        fresh = Post.objects.create(text='*Новый*', author=self.author)
+        Post.objects.filter(pk=stale.pk).update(text_html='',
+                                                markup_version=0)
+        Post.objects.filter(pk=fresh.pk).update(text_html='как есть')
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('render_markup', stdout=StringIO())
+        stale.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual(stale.text_html, '<p><em>Старый</em></p>')
+        self.assertEqual(stale.markup_version, markup.VERSION)
+        self.assertEqual(fresh.text_html, 'как есть')
+
+    def test_unrendered_text_escaped(self):
+        """До пересчёта старый текст выводится экранированным."""
+        post = Post.objects.create(text='<i>x</i>\nстрока', author=self.author)
+        post.text_html = ''
+        self.assertEqual(post.formatted_text,
+                         '<p>&lt;i&gt;x&lt;/i&gt;<br>строка</p>')
@@ -0,0 +1,69 @@
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..models import Post, User
+from ..partitions import add_months, partition_name
+from ..utils import COUNT_VERSION_KEY, FeedPaginator
+
+
+class PartitionTests(TestCase):
+    def test_months(self):
+        """Границы партиций считаются по календарным месяцам."""
+        self.assertEqual(add_months(date(2024, 11, 1), 3), date(2025, 2, 1))
+        self.assertEqual(add_months(date(2024, 1, 1), -1), date(2023, 12, 1))
+        self.assertEqual(
+            partition_name('posts_post', date(2024, 3, 1)),
+            'posts_post_p202403',
+        )
+
+    def test_command_requires_postgresql(self):
+        """Вне PostgreSQL команда завершается понятной ошибкой."""
+        with self.assertRaises(CommandError):
+            call_command('partition_posts')
+
+
+@override_settings(FEED_RECENT_DAYS=30)
+class FeedPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='author')
+        Post.objects.bulk_create(
+            Post(text=f'Пост {number}', author=author)
+            for number in range(5)
+        )
+        now = timezone.now()
+        for number, pk in enumerate(
+            Post.objects.order_by('pk').values_list('pk', flat=True)
+        ):
+            Post.objects.filter(pk=pk).update(
+                pub_date=now - timedelta(days=number * 20)
+            )
+
+    def test_pages_match_full_feed(self):
+        """Страницы совпадают с лентой без ограничения по дате."""
+        posts = list(Post.objects.all())
+        paginator = FeedPaginator(Post.objects.all(), 2)
+        self.assertEqual(paginator.count, 5)
+        for number in paginator.page_range:
+            with self.subTest(page=number):
+                self.assertEqual(
+                    list(paginator.page(number)),
+                    posts[(number - 1) * 2:number * 2],
+                )
+
+    def test_count_version_moves_on_create_and_delete(self):
+        """Правка поста не сбрасывает числа записей, создание и удаление —
+        сбрасывают."""
+        version = cache.get_or_set(COUNT_VERSION_KEY, 0, None)
+        post = Post.objects.first()
+        post.text = 'Правка'
+        post.save()
+        self.assertEqual(cache.get(COUNT_VERSION_KEY), version)
+        Post.objects.create(text='Новый', author=post.author)
+        self.assertEqual(cache.get(COUNT_VERSION_KEY), version + 1)
+        post.delete()
+        self.assertEqual(cache.get(COUNT_VERSION_KEY), version + 2)
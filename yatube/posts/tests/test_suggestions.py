@@ -0,0 +1,76 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Follow, FollowSuggestion, User
+from ..suggestions import (build_graphs, follows_changed,
+                           refresh_suggestions, suggest)
+
+
+class FollowSuggestionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = {
+            name: User.objects.create_user(username=name)
+            for name in ('reader', 'friend', 'writer', 'other', 'neighbour')
+        }
+        for user, author in (
+            ('reader', 'friend'),
+            ('friend', 'writer'),
+            ('neighbour', 'friend'),
+            ('neighbour', 'other'),
+            ('neighbour', 'writer'),
+        ):
+            Follow.objects.create(
+                user=cls.users[user], author=cls.users[author]
+            )
+
+    def suggested(self, name):
+        return list(
+            FollowSuggestion.objects.filter(user=self.users[name])
+            .order_by('-score').values_list('author__username', flat=True)
+        )
+
+    def test_suggest(self):
+        """Друзья друзей весят больше совместных подписок."""
+        edges = Follow.objects.values_list('user_id', 'author_id')
+        following, followers = build_graphs(edges)
+        result = suggest(self.users['reader'].pk, following, followers,
+                         limit=10, fanout=10)
+        self.assertEqual(
+            [author for author, _ in result],
+            [self.users['writer'].pk, self.users['other'].pk],
+        )
+
+    def test_command_and_refresh_agree(self):
+        """Полный пересчёт и пересчёт одного пользователя совпадают."""
+        call_command('compute_suggestions', stdout=StringIO())
+        self.assertEqual(self.suggested('reader'), ['writer', 'other'])
+        full = self.suggested('neighbour')
+        refresh_suggestions(self.users['neighbour'].pk)
+        self.assertEqual(self.suggested('neighbour'), full)
+
+    def test_command_drops_users_without_follows(self):
+        """Полный пересчёт удаляет рекомендации отписавшихся от всех."""
+        call_command('compute_suggestions', stdout=StringIO())
+        self.assertNotEqual(self.suggested('reader'), [])
+        Follow.objects.filter(user=self.users['reader']).delete()
+        call_command('compute_suggestions', stdout=StringIO())
+        self.assertEqual(self.suggested('reader'), [])
+
+    def test_followed_author_leaves_suggestions(self):
+        """Подписка сразу убирает автора из рекомендаций."""
+        refresh_suggestions(self.users['reader'].pk)
+        self.client.force_login(self.users['reader'])
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            [user.username for user in response.context['suggestions']],
+            ['writer', 'other'],
+        )
+        Follow.objects.create(
+            user=self.users['reader'], author=self.users['writer']
+        )
+        follows_changed(self.users['reader'].pk, [self.users['writer'].pk])
+        self.assertEqual(self.suggested('reader'), ['other'])
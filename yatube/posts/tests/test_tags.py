@@ -0,0 +1,114 @@
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import bulk, markup
+from ..models import Mention, Post, PostTag, Tag, User
+
+
+class TagParsingTests(TestCase):
+    def test_hashtags(self):
+        """Теги в нижнем регистре, ложные совпадения пропускаются."""
+        self.assertEqual(
+            markup.hashtags(
+                '#Python и #джанго, #2022, a#b, http://x.ru/#anchor, '
+                '&#39; #python'
+            ),
+            {'python', 'джанго'},
+        )
+
+    def test_mentions(self):
+        """Упоминания — имена после @, но не адреса почты."""
+        self.assertEqual(
+            markup.mentions('@alice, @bob.smith. и mail@example.com'),
+            {'alice', 'bob.smith'},
+        )
+
+    def test_render_links(self):
+        """Теги и упоминания становятся ссылками, заголовки — с пробелом."""
+        html = markup.render('#Python от @alice\n\n`#code`')
+        self.assertIn(
+            f'<a href="{reverse("posts:tag_posts", args=("python",))}" '
+            f'rel="nofollow">#Python</a>', html
+        )
+        self.assertIn(reverse('posts:profile', args=('alice',)), html)
+        self.assertIn('<code>#code</code>', html)
+
+
+@override_settings(PAGE_SIZE=2)
+class TagFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        cache.clear()
+
+    def create_post(self, text):
+        return Post.objects.create(text=text, author=self.author)
+
+    def test_tags_indexed_on_save(self):
+        """Теги и упоминания пересчитываются при правке текста."""
+        post = self.create_post('#Раз #два @reader @author @nobody')
+        self.assertEqual(
+            set(post.post_tags.values_list('tag__name', flat=True)),
+            {'раз', 'два'},
+        )
+        self.assertEqual(list(post.mentions.values_list('user', flat=True)),
+                         [self.reader.pk])
+        post.text = '#два #три'
+        post.save()
+        self.assertEqual(
+            set(post.post_tags.values_list('tag__name', flat=True)),
+            {'два', 'три'},
+        )
+        self.assertFalse(post.mentions.exists())
+        self.assertEqual(
+            PostTag.objects.get(post=post, tag__name='три').pub_date,
+            post.pub_date,
+        )
+
+    def test_tag_feed_keyset(self):
+        """Лента тега листается курсором от новых постов к старым."""
+        posts = [self.create_post(f'Пост {number} #Тег')
+                 for number in range(3)]
+        self.create_post('Без тега')
+        url = reverse('posts:tag_posts', args=('ТЕГ',))
+        response = self.client.get(url)
+        self.assertEqual(response.context['posts'], posts[:0:-1])
+        response = self.client.get(url, {'after': response.context['cursor']})
+        self.assertEqual(response.context['posts'], [posts[0]])
+        self.assertIsNone(response.context['cursor'])
+
+    def test_unknown_tag(self):
+        """Лента несуществующего тега отвечает 404."""
+        response = self.client.get(
+            reverse('posts:tag_posts', args=('нет',))
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_mentions_page(self):
+        """На странице упоминаний — посты с именем пользователя."""
+        post = self.create_post('Привет, @reader!')
+        self.create_post('Привет всем')
+        self.client.force_login(self.reader)
+        response = self.client.get(reverse('posts:mentions'))
+        self.assertEqual(response.context['posts'], [post])
+
+    def test_render_markup_indexes_old_posts(self):
+        """Пересчёт разметки заполняет теги постов, созданных до них."""
+        post = self.create_post('#тег')
+        PostTag.objects.all().delete()
+        bulk.render_markup(Post.objects.all())
+        self.assertTrue(post.post_tags.filter(tag__name='тег').exists())
+
+    def test_deleted_posts_leave_no_tags(self):
+        """Массовое удаление постов удаляет их теги и упоминания."""
+        self.create_post('#тег @reader')
+        bulk.delete_posts(Post.objects.all())
+        self.assertFalse(PostTag.objects.exists())
+        self.assertFalse(Mention.objects.exists())
+        self.assertTrue(Tag.objects.exists())
@@ -0,0 +1,119 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import bulk
+from ..models import FeedMark, Follow, Post, User
+from ..unread import load_recent_by_author, unread_counts
+
+
+class UnreadCountsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.stranger = User.objects.create_user(username='stranger')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+        Post.objects.create(text='Старый пост', author=self.author)
+
+    def create_posts(self, author, count):
+        with self.captureOnCommitCallbacks(execute=True):
+            for number in range(count):
+                Post.objects.create(text=f'Пост {number}', author=author)
+
+    def visit(self):
+        for name in ('posts:index', 'posts:follow_index'):
+            self.client.get(reverse(name))
+        cache.clear()
+
+    def test_counts_new_posts_since_visit(self):
+        """Счётчики вкладок считают посты новее отметки просмотра."""
+        self.assertEqual(unread_counts(self.reader),
+                         {FeedMark.INDEX: '', FeedMark.FOLLOW: ''})
+        self.visit()
+        self.create_posts(self.author, 2)
+        self.create_posts(self.stranger, 1)
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['unread'],
+                         {FeedMark.INDEX: '3', FeedMark.FOLLOW: ''})
+        self.assertContains(response, '<span class="badge bg-primary">3')
+
+    def test_counts_served_from_cache(self):
+        """Новые посты дописываются в кэш, счётчики не обращаются к БД."""
+        self.visit()
+        unread_counts(self.reader)
+        self.create_posts(self.author, 1)
+        with self.assertNumQueries(0):
+            counts = unread_counts(self.reader)
+        self.assertEqual(counts, {FeedMark.INDEX: '1', FeedMark.FOLLOW: '1'})
+
+    def test_cold_cache_queries_do_not_grow(self):
+        """Списки всех авторов загружаются одним запросом."""
+        self.visit()
+        self.create_posts(self.author, 2)
+        cache.clear()
+        with self.assertNumQueries(4):
+            counts = unread_counts(self.reader)
+        self.assertEqual(counts[FeedMark.FOLLOW], '2')
+        for number in range(3):
+            author = User.objects.create_user(username=f'writer{number}')
+            Follow.objects.create(user=self.reader, author=author)
+            self.create_posts(author, 1)
+        cache.clear()
+        with self.assertNumQueries(4):
+            counts = unread_counts(self.reader)
+        self.assertEqual(counts[FeedMark.FOLLOW], '5')
+
+    def test_bulk_delete_resets_counts(self):
+        """Массовое удаление постов сбрасывает закэшированные списки."""
+        self.visit()
+        self.create_posts(self.author, 2)
+        self.assertEqual(unread_counts(self.reader)[FeedMark.FOLLOW], '2')
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk.delete_posts(Post.objects.all())
+        self.assertEqual(unread_counts(self.reader),
+                         {FeedMark.INDEX: '', FeedMark.FOLLOW: ''})
+
+    @override_settings(UNREAD_LIMIT=2)
+    def test_counts_capped(self):
+        """Больше UNREAD_LIMIT новых записей показывается как «N+»."""
+        self.visit()
+        self.create_posts(self.author, 3)
+        self.assertEqual(unread_counts(self.reader)[FeedMark.FOLLOW], '2+')
+
+    @override_settings(UNREAD_LIMIT=2)
+    @mock.patch('posts.unread.RECENT_QUERY_AUTHORS', 2)
+    def test_recent_lists_bounded_per_author(self):
+        """Для каждого автора читается не больше UNREAD_LIMIT дат."""
+        self.create_posts(self.author, 3)
+        self.create_posts(self.stranger, 1)
+        authors = [self.author.pk, self.stranger.pk, self.reader.pk]
+        with self.assertNumQueries(2):
+            recent = load_recent_by_author(authors)
+        dates = {
+            author_id: [
+                moment.timestamp() for moment in
+                Post.objects.filter(author=author_id)
+                .values_list('pub_date', flat=True)[:2]
+            ]
+            for author_id in authors
+        }
+        self.assertEqual(recent, dates)
+        self.assertEqual([len(recent[pk]) for pk in authors], [2, 1, 0])
+
+    @override_settings(PAGE_SIZE=1)
+    def test_later_pages_keep_mark(self):
+        """Отметку сдвигает только первая страница ленты."""
+        self.visit()
+        mark = FeedMark.objects.get(user=self.reader, feed=FeedMark.INDEX)
+        self.create_posts(self.author, 1)
+        self.client.get(reverse('posts:index'), {'page': 2})
+        self.assertEqual(
+            FeedMark.objects.get(pk=mark.pk).seen, mark.seen
+        )
@@ -1,6 +1,7 @@
 from http import HTTPStatus
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import Client, TestCase
 
 from ..models import Group, Post
@@ -25,6 +26,9 @@ class PostURLTests(TestCase):
             author=cls.author,
         )
 
+    def setUp(self):
+        cache.clear()
+
     def test_pages_available_to_everyone(self):
         """Общедоступные страницы"""
         available_pages = [
@@ -1,16 +1,20 @@
 import shutil
 import tempfile
+from unittest import mock, skipUnless
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import engines
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
 from yatube.settings import PAGE_SIZE
-from ..models import Follow, Group, Post
+from ..models import Comment, Follow, Group, Post
+from ..templatetags import post_cards
+from ..templatetags.post_cards import render_cards
 
 User = get_user_model()
 
@@ -64,6 +68,9 @@ class PostPagesTests(TestCase):
         shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
         super().tearDownClass()
 
+    def setUp(self):
+        cache.clear()
+
     def test_pages_uses_correct_template(self):
         """URL-адрес использует соответствующий шаблон."""
         templates_pages_names = {
@@ -211,7 +218,7 @@ class PostPagesTests(TestCase):
         """Авторизованный пользователь может подписываться
         на других пользователей."""
         follow_count = Follow.objects.count()
-        self.authorized_client.get(
+        self.authorized_client.post(
             reverse(
                 'posts:profile_follow',
                 kwargs={'username': self.follower}
@@ -224,13 +231,13 @@ class PostPagesTests(TestCase):
         """Авторизованный пользователь может отписаться от
         пользователей."""
         follow_count = Follow.objects.count()
-        self.authorized_client.get(
+        self.authorized_client.post(
             reverse(
                 'posts:profile_follow',
                 kwargs={'username': self.follower}
             )
         )
-        self.authorized_client.get(
+        self.authorized_client.post(
             reverse(
                 'posts:profile_unfollow',
                 kwargs={'username': self.follower}
@@ -241,7 +248,7 @@ class PostPagesTests(TestCase):
 
     def test_follow_posts(self):
         """Посты отобразились у подписчика и наоборот, если не подписан."""
-        self.authorized_client.get(
+        self.authorized_client.post(
             reverse(
                 'posts:profile_follow',
                 kwargs={'username': self.follower})
@@ -258,7 +265,7 @@ class PostPagesTests(TestCase):
 
     def test_i_not_can_subscribe_to_myself(self):
         """Не может подписаться на самого себя"""
-        self.authorized_client.get(
+        self.authorized_client.post(
             reverse('posts:profile_follow', kwargs={'username': self.author}))
         follow = Follow.objects.filter(user=self.author).count()
         self.assertEqual(follow, 0)
@@ -305,3 +312,308 @@ class PostPaginatorTests(TestCase):
             response = self.authorized_client.get(reverse_name + "?page=2")
             self.assertEqual(
                 len(response.context["page_obj"]), post_count - PAGE_SIZE)
+
+
+@override_settings(COMMENTS_PAGE_SIZE=2)
+class PostCommentsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.post = Post.objects.create(text="Тестовый пост", author=cls.author)
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.post, author=cls.author, text=f"Комментарий {x}"
+            )
+            for x in range(5)
+        ]
+
+    def test_comments_count_is_denormalized(self):
+        """Счётчик комментариев обновляется при добавлении и удалении."""
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 5)
+        Comment.objects.filter(pk=self.comments[0].pk).first().delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 4)
+
+    def test_comments_are_paginated_by_cursor(self):
+        """Комментарии отдаются порциями по курсору в порядке создания."""
+        response = self.client.get(
+            reverse("posts:post_detail", kwargs={"post_id": self.post.pk})
+        )
+        self.assertEqual(response.context["comments"], self.comments[:2])
+        seen = list(response.context["comments"])
+        cursor = response.context["comments_cursor"]
+        while cursor:
+            response = self.client.get(
+                reverse("posts:post_comments",
+                        kwargs={"post_id": self.post.pk}),
+                {"after": cursor},
+            )
+            self.assertTemplateUsed(response, "posts/includes/comments.html")
+            seen += response.context["comments"]
+            cursor = response.context["comments_cursor"]
+        self.assertEqual(seen, self.comments)
+
+    def test_bad_cursor_and_missing_post(self):
+        """Некорректный курсор даёт первую порцию, чужой пост — 404."""
+        url = reverse("posts:post_comments", kwargs={"post_id": self.post.pk})
+        for cursor in ("99999999999999999999999_1", "1_99999999999999999999",
+                       "-1_1", "x"):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(url, {"after": cursor})
+                self.assertEqual(response.context["comments"],
+                                 self.comments[:2])
+        response = self.client.get(
+            reverse("posts:post_comments", kwargs={"post_id": 0})
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class PostCardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='card-author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='card-group', description='test'
+        )
+        cls.post = Post.objects.create(
+            text='Карточка', author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_card_rendered_once(self):
+        """Повторный показ ленты берёт карточку из кэша."""
+        self.client.get(reverse('posts:index'))
+        with mock.patch(
+            'posts.templatetags.post_cards.get_template'
+        ) as get_template:
+            response = self.client.get(
+                reverse('posts:group_list', args=(self.group.slug,))
+            )
+        self.assertContains(response, 'Карточка')
+        get_template.assert_not_called()
+
+    @skipUnless('jinja2' in engines, 'нет движка Jinja2')
+    def test_engines_do_not_share_cards(self):
+        """Карточки Django и Jinja2 кэшируются отдельно."""
+        render_cards([self.post])
+        with mock.patch(
+            'posts.templatetags.post_cards.get_template',
+            wraps=post_cards.get_template,
+        ) as get_template:
+            render_cards([self.post], using='jinja2')
+        get_template.assert_called_once()
+
+    def test_card_changes_with_post(self):
+        """После правки поста карточка рендерится заново."""
+        url = reverse('posts:group_list', args=(self.group.slug,))
+        self.client.get(url)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Исправлено'
+        post.save()
+        response = self.client.get(url)
+        self.assertContains(response, 'Исправлено')
+        self.assertNotContains(response, 'Карточка')
+        Post.objects.filter(pk=self.post.pk).update(
+            text_html='<p>Перерисовано</p>'
+        )
+        self.assertContains(self.client.get(url), 'Перерисовано')
+
+
+@override_settings(PAGE_SIZE=2)
+class FeedFragmentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='fragment-author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='fragment-group', description='test'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.posts = [
+            Post.objects.create(text=f'Пост {number}', author=cls.author,
+                                group=cls.group)
+            for number in range(5)
+        ][::-1]
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def test_fragments_continue_feeds(self):
+        """Фрагменты по курсору догружают ленты без шапки страницы."""
+        feeds = (
+            ('posts:index', ()),
+            ('posts:group_list', (self.group.slug,)),
+            ('posts:profile', (self.author.username,)),
+            ('posts:follow_index', ()),
+        )
+        for name, args in feeds:
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name, args=args))
+                seen = list(response.context['page_obj'])
+                url = response.context['more_url']
+                self.assertContains(response, url)
+                while url:
+                    response = self.client.get(url)
+                    self.assertTemplateUsed(
+                        response, 'posts/includes/feed_page.html'
+                    )
+                    self.assertNotContains(response, '<html')
+                    seen += response.context['posts']
+                    url = response.context['more_url']
+                self.assertEqual(seen, self.posts)
+
+    def test_fragment_json(self):
+        """С format=json фрагмент отдаёт карточки и следующий адрес."""
+        response = self.client.get(
+            reverse('posts:group_more', args=(self.group.slug,)),
+            {'format': 'json'},
+        )
+        data = response.json()
+        self.assertEqual(len(data['cards']), 2)
+        self.assertIn('Пост 4', data['cards'][0])
+        response = self.client.get(data['next'])
+        self.assertIn('Пост 2', response.json()['cards'][0])
+
+    def test_last_page_has_no_more(self):
+        """На последней странице ссылки на продолжение нет."""
+        response = self.client.get(reverse('posts:index'), {'page': 3})
+        self.assertIsNone(response.context['more_url'])
+        self.assertNotContains(response, 'data-infinite')
+
+
+@skipUnless('jinja2' in engines, 'jinja2 не установлен')
+@override_settings(JINJA2_VIEWS=[
+    'posts:index', 'posts:group_list', 'posts:profile', 'posts:follow_index',
+])
+class Jinja2ListingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='jinja-author', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title='Группа Jinja2', slug='jinja-group', description='test'
+        )
+        for number in range(PAGE_SIZE + 1):
+            Post.objects.create(
+                text=f'Пост {number}', author=cls.author, group=cls.group
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.author)
+
+    def test_listings_rendered_by_jinja2(self):
+        """Ленты из JINJA2_VIEWS рендерятся Jinja2 с теми же данными."""
+        pages = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+        )
+        for url in pages:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.templates, [])
+                self.assertContains(response, 'Лев Толстой')
+                self.assertContains(response, f'Пост {PAGE_SIZE}')
+                self.assertContains(response, '?page=2')
+                self.assertContains(response, 'data-infinite')
+                self.assertContains(response, reverse('posts:mentions'))
+                self.assertContains(
+                    response, reverse('posts:group_list',
+                                      args=(self.group.slug,))
+                )
+
+
+class FollowEndpointTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author-{number}')
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_follow_requires_post(self):
+        """Подписка и отписка не меняют состояние по GET."""
+        for name in ('posts:profile_follow', 'posts:profile_unfollow'):
+            with self.subTest(name=name):
+                response = self.client.get(
+                    reverse(name, args=(self.authors[0].username,))
+                )
+                self.assertEqual(response.status_code, 405)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_follow_is_idempotent(self):
+        """Повторная подписка не создаёт дубль и не ставит пересчёт."""
+        url = reverse('posts:profile_follow',
+                      args=(self.authors[0].username,))
+        for _ in range(2):
+            response = self.client.post(url)
+            self.assertEqual(response.status_code, 302)
+        self.assertEqual(Follow.objects.filter(user=self.user).count(), 1)
+        with mock.patch('posts.views.follows_changed') as follows_changed:
+            self.client.post(url)
+        follows_changed.assert_not_called()
+        response = self.client.post(
+            reverse('posts:profile_follow', args=('nobody',))
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_follow_feed_count_tracks_follows(self):
+        """Число постов ленты подписок меняется после подписки, отписки
+        и выключения автора."""
+        for author in self.authors:
+            Post.objects.create(text='Пост', author=author)
+        feed = reverse('posts:follow_index')
+
+        def count():
+            return self.client.get(feed).context['page_obj'].paginator.count
+
+        self.assertEqual(count(), 0)
+        for author in self.authors[:2]:
+            self.client.post(
+                reverse('posts:profile_follow', args=(author.username,))
+            )
+            self.assertEqual(count(), self.authors.index(author) + 1)
+        self.client.post(reverse('posts:profile_unfollow',
+                                 args=(self.authors[0].username,)))
+        self.assertEqual(count(), 1)
+        self.authors[1].is_active = False
+        self.authors[1].save()
+        self.assertEqual(count(), 0)
+
+    def test_follow_bulk(self):
+        """Массовая подписка пропускает себя, неизвестных и уже подписанных."""
+        Follow.objects.create(user=self.user, author=self.authors[0])
+        usernames = [author.username for author in self.authors]
+        response = self.client.post(
+            reverse('posts:follow_bulk'),
+            data={'usernames': usernames + ['reader', 'nobody']},
+            content_type='application/json',
+        )
+        self.assertEqual(response.json(), {'requested': 5, 'found': 3})
+        self.assertEqual(
+            set(Follow.objects.filter(user=self.user)
+                .values_list('author__username', flat=True)),
+            set(usernames),
+        )
+        with mock.patch('posts.views.follows_changed') as follows_changed:
+            self.client.post(
+                reverse('posts:follow_bulk'), data={'usernames': usernames},
+                content_type='application/json',
+            )
+        follows_changed.assert_not_called()
+        response = self.client.post(
+            reverse('posts:follow_bulk'), data='[]',
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
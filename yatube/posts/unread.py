@@ -0,0 +1,200 @@
+"""Счётчики новых записей на вкладках лент.
+
+Для каждого пользователя и ленты хранится отметка — дата самого нового
+поста, который он видел. Число новых записей считается по закэшированным
+спискам дат последних постов: общему и каждого автора. Списки
+дополняются сигналом при создании поста, поэтому показ счётчиков
+обходится без COUNT по таблице постов. Длина списков ограничена
+``UNREAD_LIMIT``: больше этого числа счётчик показывает «N+».
+Массовые действия ``posts.bulk`` сбрасывают списки через
+``forget_recent``.
+
+Главная страница кэшируется целиком (``cache_compressed``), поэтому
+при повторном заходе в течение ``INDEX_CACHE_TIMEOUT`` её счётчики
+не пересчитываются и могут отставать на это время; отметка при этом
+уже стоит — её поставил первый показ той же страницы.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from .models import FeedMark, Post
+from .utils import get_following_ids
+
+FEEDS = (FeedMark.INDEX, FeedMark.FOLLOW)
+# авторов в одном запросе списков вне PostgreSQL
+RECENT_QUERY_AUTHORS = 200
+
+
+def recent_key(author_id=None):
+    if author_id is None:
+        return 'recent_posts'
+    return f'recent_posts:{author_id}'
+
+
+def mark_key(user_id, feed):
+    return f'feed_mark:{user_id}:{feed}'
+
+
+def load_recent(queryset):
+    return [
+        moment.timestamp() for moment in
+        queryset.order_by('-pub_date')
+        .values_list('pub_date', flat=True)[:settings.UNREAD_LIMIT]
+    ]
+
+
+def recent_by_author_queries(author_ids):
+    """SQL, читающий по каждому автору не больше ``UNREAD_LIMIT`` строк
+    индекса (автор, дата), и его параметры."""
+    table = connection.ops.quote_name(Post._meta.db_table)
+    limit = settings.UNREAD_LIMIT
+    if connection.vendor == 'postgresql':
+        yield (
+            f'SELECT p.id, p.author_id, p.pub_date FROM unnest(%s) AS a(id) '
+            f'CROSS JOIN LATERAL (SELECT id, author_id, pub_date '
+            f'FROM {table} WHERE author_id = a.id '
+            f'ORDER BY pub_date DESC LIMIT %s) AS p',
+            [list(author_ids), limit],
+        )
+        return
+    # без LATERAL те же выборки склеиваются через UNION ALL; SQLite
+    # ограничивает число частей, поэтому авторы идут пачками
+    part = (f'SELECT * FROM (SELECT id, author_id, pub_date FROM {table} '
+            f'WHERE author_id = %s ORDER BY pub_date DESC LIMIT %s)')
+    for start in range(0, len(author_ids), RECENT_QUERY_AUTHORS):
+        batch = author_ids[start:start + RECENT_QUERY_AUTHORS]
+        yield (
+            ' UNION ALL '.join([part] * len(batch)),
+            [value for author_id in batch for value in (author_id, limit)],
+        )
+
+
+def load_recent_by_author(author_ids):
+    """Списки дат последних постов нескольких авторов одним запросом."""
+    recent = {author_id: [] for author_id in author_ids}
+    if not recent:
+        return recent
+    for sql, params in recent_by_author_queries(list(recent)):
+        for post in Post.objects.raw(sql, params):
+            recent[post.author_id].append(post.pub_date)
+    return {
+        author_id: [moment.timestamp() for moment in
+                    sorted(moments, reverse=True)]
+        for author_id, moments in recent.items()
+    }
+
+
+def get_recent(author_ids):
+    """Даты последних постов авторов (None — всех), от новых к старым."""
+    keys = {recent_key(author_id): author_id for author_id in author_ids}
+    found = cache.get_many(keys)
+    missing = {}
+    authors = [author_id for key, author_id in keys.items()
+               if key not in found and author_id is not None]
+    for author_id, recent in load_recent_by_author(authors).items():
+        missing[recent_key(author_id)] = recent
+    if recent_key() in keys and recent_key() not in found:
+        missing[recent_key()] = load_recent(Post.objects.all())
+    if missing:
+        found.update(missing)
+        cache.set_many(missing, settings.UNREAD_CACHE_TIMEOUT)
+    return list(found.values())
+
+
+def post_created(post):
+    """Добавляет дату нового поста в закэшированные списки."""
+    moment = post.pub_date.timestamp()
+
+    def push():
+        for key in (recent_key(), recent_key(post.author_id)):
+            recent = cache.get(key)
+            # список, которого нет в кэше, загрузится при показе
+            if recent is not None:
+                recent = [moment, *recent][:settings.UNREAD_LIMIT]
+                cache.set(key, recent, settings.UNREAD_CACHE_TIMEOUT)
+
+    transaction.on_commit(push)
+
+
+def forget_recent(author_ids):
+    """Сбрасывает списки дат, когда посты авторов удалены или
+    переданы другим."""
+    keys = [recent_key(), *(recent_key(pk) for pk in author_ids)]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def post_deleted(post):
+    forget_recent([post.author_id])
+
+
+def get_marks(user_id):
+    keys = {mark_key(user_id, feed): feed for feed in FEEDS}
+    found = cache.get_many(keys)
+    marks = {keys[key]: value for key, value in found.items()}
+    if len(marks) < len(FEEDS):
+        stored = dict(
+            FeedMark.objects.filter(user=user_id)
+            .values_list('feed', 'seen')
+        )
+        for feed in FEEDS:
+            if feed not in marks:
+                seen = stored.get(feed)
+                # 0 — пользователь ещё не открывал ленту
+                marks[feed] = seen.timestamp() if seen else 0
+                cache.set(mark_key(user_id, feed), marks[feed],
+                          settings.UNREAD_CACHE_TIMEOUT)
+    return marks
+
+
+def mark_seen(user_id, feed, posts):
+    """Сдвигает отметку ленты до самого нового из показанных постов."""
+    if not posts:
+        return
+    newest = max(post.pub_date for post in posts)
+    if newest.timestamp() <= get_marks(user_id)[feed]:
+        return
+    FeedMark.objects.update_or_create(
+        user_id=user_id, feed=feed, defaults={'seen': newest}
+    )
+    cache.set(mark_key(user_id, feed), newest.timestamp(),
+              settings.UNREAD_CACHE_TIMEOUT)
+
+
+def count_newer(recent, mark):
+    count = 0
+    for moment in recent:
+        if moment <= mark:
+            break
+        count += 1
+    return count
+
+
+def unread_counts(user):
+    """Подписи счётчиков вкладок: '' — новых записей нет."""
+    if not user.is_authenticated:
+        return {}
+    marks = get_marks(user.pk)
+    counts = {}
+    for feed in FEEDS:
+        if not marks[feed]:
+            counts[feed] = 0
+            continue
+        author_ids = ([None] if feed == FeedMark.INDEX
+                      else get_following_ids(user.pk))
+        counts[feed] = sum(count_newer(recent, marks[feed])
+                           for recent in get_recent(author_ids))
+    limit = settings.UNREAD_LIMIT
+    return {feed: '' if not count else f'{limit}+' if count >= limit
+            else str(count) for feed, count in counts.items()}
+
+
+def visit_feed(request, feed, page_obj):
+    """Отмечает первую страницу ленты просмотренной и возвращает
+    подписи счётчиков вкладок."""
+    if not request.user.is_authenticated:
+        return {}
+    if page_obj.number == 1:
+        mark_seen(request.user.pk, feed, page_obj)
+    return unread_counts(request.user)
@@ -1,8 +1,201 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+
 from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Q
+from django.http import Http404
+from django.shortcuts import render
+from django.template import engines
+from django.utils import timezone as django_timezone
+from django.utils.functional import cached_property
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# число больше bigint база не примет даже в условии запроса
+MAX_PK = 2 ** 63
+COUNT_VERSION_KEY = "paginator_count_version"
+
+
+class FeedPaginator(Paginator):
+    """Пагинатор лент постов, упорядоченных по убыванию даты.
+
+    Число записей берётся из кэша до создания, удаления или переноса
+    постов: сигналы и массовые действия сдвигают версию через
+    ``invalidate_counts``, а код, вставляющий посты в обход сигналов,
+    вызывает её сам.
+    Страница сначала ищется среди постов за ``FEED_RECENT_DAYS`` дней:
+    они идут в начале ленты, поэтому полная страница из этого среза
+    совпадает со страницей всей ленты, а запрос затрагивает только
+    свежие партиции. Лента, которая зависит не только от постов, передаёт
+    ``count_key`` — отпечаток своего состояния, например набора подписок.
+    """
+    def __init__(self, *args, count_key="", **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count_key = count_key
+
+    @cached_property
+    def count(self):
+        version = cache.get_or_set(COUNT_VERSION_KEY, 0, None)
+        query = hashlib.md5(str(self.object_list.query).encode()).hexdigest()
+        key = f"paginator_count:{version}:{query}:{self.count_key}"
+        return cache.get_or_set(
+            key,
+            lambda: Paginator.count.func(self),
+            settings.PAGINATOR_COUNT_TIMEOUT,
+        )
+
+    def page(self, number):
+        number = self.validate_number(number)
+        ordering = (self.object_list.query.order_by
+                    or self.object_list.model._meta.ordering)
+        if settings.FEED_RECENT_DAYS and ordering[:1] == ["-pub_date"]:
+            cutoff = django_timezone.now() - timedelta(
+                days=settings.FEED_RECENT_DAYS
+            )
+            bottom = (number - 1) * self.per_page
+            items = list(
+                self.object_list.filter(pub_date__gte=cutoff)
+                [bottom:bottom + self.per_page]
+            )
+            if len(items) == self.per_page:
+                return self._get_page(items, number, self)
+        return super().page(number)
+
+
+def invalidate_counts():
+    """Сбрасывает закэшированные числа записей всех лент."""
+    try:
+        cache.incr(COUNT_VERSION_KEY)
+    except ValueError:
+        cache.set(COUNT_VERSION_KEY, 1, None)
+
+
+def following_cache_key(user_id):
+    return f"following:{user_id}"
+
+
+def get_following_ids(user_id):
+    """Множество id авторов, на которых подписан пользователь."""
+    from .models import Follow
+
+    key = following_cache_key(user_id)
+    ids = cache.get(key)
+    if ids is None:
+        ids = set(
+            Follow.objects.filter(user=user_id)
+            .values_list("author_id", flat=True)
+        )
+        cache.set(key, ids, settings.FOLLOWING_CACHE_TIMEOUT)
+    return ids
+
+
+def following_digest(user_id):
+    """Отпечаток набора подписок: меняется при подписке и отписке."""
+    ids = ",".join(str(pk) for pk in sorted(get_following_ids(user_id)))
+    return hashlib.md5(ids.encode()).hexdigest()
 
 
-def get_paginator(request, queryset):
-    paginator = Paginator(queryset, settings.PAGE_SIZE)
+def insert_follows(user_id, author_ids):
+    """Подписывает на авторов одним INSERT ... ON CONFLICT DO NOTHING и
+    возвращает id авторов, подписка на которых действительно создана:
+    повтор и гонка с другой подпиской ничего не вставляют."""
+    from .models import Follow
+
+    author_ids = list(author_ids)
+    if not author_ids:
+        return []
+    table = connection.ops.quote_name(Follow._meta.db_table)
+    values = ", ".join(["(%s, %s)"] * len(author_ids))
+    params = [value for author_id in author_ids
+              for value in (user_id, author_id)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (user_id, author_id) VALUES {values} "
+            f"ON CONFLICT (user_id, author_id) DO NOTHING "
+            f"RETURNING author_id",
+            params,
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def get_paginator(request, queryset, count_key=""):
+    paginator = FeedPaginator(queryset, settings.PAGE_SIZE,
+                              count_key=count_key)
     page_number = request.GET.get("page")
     return paginator.get_page(page_number)
+
+
+def get_user_id_or_404(username):
+    """Первичный ключ пользователя без загрузки всей строки."""
+    user_id = (
+        get_user_model().objects.filter(username=username, is_active=True)
+        .values_list("pk", flat=True).first()
+    )
+    if user_id is None:
+        raise Http404("Пользователь не найден")
+    return user_id
+
+
+def render_listing(request, template_name, context):
+    """render с движком Jinja2 для страниц из настройки JINJA2_VIEWS."""
+    using = None
+    match = request.resolver_match
+    if (match and match.view_name in settings.JINJA2_VIEWS
+            and "jinja2" in engines):
+        using = "jinja2"
+    return render(request, template_name, context, using=using)
+
+
+def encode_cursor(moment, pk):
+    """Курсор из даты и первичного ключа последней показанной записи."""
+    delta = moment - EPOCH
+    micros = (delta.days * 86400 + delta.seconds) * 10**6 + delta.microseconds
+    return f"{micros}_{pk}"
+
+
+def decode_cursor(cursor):
+    """Разбирает курсор; для некорректного значения возвращает None."""
+    try:
+        micros, pk = (int(part) for part in cursor.split("_"))
+        moment = EPOCH + timedelta(microseconds=micros)
+    except (AttributeError, ValueError, OverflowError):
+        return None
+    if not 0 < pk < MAX_PK:
+        return None
+    return moment, pk
+
+
+def more_url(url, page_obj):
+    """Адрес фрагмента с постами после последнего на странице ленты."""
+    if not page_obj.has_next():
+        return None
+    last = page_obj[len(page_obj) - 1]
+    return f"{url}?after={encode_cursor(last.pub_date, last.pk)}"
+
+
+def get_keyset_page(queryset, cursor, date_field, size, descending=False):
+    """Следующая порция записей после курсора.
+
+    Записи упорядочены по (date_field, pk), поэтому запрос идёт по индексу
+    и не зависит от глубины пролистывания, в отличие от OFFSET.
+    Возвращает список записей и курсор следующей порции (или None).
+    """
+    sign = "-" if descending else ""
+    queryset = queryset.order_by(f"{sign}{date_field}", f"{sign}pk")
+    position = decode_cursor(cursor) if cursor else None
+    if position is not None:
+        moment, pk = position
+        lookup = "lt" if descending else "gt"
+        queryset = queryset.filter(
+            Q(**{f"{date_field}__{lookup}": moment})
+            | Q(**{date_field: moment, f"pk__{lookup}": pk})
+        )
+    items = list(queryset[:size + 1])
+    if len(items) <= size:
+        return items, None
+    items = items[:size]
+    last = items[-1]
+    return items, encode_cursor(getattr(last, date_field), last.pk)
@@ -1,58 +1,191 @@
+import json
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.views.decorators.http import require_POST
+
+from core.compression import cache_compressed
 
 from .forms import CommentForm, PostForm
-from .models import Comment, Follow, Group, Post, User
-from .utils import get_paginator
+from .models import (Comment, FeedMark, Follow, Group, Mention, Post, PostTag,
+                     Tag, User)
+from .suggestions import follows_changed, get_suggestions
+from .templatetags.post_cards import render_cards
+from .unread import visit_feed
+from .utils import (following_digest, get_following_ids, get_keyset_page,
+                    get_paginator, get_user_id_or_404, insert_follows,
+                    more_url, render_listing)
+
+
+def feed_posts(**filters):
+    return Post.objects.select_related("author", "group").filter(
+        author__is_active=True, **filters
+    )
 
 
+def feed_fragment(request, posts, profile=False):
+    """Порция карточек после курсора ``after`` без шапки и подвала
+    страницы: HTML-фрагмент или JSON при ``format=json``."""
+    posts, cursor = get_keyset_page(
+        posts,
+        request.GET.get("after"),
+        "pub_date",
+        settings.PAGE_SIZE,
+        descending=True,
+    )
+    query = request.GET.copy()
+    query["after"] = cursor
+    next_url = cursor and f"{request.path}?{query.urlencode()}"
+    if request.GET.get("format") == "json":
+        return JsonResponse({
+            "cards": render_cards(posts, profile),
+            "cursor": cursor,
+            "next": next_url,
+        })
+    context = {
+        "posts": posts,
+        "profile": profile,
+        "more_url": next_url,
+    }
+    return render(request, "posts/includes/feed_page.html", context)
+
+
+@cache_compressed(settings.INDEX_CACHE_TIMEOUT)
 def index(request):
-    posts = Post.objects.select_related("group").all()
-    page_obj = get_paginator(request, posts)
+    page_obj = get_paginator(request, feed_posts())
     context = {
         "index": True,
         "page_obj": page_obj,
+        "more_url": more_url(reverse("posts:index_more"), page_obj),
+        "unread": visit_feed(request, FeedMark.INDEX, page_obj),
     }
-    return render(request, "posts/index.html", context)
+    return render_listing(request, "posts/index.html", context)
+
+
+@cache_compressed(settings.INDEX_CACHE_TIMEOUT)
+def index_more(request):
+    return feed_fragment(request, feed_posts())
 
 
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts = Post.objects.filter(group=group)
-    page_obj = get_paginator(request, posts)
+    group = get_object_or_404(Group, slug=slug, is_active=True)
+    page_obj = get_paginator(request, feed_posts(group=group))
     context = {
         "page_obj": page_obj,
         "group": group,
+        "more_url": more_url(
+            reverse("posts:group_more", args=(slug,)), page_obj
+        ),
     }
-    return render(request, "posts/group_list.html", context)
+    return render_listing(request, "posts/group_list.html", context)
+
+
+def group_more(request, slug):
+    group = get_object_or_404(Group, slug=slug, is_active=True)
+    return feed_fragment(request, feed_posts(group=group))
 
 
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = Post.objects.filter(author=author)
-    page_obj = get_paginator(request, posts)
-    following = request.user.is_authenticated and Follow.objects.filter(
-        user=request.user, author=author).exists()
+    author = get_object_or_404(User, username=username, is_active=True)
+    page_obj = get_paginator(request, feed_posts(author=author))
+    following = (request.user.is_authenticated
+                 and author.pk in get_following_ids(request.user.pk))
     context = {
         "author": author,
         "page_obj": page_obj,
+        "more_url": more_url(
+            reverse("posts:profile_more", args=(username,)), page_obj
+        ),
         'following': following,
+        'suggestions': get_suggestions(request.user),
     }
-    return render(request, "posts/profile.html", context)
+    return render_listing(request, "posts/profile.html", context)
+
+
+def profile_more(request, username):
+    author_id = get_user_id_or_404(username)
+    return feed_fragment(request, feed_posts(author=author_id), profile=True)
 
 
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(Post, pk=post_id, author__is_active=True)
     form = CommentForm()
-    comments = Comment.objects.filter(post=post_id)
+    comments, cursor = get_keyset_page(
+        Comment.objects.filter(post=post_id, author__is_active=True)
+        .select_related("author"),
+        None,
+        "created",
+        settings.COMMENTS_PAGE_SIZE,
+    )
     context = {
         "post": post,
         'form': form,
         'comments': comments,
+        'comments_cursor': cursor,
+        'author_posts_count': Post.objects.filter(
+            author=post.author_id
+        ).count(),
     }
     return render(request, "posts/post_detail.html", context)
 
 
+def post_comments(request, post_id):
+    get_object_or_404(Post.objects.only("pk"), pk=post_id)
+    comments, cursor = get_keyset_page(
+        Comment.objects.filter(post=post_id, author__is_active=True)
+        .select_related("author"),
+        request.GET.get("after"),
+        "created",
+        settings.COMMENTS_PAGE_SIZE,
+    )
+    context = {
+        "post_id": post_id,
+        "comments": comments,
+        "comments_cursor": cursor,
+    }
+    return render(request, "posts/includes/comments.html", context)
+
+
+def get_post_page(request, rows):
+    """Страница постов по курсору из строк PostTag или Mention."""
+    rows, cursor = get_keyset_page(
+        rows.filter(post__author__is_active=True)
+        .select_related("post__author", "post__group"),
+        request.GET.get("after"),
+        "pub_date",
+        settings.PAGE_SIZE,
+        descending=True,
+    )
+    return [row.post for row in rows], cursor
+
+
+def tag_posts(request, name):
+    tag = get_object_or_404(Tag, name=name.lower())
+    posts, cursor = get_post_page(request, PostTag.objects.filter(tag=tag))
+    context = {
+        "tag": tag,
+        "posts": posts,
+        "cursor": cursor,
+    }
+    return render(request, "posts/tag_posts.html", context)
+
+
+@login_required
+def mentions(request):
+    posts, cursor = get_post_page(
+        request, Mention.objects.filter(user=request.user)
+    )
+    context = {
+        "posts": posts,
+        "cursor": cursor,
+    }
+    return render(request, "posts/mentions.html", context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
@@ -91,7 +224,7 @@ def post_edit(request, post_id):
 
 @login_required
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(Post, id=post_id, author__is_active=True)
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
@@ -103,25 +236,74 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    page_obj = get_paginator(request, posts)
+    page_obj = get_paginator(
+        request,
+        feed_posts(author__following__user=request.user),
+        count_key=following_digest(request.user.pk),
+    )
     context = {
         "follow": True,
         "page_obj": page_obj,
+        "more_url": more_url(reverse("posts:follow_more"), page_obj),
+        "unread": visit_feed(request, FeedMark.FOLLOW, page_obj),
+        'suggestions': get_suggestions(request.user),
     }
-    return render(request, 'posts/follow.html', context)
+    return render_listing(request, 'posts/follow.html', context)
 
 
 @login_required
+def follow_more(request):
+    return feed_fragment(
+        request, feed_posts(author__following__user=request.user)
+    )
+
+
+@login_required
+@require_POST
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
-    if request.user != author:
-        Follow.objects.get_or_create(user=request.user, author=author)
+    author_id = get_user_id_or_404(username)
+    if author_id != request.user.pk:
+        if insert_follows(request.user.pk, [author_id]):
+            follows_changed(request.user.pk, [author_id])
     return redirect('posts:profile', username)
 
 
 @login_required
+@require_POST
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
-    Follow.objects.filter(user=request.user, author=author).delete()
+    author_id = get_user_id_or_404(username)
+    deleted, _ = Follow.objects.filter(
+        user=request.user, author_id=author_id
+    ).delete()
+    if deleted:
+        follows_changed(request.user.pk, [author_id])
     return redirect('posts:profile', username)
+
+
+@login_required
+@require_POST
+def follow_bulk(request):
+    """Подписка на список авторов: JSON {"usernames": [...]}."""
+    try:
+        usernames = json.loads(request.body)["usernames"]
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({"error": "Ожидается {\"usernames\": [...]}"},
+                            status=400)
+    if (not isinstance(usernames, list)
+            or len(usernames) > settings.FOLLOW_BULK_LIMIT):
+        return JsonResponse(
+            {"error": f"Не больше {settings.FOLLOW_BULK_LIMIT} авторов"},
+            status=400,
+        )
+    author_ids = list(
+        User.objects.filter(username__in=[str(name) for name in usernames],
+                            is_active=True)
+        .exclude(pk=request.user.pk)
+        .values_list("pk", flat=True)
+    )
+    with transaction.atomic():
+        new_ids = insert_follows(request.user.pk, author_ids)
+        if new_ids:
+            follows_changed(request.user.pk, new_ids)
+    return JsonResponse({"requested": len(usernames),
+                         "found": len(author_ids)})
@@ -0,0 +1,66 @@
+// Подгрузка следующей порции без перезагрузки страницы.
+// Ссылка с атрибутом data-load-more ведёт на фрагмент; ответ сервера
+// заменяет блок, в котором находится ссылка.
+// Блок ленты с атрибутом data-infinite скрыт, пока скрипт не загружен:
+// скрипт показывает его вместо пагинатора и сам нажимает ссылку, когда
+// блок подходит к краю экрана.
+function enhanceFeed(block) {
+  var pager = document.querySelector('nav[aria-label="Page navigation"]');
+  if (pager) {
+    pager.hidden = true;
+  }
+  block.hidden = false;
+  if (!('IntersectionObserver' in window)) {
+    return;
+  }
+  var observer = new IntersectionObserver(function (entries) {
+    if (entries[0].isIntersecting) {
+      observer.disconnect();
+      block.querySelector('a[data-load-more]').click();
+    }
+  }, {rootMargin: '600px'});
+  observer.observe(block);
+}
+
+document.addEventListener('DOMContentLoaded', function () {
+  document.querySelectorAll('[data-infinite]').forEach(enhanceFeed);
+});
+
+document.addEventListener('click', function (event) {
+  var link = event.target.closest('a[data-load-more]');
+  if (!link) {
+    return;
+  }
+  event.preventDefault();
+  if (link.dataset.loading) {
+    return;
+  }
+  link.dataset.loading = 'true';
+  fetch(link.href, {headers: {'X-Requested-With': 'XMLHttpRequest'}})
+    .then(function (response) {
+      if (!response.ok) {
+        throw new Error(response.status);
+      }
+      return response.text();
+    })
+    .then(function (html) {
+      var template = document.createElement('template');
+      template.innerHTML = html;
+      var next = template.content.querySelector('[data-infinite]');
+      link.parentNode.replaceWith(template.content);
+      if (next) {
+        enhanceFeed(next);
+      }
+    })
+    .catch(function () {
+      // ссылка ведёт на фрагмент без оформления, поэтому по ней не
+      // переходим: её можно нажать ещё раз, а пагинатор снова виден
+      delete link.dataset.loading;
+      var pager = document.querySelector(
+        'nav[aria-label="Page navigation"]'
+      );
+      if (pager) {
+        pager.hidden = false;
+      }
+    });
+});
@@ -0,0 +1,46 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+User = get_user_model()
+# чтение пользователя по id, сессии и подписок
+AUTH_QUERIES = (
+    '"auth_user"."id" =',
+    'FROM "django_session"',
+    'FROM "posts_follow"',
+)
+
+
+class CachedAuthTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def auth_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in context.captured_queries
+                if any(part in query['sql'] for part in AUTH_QUERIES)]
+
+    def test_repeated_request_has_no_auth_queries(self):
+        """Повторный запрос не читает сессию, пользователя и подписки."""
+        url = reverse('posts:profile', args=(self.author.username,))
+        self.auth_queries(url)
+        self.assertEqual(self.auth_queries(url), [])
+
+    def test_password_change_logs_out(self):
+        """Смена пароля сразу делает старую сессию недействительной."""
+        self.client.get(reverse('posts:index'))
+        self.user.set_password('new-password')
+        self.user.save()
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.status_code, 302)
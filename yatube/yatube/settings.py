@@ -10,12 +10,16 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
+import importlib.util
 import os
-from dotenv import load_dotenv
 #import sentry_sdk
 # from sentry_sdk.integrations.django import DjangoIntegration
 
-load_dotenv()
+# в продакшене окружение задаёт менеджер процессов (см. gunicorn.conf.py)
+if os.getenv('DJANGO_DOTENV', '1') == '1':
+    from dotenv import load_dotenv
+
+    load_dotenv()
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -60,32 +64,55 @@ INSTALLED_APPS = [
     "core.apps.CoreConfig",
     "about.apps.AboutConfig",
     'sorl.thumbnail',
+]
+# инструменты разработки, профиль settings_production их не подключает
+DEVELOPMENT_APPS = [
     'debug_toolbar',
 ]
+INSTALLED_APPS += DEVELOPMENT_APPS
 
 MIDDLEWARE = [
+    "core.middleware.StaticFilesMiddleware",
+    "core.middleware.MetricsMiddleware",
+    "core.middleware.CompressionMiddleware",
+    "core.middleware.NPlusOneMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "core.middleware.ReplicaMiddleware",
+    "core.middleware.RateLimitMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+]
+DEVELOPMENT_MIDDLEWARE = [
     'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
+MIDDLEWARE += DEVELOPMENT_MIDDLEWARE
 
 ROOT_URLCONF = "yatube.urls"
 
 # Путь к директории с шаблонами вынесен в переменную:
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
-
+# вне отладки скомпилированные шаблоны держатся в памяти процесса
+BASE_TEMPLATE_LOADERS = [
+    "django.template.loaders.filesystem.Loader",
+    "django.template.loaders.app_directories.Loader",
+]
+TEMPLATE_LOADERS = BASE_TEMPLATE_LOADERS
+if not DEBUG:
+    TEMPLATE_LOADERS = [
+        ("django.template.loaders.cached.Loader", BASE_TEMPLATE_LOADERS),
+    ]
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "core.backends.DjangoTemplates",
+        "NAME": "django",
         "DIRS": [TEMPLATES_DIR],
-        "APP_DIRS": True,
         "OPTIONS": {
+            "loaders": TEMPLATE_LOADERS,
             "context_processors": [
                 "django.template.context_processors.debug",
                 "django.template.context_processors.request",
@@ -97,6 +124,24 @@ TEMPLATES = [
     },
 ]
 
+# необязательный Jinja2 для горячих шаблонов лент: включается для
+# перечисленных через запятую имён URL, например JINJA2_VIEWS=posts:index
+JINJA2_VIEWS = [
+    name for name in os.getenv("JINJA2_VIEWS", "").split(",") if name
+]
+if importlib.util.find_spec("jinja2"):
+    TEMPLATES.append({
+        "BACKEND": "core.jinja2.Jinja2",
+        "NAME": "jinja2",
+        "DIRS": [os.path.join(BASE_DIR, "jinja2")],
+        "OPTIONS": {
+            "environment": "core.jinja2.environment",
+            "context_processors": TEMPLATES[0]["OPTIONS"][
+                "context_processors"
+            ],
+        },
+    })
+
 WSGI_APPLICATION = "yatube.wsgi.application"
 
 
@@ -115,7 +160,46 @@ DATABASES = {
         'PORT': os.getenv('DB_PORT'),
     }
 }
-
+# реплики только для чтения: хосты через запятую, остальное как у default
+DATABASE_REPLICAS = []
+for number, host in enumerate(
+    filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(','))
+):
+    alias = f'replica_{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['core.db.ReplicaRouter']
+# вью, которые читают с реплик
+REPLICA_VIEWS = {
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:post_comments',
+    'posts:follow_index',
+}
+# приложения, которые всегда читаются с основной базы
+PRIMARY_ONLY_APPS = {'sessions', 'core'}
+# сколько секунд после записи пользователь читает с основной базы
+REPLICA_PIN_SECONDS = 10
+REPLICA_PIN_COOKIE = 'primary_pin'
+# реплика с отставанием больше REPLICA_MAX_LAG секунд не используется;
+# отставание замеряется не чаще раза в REPLICA_LAG_CHECK_INTERVAL секунд
+REPLICA_MAX_LAG = 5
+REPLICA_LAG_CHECK_INTERVAL = 10
+
+
+# сессии читаются из кэша, в БД — только при промахе
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+AUTHENTICATION_BACKENDS = ["users.backends.CachedModelBackend"]
+# сколько секунд пользователь сессии хранится в кэше
+AUTH_USER_CACHE_TIMEOUT = 60
+# сколько секунд хранится множество авторов, на которых подписан пользователь
+FOLLOWING_CACHE_TIMEOUT = 300
 
 # Password validation# https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 AUTH_PASSWORD_VALIDATORS = [
@@ -157,6 +241,19 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 STATIC_URL = "/static/"
 #STATICFILES_DIRS = (os.path.join(BASE_DIR, "static/"),)
 STATIC_ROOT = os.path.join(BASE_DIR, 'static/')
+# хэшированные имена и сжатые копии: collectstatic собирает static/ в
+# staticfiles/, откуда статику отдаёт прокси или StaticFilesMiddleware
+if os.getenv('STATIC_HASHED'):
+    STATICFILES_DIRS = [STATIC_ROOT]
+    STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+    STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+# отдавать статику из Django (когда перед ним нет прокси)
+STATIC_SERVE = bool(os.getenv('STATIC_SERVE'))
+# префикс внутреннего location nginx для X-Accel-Redirect, например
+# '/internal-static/'; пусто — файл отдаёт сам Django
+STATIC_ACCEL_REDIRECT = os.getenv('STATIC_ACCEL_REDIRECT', '')
+# кэш браузера для файлов без хэша в имени, в секундах
+STATIC_MAX_AGE = 3600
 
 LOGIN_URL = "users:login"
 LOGIN_REDIRECT_URL = "posts:index"
@@ -168,16 +265,89 @@ EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 # количество объектов на странице
 PAGE_SIZE = 10
+# первые страницы лент сначала читаются за последние FEED_RECENT_DAYS
+# дней (в PostgreSQL это только свежие партиции), общее число записей
+# для пагинатора кэшируется на PAGINATOR_COUNT_TIMEOUT секунд
+FEED_RECENT_DAYS = 30
+PAGINATOR_COUNT_TIMEOUT = 60
+# партиции постов: на сколько месяцев вперёд создавать, а старше скольких
+# месяцев переносить в архивное табличное пространство
+POSTS_PARTITION_AHEAD = 3
+POSTS_ARCHIVE_MONTHS = 12
+POSTS_ARCHIVE_TABLESPACE = os.getenv('POSTS_ARCHIVE_TABLESPACE', 'archive')
+# в админке таблицы, где по оценке планировщика больше строк, не
+# пересчитываются через COUNT(*)
+ADMIN_EXACT_COUNT_LIMIT = 10000
+# количество комментариев в одной порции на странице поста
+COMMENTS_PAGE_SIZE = 20
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+# рекомендации авторов: сколько хранить и показывать на пользователя и
+# сколько соседей вершины графа подписок просматривать при расчёте
+FOLLOW_SUGGESTIONS_LIMIT = 20
+FOLLOW_SUGGESTIONS_SHOWN = 5
+FOLLOW_SUGGESTIONS_FANOUT = 50
+# сколько авторов можно передать в одном запросе массовой подписки
+FOLLOW_BULK_LIMIT = 500
+# фоновые задачи: True — выполнять сразу, без очереди
+TASKS_ALWAYS_EAGER = False
+TASKS_WORKERS = 2
+TASKS_POLL_INTERVAL = 1
+TASKS_MAX_ATTEMPTS = 3
+# базовая пауза перед повтором, удваивается с каждой попыткой, в секундах
+TASKS_RETRY_DELAY = 10
+# через сколько секунд зависшая задача возвращается в очередь
+TASKS_STALE_TIMEOUT = 600
+# массовые действия: записей в одной транзакции и сколько секунд одна
+# задача обрабатывает порции, прежде чем поставить себя в очередь снова
+BATCH_JOB_CHUNK = 1000
+BATCH_JOB_SLICE = 30
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.backends.InstrumentedLocMemCache',
     }
 }
+# минификация HTML-ответов перед сжатием и кэшированием
+HTML_MINIFY = True
+# сколько секунд главная страница отдаётся из кэша
+INDEX_CACHE_TIMEOUT = 20
+# сколько секунд хранится готовый HTML карточки поста
+POST_CARD_TIMEOUT = 60 * 60 * 24
+# счётчики новых записей на вкладках лент: сколько последних постов
+# помнить (больше — «N+») и сколько секунд хранить списки и отметки
+UNREAD_LIMIT = 20
+UNREAD_CACHE_TIMEOUT = 60 * 60 * 24
+# ограничение частоты запросов: имя URL -> "[МЕТОДЫ:]количество/период"
+RATELIMITS = {
+    'posts:post_create': 'POST:10/m',
+    'posts:post_edit': 'POST:30/m',
+    'posts:add_comment': 'POST:20/m',
+    'posts:profile_follow': '60/m',
+    'posts:profile_unfollow': '60/m',
+    'posts:follow_bulk': '10/h',
+    'users:signup': 'POST:5/h',
+}
+RATELIMIT_CACHE = 'default'
 
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
+# адреса, с которых доступна страница /metrics/
+METRICS_ALLOWED_IPS = INTERNAL_IPS
+THUMBNAIL_BACKEND = 'core.backends.InstrumentedThumbnailBackend'
+# миниатюры картинки поста, которые создаются сразу после загрузки;
+# размеры те же, что в тегах thumbnail шаблонов карточки и поста
+POST_THUMBNAILS = [
+    ('960x339', {'crop': 'center', 'upscale': True}),
+]
+# поиск N+1: сколько одинаковых запросов из шаблона считать проблемой,
+# доля проверяемых запросов и падать ли при находке (включено в тестах)
+NPLUSONE_THRESHOLD = 3
+NPLUSONE_SAMPLE_RATE = 0.01
+NPLUSONE_RAISE = False
+# хранилище sorl.thumbnail читается через кэш, промахи бывают только
+# на холодном кэше
+NPLUSONE_IGNORE = ('"thumbnail_kvstore"',)
+TEST_RUNNER = 'core.runner.TestRunner'
 
 # скопируйте dsn из вашего личного кабинета на Sentry: 
 # Projects → <имя-проекта> → Client Keys
@@ -0,0 +1,31 @@
+"""Профиль для продакшена: DJANGO_SETTINGS_MODULE=yatube.settings_production.
+
+Те же настройки, но без инструментов разработки, с кэшированными
+шаблонами и постоянными соединениями с БД. Переменные окружения
+задаёт менеджер процессов, поэтому gunicorn.conf.py выключает чтение
+.env через DJANGO_DOTENV=0.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import (BASE_TEMPLATE_LOADERS, DATABASES, DEVELOPMENT_APPS,
+                       DEVELOPMENT_MIDDLEWARE, INSTALLED_APPS, MIDDLEWARE,
+                       TEMPLATES)
+
+DEBUG = False
+
+INSTALLED_APPS = [
+    app for app in INSTALLED_APPS if app not in DEVELOPMENT_APPS
+]
+MIDDLEWARE = [
+    name for name in MIDDLEWARE if name not in DEVELOPMENT_MIDDLEWARE
+]
+DEVELOPMENT_APPS = []
+DEVELOPMENT_MIDDLEWARE = []
+
+TEMPLATE_LOADERS = [
+    ("django.template.loaders.cached.Loader", BASE_TEMPLATE_LOADERS),
+]
+TEMPLATES[0]["OPTIONS"]["loaders"] = TEMPLATE_LOADERS
+
+# соединение живёт между запросами воркера, а не открывается на каждый
+for database in DATABASES.values():
+    database.setdefault('CONN_MAX_AGE', 60)